@@ -31,11 +31,13 @@ def main():
     print("") # Output separator for clarity
 
     print("Downloading ...")
-    if args.mode == "bench":
+    if args.mode == "bench" and args.parallel and not args.ucase and not args.dlonly:
+        print("Downloading benchmarks is pipelined with builds")
+    elif args.mode == "bench":
         for bm in args.bmLs:
             if args.bench == "All" or args.bench == bm.getName():
                 bm.downloadTmp()
-    else:
+    elif args.mode != "plot" or args.uc or (args.rlm and args.rlm != -1): # libpfm4 is needed for use cases
         pm = perfMonitor(args, needReg=False)
         pm.downloadTmp()
     print("") # Output separator for clarity
@@ -4,11 +4,16 @@ from __future__ import print_function
 
 import os
 import stat
+import multiprocessing
 import re
 import shutil
 
 from pyc.runJob import runJob
 from pyc.download import download
+from pyc.buildCache import buildCache
+from pyc.resultStore import resultStore
+from pyc.statistic import statistic
+from pyc.logFile import logFile
 
 class bench(runJob):
     """Bench class designed to handle general purpose benchmark topics"""
@@ -18,8 +23,17 @@ class bench(runJob):
         runJob.__init__(self, args)
         self.tmp = os.path.join(args.tmp, "bench")
         self.dld = download(self.tmp)
+        self.cache = buildCache(args)
         self.bName = name
         self.bType = bType
+        self.deps = [] # Benchmarks (names) that must be built before this one
+        self.makeJobs = multiprocessing.cpu_count() # Parallel make jobs: concurrent builds share the cores
+        self.needCpl = True # Compilers are needed to build the benchmark
+        self.provisional = False # Metric is provisional: it is used only if no other benchmark of the same type ran
+        self.lowerIsBetter = False # Metric is better when lower (latency): the best metric is the minimum
+        self.store = resultStore(os.path.join(args.tmp, "results.db"))
+        self.metricCache = {} # Metric memoized by log filter and logs (with their modification time)
+        self.flagSet = None # Name of the flag set the benchmark is built with: None means default compilers and flags
 
     @staticmethod
     def __modifMakefile__(makefiles, keys, values, comments=None):
@@ -43,17 +57,111 @@ class bench(runJob):
                         break # Each file can fit only one pattern
             open(mk, "w").writelines(lines)
 
+    def __getMakeCmd__(self, targets):
+        """Get the make command line to build targets with parallel jobs"""
+        nbCores = str(multiprocessing.cpu_count()) # No new job if the load (all concurrent builds) is over nbCores
+        return ["make", "-j", str(self.makeJobs), "-l", nbCores] + targets
+
     def __printMetricStatus__(self, printMax, maxMc, maxInfo):
         """Print the status of the benchmark metric"""
         if printMax:
             if maxMc == 0.:
                 print("Analysing %9s: benchmark has not been run" % self.bName)
             else:
-                unitMc = "GFlop/s" if self.bType == "GF" else "MB/s"
-                print("Analysing %9s: maximum = %11.3f %7s," % (self.bName, maxMc, unitMc), maxInfo["LOG"])
+                unitMc = self.getUnit()
+                best = "minimum" if self.lowerIsBetter else "maximum"
+                print("Analysing %9s: %s = %11.3f %7s," % (self.bName, best, maxMc, unitMc), maxInfo["LOG"])
                 if "EXTRA" in maxInfo:
                     print("%51s" % " ", maxInfo["EXTRA"])
 
+    def __isBetter__(self, value, ref):
+        """Check if a metric value is better than a reference one"""
+        return value < ref if self.lowerIsBetter else value > ref
+
+    def __getRunConfig__(self, log):
+        """Get the configuration of a run: its run key without repetition (tokens, parameters may not be typed)"""
+        key = self.splitLogName(log)
+        return (key.root, tuple([t for t in key.tokens if not t.startswith("rep=")]), key.flags)
+
+    def __getRecordGroups__(self, lsLogs):
+        """Group records (value, log, extra) by keys and configuration: repetitions of a run are grouped"""
+        groups = []
+        idxGroups = {}
+        dicRecords = self.store.getRecords(self.bName, lsLogs, self.splitLogName, self.__parseLog__)
+        for log in lsLogs:
+            cfg = self.__getRunConfig__(log)
+            for keys, value, extra in dicRecords[os.path.abspath(log)]:
+                if (keys, cfg) not in idxGroups:
+                    idxGroups[(keys, cfg)] = len(groups)
+                    groups.append((keys, cfg, []))
+                records = groups[idxGroups[(keys, cfg)]][2]
+                if len(records) > 0 and records[-1][1] == log: # Same keys in a log (variants of a run): keep the best
+                    if self.__isBetter__(value, records[-1][0]):
+                        records[-1] = (value, log, extra)
+                    continue
+                records.append((value, log, extra))
+        return groups
+
+    def __getMetricFromStore__(self, logRegExp, filterLogs):
+        """Get metric from logs: logs are parsed once, results are then read from the store"""
+        lsLogs = self.__listLogs__(logRegExp, filterLogs)
+        logFilter = None
+        if filterLogs:
+            logFilter = (tuple(self.args.pltLogInclude or []), tuple(self.args.pltLogExclude or []))
+        estimator = self.args.estimator if hasattr(self.args, "estimator") else "max"
+        cacheKey = (logRegExp, logFilter, estimator, frozenset([(log, os.path.getmtime(log)) for log in lsLogs]))
+        if cacheKey in self.metricCache:
+            return self.metricCache[cacheKey]
+        maxMc = 0.
+        dicMc = {}
+        maxInfo = {}
+        lsStats = []
+        for keys, cfg, records in self.__getRecordGroups__(lsLogs):
+            values = [r[0] for r in records]
+            value = statistic.estimate(values, estimator, self.lowerIsBetter) # Estimate over repetitions of a run
+            best = records[values.index(min(values) if self.lowerIsBetter else max(values))]
+            dic = dicMc
+            for key in keys[:-1]:
+                if key not in dic:
+                    dic[key] = {}
+                dic = dic[key]
+            if keys[-1] not in dic or self.__isBetter__(value, dic[keys[-1]]):
+                dic[keys[-1]] = value
+            if maxMc == 0. or self.__isBetter__(value, maxMc):
+                maxMc = value
+                maxInfo = {"LOG": os.path.basename(best[1])}
+                if best[2]:
+                    maxInfo["EXTRA"] = best[2]
+                if len(values) > 1:
+                    stats = statistic.summarize(values)
+                    rep = "%s over %d runs, stddev = %.3f" % (estimator, stats["NB"], stats["STDDEV"])
+                    maxInfo["EXTRA"] = maxInfo["EXTRA"] + ", " + rep if "EXTRA" in maxInfo else rep
+            lsStats.append((cfg, keys, statistic.summarize(values)))
+        self.store.setStats(self.bName, lsStats)
+        self.metricCache[cacheKey] = (maxMc, dicMc, maxInfo)
+        return maxMc, dicMc, maxInfo
+
+    def __hasConverged__(self, logName):
+        """Check if previous repetitions of a run are enough: confidence intervals of all records are narrow enough"""
+        key = self.splitLogName(logName)
+        if "rep=" not in key or int(key.get("rep")) <= 2: # At least 2 runs are needed to get a confidence interval
+            return False
+        token = key["rep="]
+        lsLogs = []
+        for rep in range(1, int(key.get("rep"))):
+            repToken = "rep=" + str(rep).zfill(len(token) - len("rep="))
+            repLog = logFile.find(logName.replace("." + token + ".", "." + repToken + "."))
+            if repLog:
+                lsLogs.append(repLog)
+        groups = self.__getRecordGroups__(lsLogs) if len(lsLogs) >= 2 else []
+        if len(groups) == 0:
+            return False
+        for group in groups:
+            ci = statistic.confidence([r[0] for r in group[2]])
+            if ci is None or ci > self.args.error / 100.:
+                return False
+        return True
+
     @staticmethod
     def __getStepsFromKey__(dic, nKey):
         """Get steps that match a given key"""
@@ -85,6 +193,49 @@ class bench(runJob):
         os.makedirs(ucPth)
         return ucPth
 
+    def runLog(self, logName, clDic, thd=None, cores=1):
+        """Run a command line logged in logName (if needed): skip repetitions of runs that have converged"""
+        if self.__hasConverged__(logName):
+            print("Running", logName, "... skipped (confidence interval below %s %%)" % self.args.error)
+            return 0
+        return runJob.runLog(self, logName, clDic, thd=thd, cores=cores)
+
+    def ingestLog(self, logName):
+        """Parse a log once it has been generated and keep its results in the store"""
+        self.store.ingest(self.bName, logName, self.splitLogName(logName), self.__parseLog__)
+        self.clearMetricCache()
+
+    def packLog(self, logName, trim=True):
+        """Pack a finished log: results already in the store are kept (they are not parsed again)"""
+        packName = runJob.packLog(self, logName, trim)
+        if packName:
+            self.store.moveLog(logName, packName)
+        return packName
+
+    def clearMetricCache(self):
+        """Forget memoized metrics: they will be computed again from the store"""
+        self.metricCache = {}
+
+    def __getFlagSetTokens__(self):
+        """Get run tokens of the flag set (if any)"""
+        if self.flagSet is None:
+            return []
+        return [("fs", self.flagSet, "s")]
+
+    def setFlagSet(self, flagSet):
+        """Turn the benchmark into a flag set variant: built in its own directory, runs tagged with the flag set"""
+        self.flagSet = flagSet[0]
+        self.bName = self.bName + "-" + flagSet[0]
+        self.deps = [dep + "-" + flagSet[0] for dep in self.deps]
+        self.tmp = os.path.join(self.args.tmp, "bench", "fs=" + flagSet[0])
+        self.dld = download(self.tmp, mirror=os.path.join(self.args.tmp, "bench")) # Reuse default downloads
+        self.store = resultStore(os.path.join(self.args.tmp, "results.db"))
+        self.metricCache = {}
+
+    def getFlagSet(self):
+        """Get the name of the flag set the benchmark is built with (None if default)"""
+        return self.flagSet
+
     def getName(self):
         """Get benchmark name"""
         return self.bName
@@ -93,16 +244,29 @@ class bench(runJob):
         """Get benchmark type"""
         return self.bType
 
+    def getUnit(self):
+        """Get the unit of the benchmark metric (from its type)"""
+        return "GFlop/s" if self.bType == "GF" else self.bType.split("-")[-1]
+
     def run(self, ext):
-        """Run benchmark over all possible proc and thread configurations"""
+        """Run benchmark over all possible proc and thread configurations (repeat runs if needed)"""
         print("Running", self.bName, "...")
-        for n in self.args.proc:
-            t = 1 # Number of thread(s)
-            while n * t <= max(self.args.proc):
-                runTokens = [("n", n, "d", max(self.args.proc))]
-                runTokens += [("t", t, "d", max(self.args.proc))]
-                self.runNT(n, t, runTokens, ext)
-                t *= 2
+        for rep in range(1, self.args.repeat + 1):
+            for self.placement in self.__getPlacements__():
+                for n in self.args.proc:
+                    t = 1 # Number of thread(s)
+                    while n * t <= max(self.args.proc):
+                        runTokens = [("n", n, "d", max(self.args.proc))]
+                        runTokens += [("t", t, "d", max(self.args.proc))]
+                        runTokens += self.__getNumaTokens__() + self.__getPlacementTokens__()
+                        runTokens += self.__getFlagSetTokens__()
+                        if self.args.repeat > 1:
+                            runTokens += [("rep", rep, "d", self.args.repeat)]
+                        self.runNT(n, t, runTokens, ext)
+                        t *= 2
+            self.placement = None
+            if self.sched and rep < self.args.repeat:
+                self.sched.wait() # Previous repetitions must be over to check if next ones are needed
 
     def plot(self):
         """Plot benchmark results over all possible configurations"""
@@ -110,6 +274,27 @@ class bench(runJob):
         for n in self.args.proc:
             nKey = ("n=%0" + str(len(str(max(self.args.proc)))) + "d") % n
             self.plotN(nKey)
+        if len(self.__getPlacements__()) > 1:
+            self.__plotPlacements__()
+
+    def __plotPlacements__(self):
+        """Plot the best metric versus threads for each placement policy (compare placements)"""
+        dicPl = {}
+        for logName, value in self.store.getBestPerLog(self.bName, self.lowerIsBetter).items():
+            if not os.path.exists(logName) or self.plt.filterLog(logName):
+                continue
+            key = self.splitLogName(logName)
+            if "pl=" not in key or "n=" not in key or "t=" not in key:
+                continue
+            dic = dicPl.setdefault(key["n="], {}).setdefault(int(key.get("t")), {})
+            pl = key["pl="][len("pl="):]
+            dic[pl] = value if pl not in dic or self.__isBetter__(value, dic[pl]) else dic[pl]
+        steps = [pl[0].replace(".", "-") for pl in self.__getPlacements__()]
+        unitMc = self.getUnit()
+        for nKey in sorted(dicPl):
+            self.plt.setPlotAttr(xTickInt=True)
+            plotName = self.plt.buildPlotName([self.bName, "placement", nKey])
+            self.plt.plot2DGraph(plotName, dicPl[nKey], steps, "Threads", unitMc)
 
     def downloadTmp(self):
         """Download benchmark in the temporary directory"""
@@ -128,6 +313,10 @@ class bench(runJob):
         """Run benchmark in the temporary directory for a given proc and thread configuration"""
         pass # To be overriden by inherited class
 
+    def __parseLog__(self, log):
+        """Parse a log: return a list of records (keys, value, extra)"""
+        return [] # To be overriden by inherited class
+
     def getMetric(self, printMax=True, getDict=False, getMaxInfo=False, filterLogs=False):
         """Getting benchmark metric from the temporary directory"""
         pass # To be overriden by inherited class
@@ -0,0 +1,124 @@
+"""This module exports the buildCache class"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import hashlib
+import json
+import time
+
+class buildCache(object):
+    """Build cache class designed to skip identical builds: binaries are stored by a hash of what they are built from"""
+
+    versions = {} # Compiler versions memoized by compiler path
+
+    def __init__(self, args):
+        """Initialize build cache class instance"""
+        self.args = args
+        self.cacheDir = args.buildCache if hasattr(args, "buildCache") else os.path.join(args.tmp, "cache")
+
+    @staticmethod
+    def __getVersion__(exe):
+        """Get the version of a compiler (first line of --version)"""
+        if exe not in buildCache.versions:
+            pProc = subprocess.Popen([exe, "--version"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            stdout = pProc.communicate()[0].decode("utf-8", "replace")
+            buildCache.versions[exe] = stdout.strip().split("\n")[0] if pProc.returncode == 0 else ""
+        return buildCache.versions[exe]
+
+    @staticmethod
+    def __hashFile__(sha, fileName):
+        """Hash the content of a file"""
+        with open(fileName, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 ** 2), b""):
+                sha.update(chunk)
+
+    @staticmethod
+    def __isSame__(src, dst):
+        """Check if 2 files are the same (copies keep size and modification time)"""
+        if not os.path.isfile(dst):
+            return False
+        srcStat, dstStat = os.stat(src), os.stat(dst)
+        return srcStat.st_size == dstStat.st_size and int(srcStat.st_mtime) == int(dstStat.st_mtime)
+
+    @staticmethod
+    def __copy__(src, dst):
+        """Copy a file or a directory (recursively): files that are already the same are skipped"""
+        if os.path.isdir(src):
+            for root, _, files in os.walk(src):
+                for f in files:
+                    buildCache.__copy__(os.path.join(root, f), os.path.join(dst, os.path.relpath(root, src), f))
+            return
+        if buildCache.__isSame__(src, dst):
+            return
+        if os.path.dirname(dst) and not os.path.exists(os.path.dirname(dst)):
+            os.makedirs(os.path.dirname(dst))
+        if os.path.exists(dst):
+            os.remove(dst) # The destination may be read only or busy (running binary)
+        shutil.copy2(src, dst) # Keep permissions and modification time
+
+    @staticmethod
+    def getGitRevision(gitDir):
+        """Get the revision of a git checkout (empty if it can not be found)"""
+        pProc = subprocess.Popen(["git", "rev-parse", "HEAD"], cwd=gitDir, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+        stdout = pProc.communicate()[0].decode("utf-8", "replace")
+        return stdout.strip() if pProc.returncode == 0 else ""
+
+    def getKey(self, sources, cpl=None, params=None):
+        """Get the key of a build: hash of sources (files), compilers (path, version), flags and parameters"""
+        sha = hashlib.sha256()
+        for src in sources:
+            sha.update(os.path.basename(src).encode())
+            if os.path.isfile(src):
+                self.__hashFile__(sha, src)
+        dicKey = {"CPL": {}, "PARAMS": params if params else {}}
+        for k in sorted(cpl if cpl else {}):
+            dicKey["CPL"][k] = cpl[k]
+            if cpl[k] and os.path.isabs(cpl[k]) and os.path.isfile(cpl[k]): # Compiler: its version matters
+                dicKey["CPL"][k + "_VERSION"] = self.__getVersion__(cpl[k])
+        sha.update(json.dumps(dicKey, sort_keys=True).encode())
+        return sha.hexdigest()
+
+    def __getEntry__(self, key):
+        """Get the directory of a cache entry"""
+        return os.path.join(self.cacheDir, key[:2], key)
+
+    def restore(self, name, key, targets):
+        """Restore targets (relative to the current directory) of a cached build: False if the build is not cached"""
+        if not self.cacheDir:
+            return False
+        entry = self.__getEntry__(key)
+        if not os.path.exists(os.path.join(entry, "build.json")):
+            return False
+        for target in targets:
+            if not os.path.exists(os.path.join(entry, target)):
+                return False
+        print("Building", name, "...", end="")
+        start = time.time()
+        for target in targets:
+            self.__copy__(os.path.join(entry, target), target)
+        print(" OK, restored from cache (time = %11.3f sec, key = %s)" % (time.time() - start, key[:12]))
+        return True
+
+    def store(self, name, key, targets):
+        """Store targets (relative to the current directory) of a build"""
+        if not self.cacheDir:
+            return
+        entry = self.__getEntry__(key)
+        if os.path.exists(entry):
+            return
+        for target in targets:
+            if not os.path.exists(target):
+                return # Partial builds are not cached
+        entryTmp = entry + ".tmp." + str(os.getpid()) # Nodes may share the cache: store, then, publish atomically
+        for target in targets:
+            self.__copy__(target, os.path.join(entryTmp, target))
+        info = {"NAME": name, "TARGETS": targets, "DIR": os.getcwd(), "TIME": time.ctime()}
+        json.dump(info, open(os.path.join(entryTmp, "build.json"), "w"))
+        try:
+            os.rename(entryTmp, entry)
+        except OSError: # Published meanwhile by another build
+            shutil.rmtree(entryTmp, ignore_errors=True)
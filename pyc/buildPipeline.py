@@ -0,0 +1,100 @@
+"""This module exports the buildPipeline class"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import multiprocessing
+
+class buildPipeline(object):
+    """Build pipeline class designed to download and build benchmarks concurrently"""
+
+    def __init__(self, args, cpls, sched):
+        """Initialize build pipeline class instance"""
+        self.args = args
+        self.cpls = cpls # Compilers per flag set (None: default)
+        self.sched = sched
+        self.todo = []
+        self.working = []
+        self.done = []
+
+    def __isReady__(self, bm):
+        """Check if the benchmarks a benchmark depends on have been built"""
+        names = [b.getName() for b in self.todo] + [w[0].getName() for w in self.working]
+        for dep in bm.deps:
+            if dep in names:
+                return False
+        return True
+
+    @staticmethod
+    def __work__(bm, cpl, logName):
+        """Download and build a benchmark (in a child process): output is logged"""
+        sys.stdout.flush()
+        sys.stderr.flush()
+        log = open(logName, "w")
+        os.dup2(log.fileno(), sys.stdout.fileno()) # Log outputs of both python and subprocesses
+        os.dup2(log.fileno(), sys.stderr.fileno())
+        bm.downloadTmp()
+        bm.build(cpl)
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+    def __start__(self, bm):
+        """Start downloading and building a benchmark"""
+        logName = os.path.join(self.args.tmp, "bench", "pipeline." + bm.getName() + ".log")
+        nbBuilds = len(self.todo) + len(self.working) # Builds that may run concurrently with this one
+        bm.makeJobs = max(1, multiprocessing.cpu_count() // nbBuilds) # Split cores: make -j would oversubscribe
+        ctx = multiprocessing.get_context("fork") if hasattr(multiprocessing, "get_context") else multiprocessing
+        proc = ctx.Process(target=self.__work__, args=(bm, self.cpls[bm.getFlagSet()], logName))
+        proc.start()
+        self.todo.remove(bm)
+        self.working.append((bm, proc, logName))
+
+    def __end__(self, bm, proc, logName, ext):
+        """End building a benchmark: print its outputs, run it"""
+        self.working.remove((bm, proc, logName))
+        self.done.append(bm)
+        print("Benchmarking", bm.getName(), "...")
+        if os.path.exists(logName):
+            print(open(logName, "r").read(), end="")
+        if proc.exitcode != 0: # Download error or build error with stop option: stop like serial builds do
+            self.kill()
+            sys.exit("ERROR: " + bm.getName() + " pipeline KO")
+        bm.sched = self.sched
+        bm.run(ext)
+        print("") # Output separator for clarity
+
+    def add(self, bm):
+        """Add a benchmark to the pipeline"""
+        self.todo.append(bm)
+
+    def run(self, ext):
+        """Download and build benchmarks concurrently, run each benchmark as soon as it has been built"""
+        try:
+            while len(self.todo) > 0 or len(self.working) > 0:
+                for bm in list(self.todo):
+                    if self.__isReady__(bm):
+                        self.__start__(bm)
+                if self.sched:
+                    self.sched.nbBuilds = len(self.working) # Jobs that need the node alone must wait for builds
+                for bm, proc, logName in list(self.working):
+                    if not proc.is_alive():
+                        proc.join()
+                        self.__end__(bm, proc, logName, ext)
+                if self.sched:
+                    self.sched.nbBuilds = len(self.working)
+                    self.sched.poll()
+                time.sleep(0.1)
+        except KeyboardInterrupt:
+            self.kill()
+            raise
+
+    def kill(self):
+        """Kill running downloads and builds, and, scheduled jobs"""
+        self.todo = []
+        for working in self.working:
+            if working[1].is_alive():
+                working[1].terminate()
+        if self.sched:
+            self.sched.kill()
@@ -3,15 +3,17 @@
 from __future__ import print_function
 
 import os
+import shutil
 import subprocess
 import sys
 
 class download(object):
     """Download class designed to handle downloads"""
 
-    def __init__(self, tmp):
+    def __init__(self, tmp, mirror=None):
         """Initialize download class instance"""
         self.tmp = tmp
+        self.mirror = mirror # Directory laid out like tmp where downloads may already be available
         if not os.path.exists(self.tmp):
             os.makedirs(self.tmp)
 
@@ -24,11 +26,22 @@ class download(object):
         if stdout.find("failure".encode()) != -1 or stderr.find("failure".encode()) != -1:
             sys.exit("ERROR: download KO, can not access network")
 
+    def __getMirror__(self, dName):
+        """Get the mirrored version of a file or a directory to download from the current directory: None if none"""
+        if not self.mirror:
+            return None
+        mirror = os.path.join(self.mirror, os.path.relpath(os.getcwd(), self.tmp), dName)
+        return mirror if os.path.exists(mirror) else None
+
     def downloadFile(self, dldFile):
         """Download a file"""
         try:
             dFile = os.path.basename(dldFile)
-            if not os.path.exists(dFile):
+            mirror = self.__getMirror__(dFile)
+            if not os.path.exists(dFile) and mirror:
+                print("Downloading", dldFile, ": OK, copied from", mirror)
+                shutil.copyfile(mirror, dFile)
+            elif not os.path.exists(dFile):
                 self.__checkNetwork__()
                 print("Downloading", dldFile, "...")
                 rc = os.system("wget -a wget." + dFile + ".log " + dldFile)
@@ -43,7 +56,12 @@ class download(object):
         """Clone a git repository"""
         try:
             dDir = os.path.basename(url).replace(".git", "")
-            if not os.path.exists(dDir):
+            mirror = self.__getMirror__(dDir)
+            if not os.path.exists(dDir) and mirror:
+                print("Downloading", url, ": OK, copied from", mirror)
+                if subprocess.call(["git", "clone", "-q", mirror, dDir]) != 0: # Pristine sources (no build artifacts)
+                    sys.exit("ERROR: download KO, can not clone " + mirror)
+            elif not os.path.exists(dDir):
                 self.__checkNetwork__()
                 print("Downloading", url, "...")
                 rc = os.system("git clone -q " + url)
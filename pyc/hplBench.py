@@ -13,11 +13,12 @@ import stat
 import json
 
 from pyc.bench import bench
+from pyc.logFile import logFile
 
 class hplBench(bench):
     """Class dedicated to the HPLinpack benchmark"""
 
-    def __init__(self, args, blasDic, hplURL, hplVn, hplLID):
+    def __init__(self, args, blasDic, hplURL, hplVn, hplLID, hplSearch="EXHAUSTIVE"):
         """Initialize HPLinpack bench class instance"""
         bench.__init__(self, args, "HPLinpack", "GF")
         self.blasURL = blasDic["URL"]
@@ -26,6 +27,7 @@ class hplBench(bench):
         self.hplDir = "hpl-" + hplVn
         self.hplURL = hplURL
         self.hplLID = hplLID
+        self.hplSearch = hplSearch # Adaptive search (runs to the best configuration), or, exhaustive sweep
         self.arch = platform.system() + "_" + platform.machine()
 
     def __buildBlas__(self, cpl):
@@ -38,12 +40,18 @@ class hplBench(bench):
             self.__modifMakefile__(["make.inc"], ["PLAT"], [""])
             self.__modifMakefile__(["make.inc"], ["FORTRAN", "LOADER"], [cpl["FC"], cpl["FC"]])
             self.__modifMakefile__(["make.inc"], ["OPTS"], [cpl["FLAGS"]])
+            blasTGZ = os.path.join(self.tmp, "blas-" + self.blasDir[5:] + ".tgz")
+            key = self.cache.getKey([blasTGZ, "make.inc"], cpl)
+            if self.cache.restore("BLAS for " + self.bName, key, ["blas.a"]):
+                return
             log = open("make.log", "w")
             print("Building BLAS for", self.bName, "...", end="")
             start = time.time()
-            rc = subprocess.call(["make", "VERBOSE=1"], stdout=log, stderr=log)
+            rc = subprocess.call(self.__getMakeCmd__(["VERBOSE=1"]), stdout=log, stderr=log)
             if rc != 0:
                 self.buildError(log)
+            else:
+                self.cache.store("BLAS for " + self.bName, key, ["blas.a"])
             self.printStatus(start, rc)
 
     def __buildHPL__(self, cpl):
@@ -61,38 +69,47 @@ class hplBench(bench):
             oldOptions = ["TOPdir"]
             newOptions = [os.path.join(self.tmp, self.hplDir)]
             oldOptions += ["LAlib"]
-            if self.blasLib:
-                newOptions += [self.blasLib]
-            else:
-                newOptions += [os.path.join(self.tmp, self.blasDir, "blas.a")]
+            laLib = self.blasLib if self.blasLib else os.path.join(self.tmp, self.blasDir, "blas.a")
+            newOptions += [laLib]
             oldOptions += ["CCNOOPT"] # HPL_dlamch.c: aggressive optimisations trigger inifinite loops
             newOptions += ["$(F2CDEFS) " + cpl["NOOPTFLAGS"] + " $(HPL_INCLUDES)"]
             oldOptions += ["LINKFLAGS"]
             newOptions += [cpl["LINKFLAGS"]]
             self.__modifMakefile__(["Make." + self.arch], oldOptions, newOptions)
+            hplTGZ = os.path.join(self.tmp, "hpl-" + self.hplDir[4:] + ".tar.gz")
+            key = self.cache.getKey([hplTGZ, "Make." + self.arch, laLib], cpl) # BLAS matters too
+            targets = [os.path.join("bin", self.arch, "xhpl"), os.path.join("bin", self.arch, "HPL.dat")]
+            if self.cache.restore(self.bName, key, targets):
+                return
             log = open("make.log", "w")
             print("Building", self.bName, "...", end="")
             start = time.time()
+            # HPL makefiles are not parallel safe: build HPL with a serial make.
             rc = subprocess.call(["make", "arch=" + self.arch, "VERBOSE=1"], stdout=log, stderr=log)
             if rc != 0:
                 self.buildError(log)
+            else:
+                self.cache.store(self.bName, key, targets)
             self.printStatus(start, rc)
 
-    def __writeHPLFile__(self, hplPS, hplDiv, hplBlock, n):
-        """Write input file for HPLinpack runs"""
+    @staticmethod
+    def __getGrids__(n):
+        """Get all process grids P x Q of n processes (HPL handles up to 20 grids per run)"""
+        grids = [(p, n // p) for p in range(1, n + 1) if n % p == 0]
+        grids.sort(key=lambda g: abs(g[0] - g[1])) # Nearly square grids first: they are usually the best
+        return grids[:20]
+
+    def __writeHPLFile__(self, hplPS, hplDiv, hplBlock, n, datDir=".", grid=None):
+        """Write input file for HPLinpack runs: all process grids are evaluated in one run (or a given grid)"""
         lines = open("HPL.dat.ini", "r").readlines()
         lines[4] = "1" + "\n" # Number of problems
         lines[5] = str(hplPS // hplDiv) + "\n" # Problem size
         lines[6] = "1" + "\n"
         lines[7] = str(hplPS // hplDiv // hplBlock) + "\n" # Problem block size
-        if n > 1 and int(math.sqrt(n)) ** 2 == n: # Number of process grid
-            lines[9] = "2" + "\n" # Play on load balancing
-            lines[10] = str(n) + " " + str(int(math.sqrt(n))) + "\n"
-            lines[11] = "1" + " " + str(int(math.sqrt(n))) + "\n"
-        else: # Number of process grid
-            lines[9] = "1" + "\n"
-            lines[10] = str(n) + "\n"
-            lines[11] = "1" + "\n"
+        grids = [grid] if grid else self.__getGrids__(n)
+        lines[9] = str(len(grids)) + "\n" # Number of process grids
+        lines[10] = " ".join([str(g[0]) for g in grids]) + "\n" # Ps
+        lines[11] = " ".join([str(g[1]) for g in grids]) + "\n" # Qs
         if not self.args.more:
             lines[13] = "1" + "\n"
             lines[14] = "0" + "\n" # PFACTs
@@ -100,31 +117,34 @@ class hplBench(bench):
             lines[16] = "2" + "\n" # NBMINs
             lines[19] = "1" + "\n"
             lines[20] = "0" + "\n" # RFACTs
-        open("HPL.dat", "w").writelines(lines)
+        if not os.path.exists(datDir):
+            os.makedirs(datDir)
+        open(os.path.join(datDir, "HPL.dat"), "w").writelines(lines)
 
-    def __getMetricFromLine__(self, line, maxGFlops, log, dicGFlops):
-        """Get metric from a line of a log"""
-        maxInfo = {}
-        if len(line.split()) == 7:
-            if len(line) > 1 and line[0] == "W":
+    def __parseLog__(self, log):
+        """Parse a HPLinpack log"""
+        records = []
+        logTokens = self.splitLogName(log)
+        step = logTokens["n="] + "." + logTokens["t="]
+        for line in self.readLog(log):
+            if len(line.split()) == 7 and len(line) > 1 and line[0] == "W":
                 GF = float(line.split()[6])
                 N = int(line.split()[1])
                 NB = int(line.split()[2])
-                if maxGFlops < GF:
-                    maxGFlops = GF
-                    maxInfo["LOG"] = os.path.basename(log)
-                    maxInfo["EXTRA"] = "N = " + str(N) + ", NB = " + str(NB)
-                if N not in dicGFlops:
-                    dicGFlops[N] = {}
-                if NB not in dicGFlops[N]:
-                    dicGFlops[N][NB] = {}
-                logTokens = self.splitLogName(log)
-                step = logTokens["n="] + "." + logTokens["t="]
-                if step not in dicGFlops[N][NB]:
-                    dicGFlops[N][NB][step] = GF
-                if dicGFlops[N][NB][step] < GF:
-                    dicGFlops[N][NB][step] = GF
-        return maxGFlops, maxInfo
+                P, Q = int(line.split()[3]), int(line.split()[4])
+                extra = "N = " + str(N) + ", NB = " + str(NB) + ", P = " + str(P) + ", Q = " + str(Q)
+                records.append(((N, NB, step), GF, extra))
+        return records
+
+    def __getBestGrid__(self, log):
+        """Get the process grid P x Q of the best run of a log"""
+        maxGF, grid = 0., None
+        for line in self.readLog(log):
+            if len(line.split()) == 7 and len(line) > 1 and line[0] == "W":
+                if float(line.split()[6]) > maxGF:
+                    maxGF = float(line.split()[6])
+                    grid = (int(line.split()[3]), int(line.split()[4]))
+        return grid
 
     def downloadTmp(self):
         """Download HPLinpack benchmark in the temporary directory"""
@@ -161,6 +181,109 @@ class hplBench(bench):
         self.__buildBlas__(cpl)
         self.__buildHPL__(cpl)
 
+    def __getSearchSpace__(self, hplPS):
+        """Get the search space of HPLinpack runs: problem size divisors and block numbers"""
+        hplDivs = []
+        minBlockNb = 4
+        for hplDiv in [4096, 2048, 1024, 512, 256, 128, 64, 32, 16, 8, 4]:
+            if self.args.quick:
+                if hplPS // hplDiv // minBlockNb > 8:
+                    break # Big blocks are less efficient
+            hplDivs.append(hplDiv)
+        hplBlockSize = [bs for bs in range(minBlockNb, 11)] # Up to 10%
+        if self.args.more:
+            hplBlockSize = [bs for bs in range(minBlockNb, 21)] # Up to 5%
+        return hplDivs, hplBlockSize
+
+    def __runHPL__(self, hplCfg, hplDiv, hplBlock):
+        """Run HPLinpack for a given problem size divisor and block number: return the log"""
+        n, t, runTokens, ext, hplPS, hplBlockSize = hplCfg
+        runDir = os.path.join(self.tmp, self.hplDir, "bin", self.arch)
+        hplTokens = [("size", hplPS, "s"), ("div", hplDiv, "d", 4096)]
+        hplTokens += [("block", hplBlock, "d", max(hplBlockSize))]
+        hplTokens += runTokens
+        hplExt = ext
+        for logID in self.hplLID:
+            hplExt = "." + logID + ext
+        hplLog = self.buildLogName("HPL", hplTokens, hplExt)
+        clDic = {}
+        clDic["PREPEND"] = ["mpirun", "-n", str(n)]
+        clDic["EXE"] = "./xhpl"
+        if self.sched: # xhpl reads HPL.dat in its working directory: concurrent runs need their own
+            clDic["CWD"] = os.path.join(runDir, "jobs", os.path.splitext(hplLog)[0])
+            clDic["EXE"] = os.path.join(runDir, "xhpl")
+        if self.needRun(hplLog):
+            self.__writeHPLFile__(hplPS, hplDiv, hplBlock, n, clDic["CWD"] if "CWD" in clDic else ".")
+        self.runLog(hplLog, clDic, thd=t, cores=n * t)
+        return hplLog
+
+    def __evalHPLPoints__(self, dicGF, hplCfg, points):
+        """Evaluate points of the search space: run HPLinpack (if not yet done), get their best GFlops"""
+        hplLogs = []
+        for hplDiv, hplBlock in points:
+            if (hplDiv, hplBlock) not in dicGF:
+                dicGF[(hplDiv, hplBlock)] = 0. # Unfeasible point, or, failed run
+                if hplCfg[4] // hplDiv // hplBlock > 0: # Submit all points before to wait: they run concurrently
+                    hplLogs.append(((hplDiv, hplBlock), self.__runHPL__(hplCfg, hplDiv, hplBlock)))
+        for point, hplLog in hplLogs:
+            if self.sched:
+                self.sched.waitFor(hplLog) # The search needs the result to go on
+            hplLog = logFile.find(hplLog)
+            if hplLog:
+                records = self.store.getRecords(self.bName, [hplLog], self.splitLogName, self.__parseLog__)
+                for record in records[os.path.abspath(hplLog)]:
+                    dicGF[point] = max(dicGF[point], record[1])
+        return [dicGF[point] for point in points]
+
+    def __evalHPL__(self, dicGF, hplCfg, hplDiv, hplBlock):
+        """Evaluate a point of the search space: run HPLinpack (if not yet done), get its best GFlops"""
+        return self.__evalHPLPoints__(dicGF, hplCfg, [(hplDiv, hplBlock)])[0]
+
+    def __searchAxis__(self, dicGF, hplCfg, points):
+        """Golden section search of the best point along an axis (GFlops are supposed to be unimodal)"""
+        lo, hi = 0, len(points) - 1
+        while hi - lo > 2:
+            m1 = lo + int(round((hi - lo) * 0.382))
+            m2 = max(m1 + 1, lo + int(round((hi - lo) * 0.618)))
+            gf1, gf2 = self.__evalHPLPoints__(dicGF, hplCfg, [points[m1], points[m2]]) # Both probes at once
+            if gf1 < gf2:
+                lo = m1
+            else:
+                hi = m2
+        best = points[lo]
+        self.__evalHPLPoints__(dicGF, hplCfg, points[lo:hi + 1])
+        for point in points[lo:hi + 1]:
+            if self.__evalHPL__(dicGF, hplCfg, *point) > self.__evalHPL__(dicGF, hplCfg, *best):
+                best = point
+        return best
+
+    def __searchHPL__(self, hplCfg):
+        """Search the best HPLinpack configuration: coordinate search over problem size (N) and block size (NB)"""
+        hplPS = hplCfg[4]
+        hplDivs, hplBlockSize = self.__getSearchSpace__(hplPS)
+        if len(hplDivs) == 0:
+            return
+        dicGF = {}
+        hplDiv = hplDivs[-1] # HPL tuning guide: the biggest problem that fits the memory
+        nbTarget = 128 # HPL tuning guide: NB in [32, 256]
+        hplBlock = hplBlockSize[0]
+        for bs in hplBlockSize:
+            if abs(hplPS // hplDiv // bs - nbTarget) < abs(hplPS // hplDiv // hplBlock - nbTarget):
+                hplBlock = bs
+        best = (hplDiv, hplBlock)
+        bestGF = self.__evalHPL__(dicGF, hplCfg, *best)
+        while True:
+            prevGF = bestGF
+            best = self.__searchAxis__(dicGF, hplCfg, [(div, best[1]) for div in hplDivs]) # N
+            best = self.__searchAxis__(dicGF, hplCfg, [(best[0], bs) for bs in hplBlockSize]) # NB
+            bestGF = dicGF[best]
+            if bestGF <= prevGF * 1.01: # Stop when GFlops do not improve anymore
+                break
+        nbRuns = len([pt for pt in dicGF if hplPS // pt[0] // pt[1] > 0])
+        nbPoints = len([1 for div in hplDivs for bs in hplBlockSize if hplPS // div // bs > 0])
+        print("Searching %s: best = %11.3f GFlops, div = %d, block = %d (%d runs out of %d)" % \
+              (self.bName, bestGF, best[0], best[1], nbRuns, nbPoints))
+
     def runNT(self, n, t, runTokens, ext):
         """Run HPLinpack benchmark in the temporary directory for a given proc and thread configuration"""
         runDir = os.path.join(self.tmp, self.hplDir, "bin", self.arch)
@@ -171,51 +294,22 @@ class hplBench(bench):
             hplPS = self.args.size * 1024. ** 3 # 1GB by default
             hplPS = int(hplPS / 8)
             hplPS = int(math.sqrt(hplPS)) # According to HPL tuning guide
-            for hplDiv in [4096, 2048, 1024, 512, 256, 128, 64, 32, 16, 8, 4]:
-                minBlockNb = 4
-                if self.args.quick:
-                    if hplPS // hplDiv // minBlockNb > 8:
-                        break # Big blocks are less efficient
-                hplBlockSize = [bs for bs in range(minBlockNb, 11)] # Up to 10%
-                if self.args.more:
-                    hplBlockSize = [bs for bs in range(minBlockNb, 21)] # Up to 5%
+            hplDivs, hplBlockSize = self.__getSearchSpace__(hplPS)
+            hplCfg = (n, t, runTokens, ext, hplPS, hplBlockSize)
+            if self.hplSearch == "ADAPTIVE":
+                self.__searchHPL__(hplCfg)
+                return
+            for hplDiv in hplDivs: # Exhaustive sweep
                 for hplBlock in hplBlockSize:
                     if hplPS // hplDiv // hplBlock <= 0:
                         continue
-                    hplTokens = [("size", hplPS, "s"), ("div", hplDiv, "d", 4096)]
-                    hplTokens += [("block", hplBlock, "d", max(hplBlockSize))]
-                    hplTokens += runTokens
-                    hplExt = ext
-                    for logID in self.hplLID:
-                        hplExt = "." + logID + ext
-                    hplLog = self.buildLogName("HPL", hplTokens, hplExt)
-                    print("Running", hplLog, "...", end="")
-                    start = time.time()
-                    rc = 0
-                    if not os.path.exists(hplLog) or self.args.force:
-                        self.__writeHPLFile__(hplPS, hplDiv, hplBlock, n)
-                        log = open(hplLog, "w")
-                        clDic = {}
-                        clDic["PREPEND"] = ["mpirun", "-n", str(n)]
-                        clDic["EXE"] = "./xhpl"
-                        rc = self.runCmdLine(log, clDic, begin=start, thd=t)
-                    self.printStatus(start, rc)
+                    self.__runHPL__(hplCfg, hplDiv, hplBlock)
 
     def getMetric(self, printMax=True, getDict=False, getMaxInfo=False, filterLogs=False):
         """Getting HPLinpack benchmark metric from the temporary directory"""
-        maxGFlops = 0.
-        dicGFlops = {}
-        maxInfo = {}
         runDir = os.path.join(self.tmp, self.hplDir, "bin", self.arch)
-        if os.path.exists(runDir):
-            os.chdir(runDir)
-            for log in self.__listLogs__(os.path.join(runDir, "HPL*.log"), filterLogs):
-                lines = open(log, "r").readlines()
-                for line in lines:
-                    mGFlops, mInfo = self.__getMetricFromLine__(line, maxGFlops, log, dicGFlops)
-                    if maxGFlops < mGFlops:
-                        maxGFlops = mGFlops
-                        maxInfo = mInfo
+        logRegExp = os.path.join(runDir, "HPL*.log")
+        maxGFlops, dicGFlops, maxInfo = self.__getMetricFromStore__(logRegExp, filterLogs)
         self.__printMetricStatus__(printMax, maxGFlops, maxInfo)
         return self.__returnMetric__(dicGFlops, maxInfo, maxGFlops, getDict=getDict, getMaxInfo=getMaxInfo)
 
@@ -238,19 +332,20 @@ class hplBench(bench):
             if os.path.exists(os.path.join(runDir, "HPL.dat.ini")):
                 shutil.copyfile(os.path.join(runDir, "HPL.dat.ini"), "HPL.dat.ini")
                 logTokens = self.splitLogName(maxInfo["LOG"])
-                hplPS = int(logTokens["size="].split("=")[1])
-                hplDiv = int(logTokens["div="].split("=")[1])
-                hplBlock = int(logTokens["block="].split("=")[1])
-                n = int(logTokens["n="].split("=")[1])
-                self.__writeHPLFile__(hplPS, hplDiv, hplBlock, n)
+                hplPS = int(logTokens.get("size"))
+                hplDiv = int(logTokens.get("div"))
+                hplBlock = int(logTokens.get("block"))
+                n = int(logTokens.get("n"))
+                grid = self.__getBestGrid__(os.path.join(runDir, maxInfo["LOG"])) # Run the best grid only
+                self.__writeHPLFile__(hplPS, hplDiv, hplBlock, n, grid=grid)
                 runSh = open("run.sh", "w")
                 runSh.write("#!/bin/bash" + "\n")
                 runSh.write("cp ../HPL.dat ." + "\n") # Copy HPLinpack input file
                 runSh.close() # Flush
                 jsCfg = {}
                 jsCfg["EXE"] = "xhpl"
-                jsCfg["MPI"] = str(logTokens["n="].split("=")[1])
-                jsCfg["THD"] = str(logTokens["t="].split("=")[1])
+                jsCfg["MPI"] = str(logTokens.get("n"))
+                jsCfg["THD"] = str(logTokens.get("t"))
                 jsCfg["COLOR"] = "red"
                 jsCfg["MARKER"] = "."
                 jsCfg["LABEL"] = self.bName
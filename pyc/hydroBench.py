@@ -85,13 +85,19 @@ class hydroBench(bench):
             newOptions += ["-DFTI=0", ""]
             self.__modifMakefile__(["make.inc"], oldOptions, newOptions)
             self.__modifMakefile__(["Makefile"], [], [], comments=["vec-report"])
+            params = {"GIT": self.cache.getGitRevision(os.path.join(self.tmp, self.hydroDir, "Hydro"))}
+            key = self.cache.getKey(["make.inc", "Makefile", self.hydroBuild["LIBNUMA"]], cpl, params)
+            if self.cache.restore(self.bName, key, ["hydro"]):
+                return
             log = open("make.log", "w")
             print("Building", self.bName, ":", hydroImpl, "...", end="")
             start = time.time()
-            rc = subprocess.call(["make"], stdout=log, stderr=log)
+            rc = subprocess.call(self.__getMakeCmd__([]), stdout=log, stderr=log)
             if rc != 0:
                 m = self.bName + " (" + hydroImpl + ", needs libnuma.a)"
                 self.buildError(log, msg=m)
+            else:
+                self.cache.store(self.bName, key, ["hydro"])
             self.printStatus(start, rc)
 
     def runNT(self, n, t, runTokens, ext):
@@ -108,59 +114,41 @@ class hydroBench(bench):
                 nmlLog = self.__writeNML__(hydroImpl, nxy, nxyStep, runTokens)
                 hydroExt = ext if len(self.hydroLID) == 0 else "." + ".".join(self.hydroLID) + ext
                 hydroLog = nmlLog.replace(".nml", hydroExt)
-                print("Running", hydroLog, "...", end="")
-                start = time.time()
-                rc = 0
-                if not os.path.exists(hydroLog) or self.args.force:
-                    log = open(hydroLog, "w")
-                    clDic = {}
-                    clDic["PREPEND"] = ["mpirun", "-n", str(n)]
-                    clDic["EXE"] = "./hydro"
-                    clDic["ARGS"] = ["-i", "./" + nmlLog]
-                    rc = self.runCmdLine(log, clDic, begin=start, thd=t)
-                self.printStatus(start, rc)
+                clDic = {}
+                clDic["PREPEND"] = ["mpirun", "-n", str(n)]
+                clDic["EXE"] = "./hydro"
+                clDic["ARGS"] = ["-i", "./" + nmlLog]
+                self.runLog(hydroLog, clDic, thd=t, cores=n * t)
                 if self.args.quick:
                     break
 
+    def __parseLog__(self, log):
+        """Parse a Hydro log"""
+        mGFlops, extra, nxy, nxystep = None, None, None, None
+        for line in self.readLog(log):
+            if line.find("|nx=") != -1:
+                nxy = line.split("=")[1]
+                nxy = int(nxy.split()[0])
+            if line.find("|nxystep=") != -1:
+                nxystep = line.split("=")[1]
+                nxystep = int(nxystep.split()[0])
+            if line.find("Hydro ends") != -1:
+                mGFlops = float(line.split()[5].replace("<", ""))
+                mGFlops = mGFlops / 1024.
+                extra = "nxy = " + str(nxy) +", nxystep = " + str(nxystep)
+                break # End of relevant data
+        if not nxy or not nxystep or not mGFlops:
+            return []
+        logTokens = self.splitLogName(log)
+        step = logTokens["n="] + "." + logTokens["t="]
+        return [((nxy, nxystep, step), mGFlops, extra)]
+
     def getMetric(self, printMax=True, getDict=False, getMaxInfo=False, filterLogs=False):
         """Getting Hydro benchmark metric from the temporary directory"""
-        maxGFlops = 0.
-        dicGFlops = {}
-        maxInfo = {}
         hydroImpl = "HydroC99_2DMpi"
         runDir = os.path.join(self.tmp, self.hydroDir, "Hydro", "HydroC", hydroImpl, "Src")
-        if os.path.exists(runDir):
-            os.chdir(runDir)
-            for log in self.__listLogs__(os.path.join(runDir, "Hydro*.log"), filterLogs):
-                mGFlops, mInfo, nxy, nxystep = None, {}, None, None
-                lines = open(log, "r").readlines()
-                for line in lines:
-                    if line.find("|nx=") != -1:
-                        nxy = line.split("=")[1]
-                        nxy = int(nxy.split()[0])
-                    if line.find("|nxystep=") != -1:
-                        nxystep = line.split("=")[1]
-                        nxystep = int(nxystep.split()[0])
-                    if line.find("Hydro ends") != -1:
-                        mGFlops = float(line.split()[5].replace("<", ""))
-                        mGFlops = mGFlops / 1024.
-                        mInfo["LOG"] = os.path.basename(log)
-                        mInfo["EXTRA"] = "nxy = " + str(nxy) +", nxystep = " + str(nxystep)
-                if not nxy or not nxystep or not mGFlops:
-                    continue
-                if nxy not in dicGFlops:
-                    dicGFlops[nxy] = {}
-                if nxystep not in dicGFlops[nxy]:
-                    dicGFlops[nxy][nxystep] = {}
-                logTokens = self.splitLogName(log)
-                step = logTokens["n="] + "." + logTokens["t="]
-                if step not in dicGFlops[nxy][nxystep]:
-                    dicGFlops[nxy][nxystep][step] = mGFlops
-                if dicGFlops[nxy][nxystep][step] < mGFlops:
-                    dicGFlops[nxy][nxystep][step] = mGFlops
-                if maxGFlops < mGFlops:
-                    maxGFlops = mGFlops
-                    maxInfo = mInfo
+        logRegExp = os.path.join(runDir, "Hydro*.log")
+        maxGFlops, dicGFlops, maxInfo = self.__getMetricFromStore__(logRegExp, filterLogs)
         self.__printMetricStatus__(printMax, maxGFlops, maxInfo)
         return self.__returnMetric__(dicGFlops, maxInfo, maxGFlops, getDict=getDict, getMaxInfo=getMaxInfo)
 
@@ -184,7 +172,8 @@ class hydroBench(bench):
             logTokens = self.splitLogName(maxInfo["LOG"])
             nmlLog = "Hydro" + "." + logTokens["impl="]
             nmlLog = nmlLog + "." + logTokens["nxy="] + "." + logTokens["nxystep="]
-            nmlLog = nmlLog + "." + logTokens["n="] + "." + logTokens["t="] + ".nml"
+            nmlLog = nmlLog + "." + logTokens["n="] + "." + logTokens["t="]
+            nmlLog = nmlLog + ("." + logTokens["rep="] if "rep=" in logTokens else "") + ".nml"
             shutil.copyfile(os.path.join(runDir, nmlLog), nmlLog)
             runSh = open("run.sh", "w")
             runSh.write("#!/bin/bash" + "\n")
@@ -192,8 +181,8 @@ class hydroBench(bench):
             runSh.close() # Flush
             jsCfg = {}
             jsCfg["EXE"] = "hydro"
-            jsCfg["MPI"] = str(logTokens["n="].split("=")[1])
-            jsCfg["THD"] = str(logTokens["t="].split("=")[1])
+            jsCfg["MPI"] = str(logTokens.get("n"))
+            jsCfg["THD"] = str(logTokens.get("t"))
             jsCfg["ARGS"] = "-i " + nmlLog
             jsCfg["COLOR"] = "green"
             jsCfg["MARKER"] = "."
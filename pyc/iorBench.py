@@ -3,6 +3,7 @@
 from __future__ import print_function
 
 import os
+import copy
 import subprocess
 import time
 import shutil
@@ -10,6 +11,7 @@ import stat
 import json
 
 from pyc.bench import bench
+from pyc.logFile import logFile
 
 class iorBench(bench):
     """Class dedicated to the IOR benchmark"""
@@ -23,58 +25,141 @@ class iorBench(bench):
         self.runCfg = runCfg
         self.logID = logID
         self.steps = []
+        self.alone = True # Disk is shared and IOR writes its test file in the run directory
         self.moreOpt = [("POSIX", "-e", "fsync")]
         self.moreOpt += [("MPIIO", "-c", "colIO"), ("MPIIO", "-V", "fview"), ("MPIIO", "-p", "alloc")]
         self.moreOpt += [("HDF5", "-c", "colIO"), ("HDF5", "-I", "indds")]
 
-    def __runBTJMore__(self, moreTokens, iorExt, clDic, opt):
+    def __runBTJMore__(self, moreTokens, iorExt, clDic, opt, n):
         """Run more configurations from a given IOR test"""
         iorLog = self.buildLogName("IOR", moreTokens, iorExt)
-        print("Running", iorLog, "...", end="")
-        start = time.time()
-        rc = 0
-        if not os.path.exists(iorLog) or self.args.force:
-            log = open(iorLog, "w")
-            cpClDic = clDic
+        cpClDic = copy.copy(clDic) # The test command line must not grow over more configurations
+        if self.needRun(iorLog):
             cpClDic["ARGS"] = cpClDic["ARGS"] + [opt]
-            rc = self.runCmdLine(log, cpClDic, begin=start)
-        self.printStatus(start, rc)
+        self.runLog(iorLog, cpClDic, cores=n)
+
+    def __runBTJA__(self, btja, n, runTokens, ext, more=False):
+        """Run one IOR test for a given API (and more configurations if needed): return the log"""
+        b, t, j, a = btja
+        iorTokens = [("block", b, "4s")]
+        iorTokens += [("transfer", t, "4s")]
+        iorTokens += [("align", j, "4s")]
+        iorA = "PHDF5" if a == "HDF5" else a
+        iorExt = ext if len(self.logID) == 0 else "." + ".".join(self.logID) + ext
+        iorLog = self.buildLogName("IOR", iorTokens + [("a", iorA, "s")] + runTokens, "." + "xxxxx" + iorExt)
+        clDic = {}
+        clDic["EXE"] = "./ior"
+        clDic["ARGS"] = ["-a", a, "-b", b, "-t", t, "-J", j, "-r", "-w", "-vvv"]
+        for opt in self.runCfg["OTHER"]:
+            clDic["ARGS"] = clDic["ARGS"] + [opt]
+        if n > 1:
+            clDic["PREPEND"] = ["mpirun", "-n", str(n)]
+        self.runLog(iorLog, clDic, cores=n)
+        if more:
+            for opt in self.moreOpt:
+                if opt[0].find(a) != -1:
+                    moreTokens = iorTokens + [("a", iorA, "s")] + runTokens
+                    self.__runBTJMore__(moreTokens, "." + opt[2] + iorExt, clDic, opt[1], n)
+        return iorLog
 
     def __runBTJ__(self, idx, n, runTokens, ext):
         """Run one IOR test"""
         b = self.runCfg["-b"][idx]
         t = self.runCfg["-t"][idx]
         j = self.runCfg["-J"][idx]
-        iorTokens = [("block", b, "4s")]
-        iorTokens += [("transfer", t, "4s")]
-        iorTokens += [("align", j, "4s")]
         for a in self.runCfg["-a"]:
             if a == "POSIX" and n != 1:
                 continue
-            iorA = "PHDF5" if a == "HDF5" else a
-            iorExt = ext if len(self.logID) == 0 else "." + ".".join(self.logID) + ext
-            iorLog = self.buildLogName("IOR", iorTokens + [("a", iorA, "s")] + runTokens, "." + "xxxxx" + iorExt)
-            print("Running", iorLog, "...", end="")
-            start = time.time()
-            rc = 0
-            clDic = {}
-            if not os.path.exists(iorLog) or self.args.force:
-                log = open(iorLog, "w")
-                clDic = {}
-                clDic["EXE"] = "./ior"
-                clDic["ARGS"] = ["-a", a, "-b", b, "-t", t, "-J", j, "-r", "-w", "-vvv"]
-                for opt in self.runCfg["OTHER"]:
-                    clDic["ARGS"] = clDic["ARGS"] + [opt]
-                if n > 1:
-                    clDic["PREPEND"] = ["mpirun", "-n", str(n)]
-                rc = self.runCmdLine(log, clDic, begin=start)
-            self.printStatus(start, rc)
-            if self.args.more:
-                for opt in self.moreOpt:
-                    if opt[0].find(a) != -1:
-                        iorA = "PHDF5" if a == "HDF5" else a
-                        moreTokens = iorTokens + [("a", iorA, "s")] + runTokens
-                        self.__runBTJMore__(moreTokens, "." + opt[2] + iorExt, clDic, opt[1])
+            self.__runBTJA__((b, t, j, a), n, runTokens, ext, more=self.args.more)
+
+    @staticmethod
+    def __getBytes__(size):
+        """Convert an IOR size (like 4k, 2m) to bytes"""
+        units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+        if size[-1].lower() in units:
+            return int(size[:-1]) * units[size[-1].lower()]
+        return int(size)
+
+    @staticmethod
+    def __getSize__(nbBytes):
+        """Convert bytes to an IOR size (like 4k, 2m)"""
+        for unit, unitBytes in [("g", 1024 ** 3), ("m", 1024 ** 2), ("k", 1024)]:
+            if nbBytes % unitBytes == 0:
+                return str(nbBytes // unitBytes) + unit
+        return str(nbBytes)
+
+    def __getSearchSpace__(self):
+        """Get the search space of IOR runs: sizes (powers of 2, bytes) from the minimum to the maximum"""
+        sizes = []
+        size = self.__getBytes__(self.runCfg["MIN"])
+        while size <= self.__getBytes__(self.runCfg["MAX"]):
+            sizes.append(size)
+            size *= 2
+        return sizes
+
+    def __evalIOR__(self, dicMBs, iorCfg, a, b, t):
+        """Evaluate a point of the search space: run IOR (if not yet done), get its best MB/s (read or write)"""
+        if (a, b, t) not in dicMBs:
+            n, runTokens, ext = iorCfg
+            dicMBs[(a, b, t)] = 0. # Failed run
+            size = self.__getSize__(t)
+            iorLog = self.__runBTJA__((self.__getSize__(b), size, size, a), n, runTokens, ext) # Align on transfer
+            if self.sched:
+                self.sched.waitFor(iorLog) # The search needs the result to go on
+            iorLog = logFile.find(iorLog)
+            if iorLog:
+                records = self.store.getRecords(self.bName, [iorLog], self.splitLogName, self.__parseLog__)
+                for record in records[os.path.abspath(iorLog)]:
+                    dicMBs[(a, b, t)] = max(dicMBs[(a, b, t)], record[1])
+        return dicMBs[(a, b, t)]
+
+    def __refineIOR__(self, dicMBs, iorCfg, a, sizes, budget):
+        """Refine around the best point of an API: climb to the best neighbour (half or twice block or transfer)"""
+        best = max([pt for pt in dicMBs if pt[0] == a], key=lambda pt: dicMBs[pt])
+        while True:
+            neighbours = [(a, best[1] * fb // 2, best[2] * ft // 2) for fb in [1, 2, 4] for ft in [1, 2, 4]]
+            neighbours = [pt for pt in neighbours if pt[1] in sizes and pt[2] in sizes and pt[1] >= pt[2]]
+            for pt in neighbours:
+                if pt not in dicMBs and len([p for p in dicMBs if p[0] == a]) >= budget:
+                    break # Budget spent: the search never runs more than the exhaustive lists
+                self.__evalIOR__(dicMBs, iorCfg, *pt)
+            neighbours = [pt for pt in neighbours if pt in dicMBs]
+            if len(neighbours) == 0:
+                break
+            bestNb = max(neighbours, key=lambda pt: dicMBs[pt])
+            if dicMBs[bestNb] <= dicMBs[best] * 1.01: # Stop when MB/s do not improve anymore
+                break
+            best = bestNb
+        return best
+
+    def __searchIOR__(self, iorCfg):
+        """Search the best IOR configurations: coarse grid, drop dominated APIs, refine around the best points"""
+        n, runTokens, ext = iorCfg
+        sizes = self.__getSearchSpace__()
+        apis = [a for a in self.runCfg["-a"] if a != "POSIX" or n == 1]
+        if len(sizes) == 0 or len(apis) == 0:
+            return
+        dicMBs = {}
+        coarse = sorted(set([sizes[0], sizes[len(sizes) // 2], sizes[-1]])) # Minimum, middle and maximum sizes
+        for a in apis:
+            for b in coarse:
+                for t in [t for t in coarse if t <= b]: # Block size must be a multiple of transfer size
+                    self.__evalIOR__(dicMBs, iorCfg, a, b, t)
+        bestMBs = max(dicMBs.values())
+        for a in apis:
+            apiMBs = max([dicMBs[pt] for pt in dicMBs if pt[0] == a])
+            if apiMBs < 0.5 * bestMBs: # Dominated API: not worth refining
+                print("Searching %s: API %s dropped (%11.3f MB/s on coarse grid)" % (self.bName, a, apiMBs))
+                continue
+            budget = len(self.runCfg["-b"]) if len(self.runCfg["-b"]) > 0 else 2 * len(dicMBs) // len(apis)
+            best = self.__refineIOR__(dicMBs, iorCfg, a, sizes, budget)
+            if self.args.more: # More configurations are only run at the best point
+                size = self.__getSize__(best[2])
+                self.__runBTJA__((self.__getSize__(best[1]), size, size, a), n, runTokens, ext, more=True)
+            nbPoints = len([1 for b in sizes for t in sizes if t <= b])
+            print("Searching %s: best = %11.3f MB/s, a = %s, block = %s, transfer = %s (%d runs out of %d)" % \
+                  (self.bName, dicMBs[best], a, self.__getSize__(best[1]), self.__getSize__(best[2]),
+                   len([pt for pt in dicMBs if pt[0] == a]), nbPoints))
 
     def downloadTmp(self):
         """Download IOR benchmark in the temporary directory"""
@@ -90,6 +175,11 @@ class iorBench(bench):
         buildDir = os.path.join(self.tmp, self.iorDir, "ior")
         if os.path.exists(buildDir):
             os.chdir(buildDir)
+            params = {"GIT": self.cache.getGitRevision(buildDir), "CONFIGURE": self.optCfg}
+            key = self.cache.getKey([], cpl, params)
+            targets = [os.path.join("src", "ior"), os.path.join("src", "mdtest")]
+            if self.cache.restore(self.bName, key, targets):
+                return
             if not os.path.exists("configure"):
                 log = open("bootstrap.log", "w")
                 rc = subprocess.call(["./bootstrap"], stdout=log, stderr=log)
@@ -110,66 +200,61 @@ class iorBench(bench):
             log = open("make.log", "w")
             print("Building", self.bName, "...", end="")
             start = time.time()
-            rc = subprocess.call(["make"], stdout=log, stderr=log)
+            rc = subprocess.call(self.__getMakeCmd__([]), stdout=log, stderr=log)
             if rc != 0:
                 m = self.bName + " (build KO)"
                 self.buildError(log, msg=m)
+            else:
+                self.cache.store(self.bName, key, targets)
             self.printStatus(start, rc)
 
     def runNT(self, n, t, runTokens, ext):
         """Run IOR benchmark in the temporary directory for a given proc and thread configuration"""
         if t != 1:
             return
+        runDir = os.path.join(self.tmp, self.iorDir, "ior", "src")
+        if self.runCfg["SEARCH"] == "ADAPTIVE":
+            if os.path.exists(runDir):
+                os.chdir(runDir)
+                self.__searchIOR__((n, runTokens, ext))
+            return
         if len(self.runCfg["-b"]) != len(self.runCfg["-t"]):
             print("Running IOR KO: -b and -t must have the same size")
             return
         if len(self.runCfg["-b"]) != len(self.runCfg["-J"]):
             print("Running IOR KO: -b and -J must have the same size")
             return
-        runDir = os.path.join(self.tmp, self.iorDir, "ior", "src")
         if os.path.exists(runDir):
             os.chdir(runDir)
             for idx in range(len(self.runCfg["-b"])):
                 self.__runBTJ__(idx, n, runTokens, ext)
 
+    def __parseLog__(self, log):
+        """Parse an IOR log"""
+        records = []
+        logTokens = self.splitLogName(log)
+        b = logTokens["block="].split("=")[1] # Plot keys: keep log name format (old logs have no manifest)
+        t = logTokens["transfer="].split("=")[1]
+        step = logTokens["align="].split("=")[1]
+        step += "." + logTokens["a="].split("=")[1]
+        step += "." + logTokens["n="] + "." + logTokens["t="]
+        for opt in self.moreOpt:
+            if opt[2] in logTokens:
+                step += "." + opt[2]
+        extra = "block size = " + b + ", transfer size = " + t + ", step = " + step.split(".")[2]
+        for line in self.readLog(log):
+            if line.find("Max Write") != -1:
+                records.append(((b, t, step + "." + "write"), float(line.split()[4][1:]), extra))
+            if line.find("Max Read") != -1:
+                records.append(((b, t, step + "." + "read"), float(line.split()[4][1:]), extra))
+        return records
+
     def getMetric(self, printMax=True, getDict=False, getMaxInfo=False, filterLogs=False):
         """Getting IOR benchmark metric from the temporary directory"""
-        maxMBs = 0.
-        dicMBs = {}
-        maxInfo = {}
         runDir = os.path.join(self.tmp, self.iorDir, "ior", "src")
-        if os.path.exists(runDir):
-            os.chdir(runDir)
-            for log in self.__listLogs__(os.path.join(runDir, "IOR*.log"), filterLogs):
-                logTokens = self.splitLogName(log)
-                b = logTokens["block="].split("=")[1]
-                t = logTokens["transfer="].split("=")[1]
-                if b not in dicMBs:
-                    dicMBs[b] = {}
-                if t not in dicMBs[b]:
-                    dicMBs[b][t] = {}
-                step = logTokens["align="].split("=")[1]
-                step += "." + logTokens["a="].split("=")[1]
-                step += "." + logTokens["n="] + "." + logTokens["t="]
-                for opt in self.moreOpt:
-                    if opt[2] in logTokens:
-                        step += "." + opt[2]
-                lines = open(log, "r").readlines()
-                for line in lines:
-                    if line.find("Max Write") != -1:
-                        dicMBs[b][t][step + "." + "write"] = float(line.split()[4][1:])
-                        self.steps.append(step + "." + "write")
-                    if line.find("Max Read") != -1:
-                        dicMBs[b][t][step + "." + "read"] = float(line.split()[4][1:])
-                        self.steps.append(step + "." + "read")
-                    self.steps = list(set(self.steps)) # Remove duplicates
-                for s in self.steps:
-                    if s in dicMBs[b][t] and dicMBs[b][t][s] > maxMBs:
-                        maxMBs = dicMBs[b][t][s]
-                        maxInfo["LOG"] = os.path.basename(log)
-                        maxInfo["EXTRA"] = "block size = " + b
-                        maxInfo["EXTRA"] += ", transfer size = " + t
-                        maxInfo["EXTRA"] += ", step = " + s.split(".")[2]
+        logRegExp = os.path.join(runDir, "IOR*.log")
+        maxMBs, dicMBs, maxInfo = self.__getMetricFromStore__(logRegExp, filterLogs)
+        self.steps = self.__getStepsFromKey__(dicMBs, "")
         self.__printMetricStatus__(printMax, maxMBs, maxInfo)
         return self.__returnMetric__(dicMBs, maxInfo, maxMBs, getDict=getDict, getMaxInfo=getMaxInfo)
 
@@ -194,11 +279,11 @@ class iorBench(bench):
             shutil.copyfile(os.path.join(runDir, "ior"), "ior")
             os.chmod("ior", os.stat("ior").st_mode | stat.S_IEXEC) # chmod +x
             logTokens = self.splitLogName(maxInfo["LOG"])
-            iorA = logTokens["a="].split("=")[1]
+            iorA = str(logTokens.get("a"))
             iorA = "HDF5" if iorA == "PHDF5" else iorA
             exeArg = "-a " + iorA
-            exeArg += " -b " + logTokens["block="].split("=")[1]
-            exeArg += " -t " + logTokens["transfer="].split("=")[1]
+            exeArg += " -b " + str(logTokens.get("block"))
+            exeArg += " -t " + str(logTokens.get("transfer"))
             exeArg += " -r -w"
             for opt in self.moreOpt:
                 if opt[2] in logTokens:
@@ -207,8 +292,8 @@ class iorBench(bench):
                 exeArg = exeArg + " " + o
             jsCfg = {}
             jsCfg["EXE"] = "ior"
-            jsCfg["MPI"] = str(logTokens["n="].split("=")[1])
-            jsCfg["THD"] = str(logTokens["t="].split("=")[1])
+            jsCfg["MPI"] = str(logTokens.get("n"))
+            jsCfg["THD"] = str(logTokens.get("t"))
             jsCfg["ARGS"] = str(exeArg)
             jsCfg["COLOR"] = "pink"
             jsCfg["MARKER"] = "."
@@ -9,13 +9,15 @@ import time
 import stat
 import shutil
 import json
+import re
 
 from pyc.bench import bench
+from pyc.topology import topology
 
 class iozoneBench(bench):
     """Class dedicated to the iozone benchmark"""
 
-    def __init__(self, args, url, iozVn, iozMkArch):
+    def __init__(self, args, url, iozVn, iozMkArch, device=None):
         """Initialize iozone bench class instance"""
         bench.__init__(self, args, "iozone", "IO-MB/s")
         self.iozURL = url
@@ -23,44 +25,58 @@ class iozoneBench(bench):
         self.iozTAR = "iozone" + iozVn + ".tar"
         self.iozMkArch = iozMkArch
         self.steps = []
+        self.alone = True # Disk is shared and iozone writes its test file in the run directory
+        self.device = sorted(device) if device else [] # Device mode (page cache bypassed): DIRECT (O_DIRECT), RAM
+        # Throughput mode tests (as reported by iozone) and the matching operations of the automatic mode
+        self.tputOps = {"initial writers": "write", "rewriters": "rewrite", "readers": "read", "re-readers": "reread",
+                        "reverse readers": "bkwd read", "stride readers": "stride read",
+                        "random readers": "random read", "random writers": "random write", "mixed workload": "mixed",
+                        "pwrite writers": "pwrite", "pread readers": "pread", "fwriters": "fwrite", "freaders": "fread"}
 
-    def __getMetricFromLine__(self, tokens, dicMBs, step):
-        """Get metric from a line of a log"""
+    @staticmethod
+    def __getRecordsFromLine__(tokens, step):
+        """Get metric records from a line of a log"""
+        records = []
         fsMB = int(tokens[0]) // 1024
-        if fsMB not in dicMBs:
-            dicMBs[fsMB] = {}
         rlkB = int(tokens[1])
-        if rlkB not in dicMBs[fsMB]:
-            dicMBs[fsMB][rlkB] = {}
+        ops = []
         if len(tokens) >= 6:
-            dicMBs[fsMB][rlkB][step + "." + "write"] = int(tokens[2]) / 1024.
-            dicMBs[fsMB][rlkB][step + "." + "rewrite"] = int(tokens[3]) / 1024.
-            dicMBs[fsMB][rlkB][step + "." + "read"] = int(tokens[4]) / 1024.
-            dicMBs[fsMB][rlkB][step + "." + "reread"] = int(tokens[5]) / 1024.
-            self.steps.append(step + "." + "write")
-            self.steps.append(step + "." + "rewrite")
-            self.steps.append(step + "." + "read")
-            self.steps.append(step + "." + "reread")
+            ops += ["write", "rewrite", "read", "reread"]
         if len(tokens) == 15:
-            dicMBs[fsMB][rlkB][step + "." + "random read"] = int(tokens[6]) / 1024.
-            dicMBs[fsMB][rlkB][step + "." + "random write"] = int(tokens[7]) / 1024.
-            dicMBs[fsMB][rlkB][step + "." + "bkwd read"] = int(tokens[8]) / 1024.
-            dicMBs[fsMB][rlkB][step + "." + "record rewrite"] = int(tokens[9]) / 1024.
-            dicMBs[fsMB][rlkB][step + "." + "stride read"] = int(tokens[10]) / 1024.
-            dicMBs[fsMB][rlkB][step + "." + "fwrite"] = int(tokens[11]) / 1024.
-            dicMBs[fsMB][rlkB][step + "." + "frewrite"] = int(tokens[12]) / 1024.
-            dicMBs[fsMB][rlkB][step + "." + "fread"] = int(tokens[13]) / 1024.
-            dicMBs[fsMB][rlkB][step + "." + "freread"] = int(tokens[14]) / 1024.
-            self.steps.append(step + "." + "random read")
-            self.steps.append(step + "." + "random write")
-            self.steps.append(step + "." + "bkwd read")
-            self.steps.append(step + "." + "record rewrite")
-            self.steps.append(step + "." + "stride read")
-            self.steps.append(step + "." + "fwrite")
-            self.steps.append(step + "." + "frewrite")
-            self.steps.append(step + "." + "fread")
-            self.steps.append(step + "." + "freread")
-        return fsMB, rlkB
+            ops += ["random read", "random write", "bkwd read", "record rewrite", "stride read"]
+            ops += ["fwrite", "frewrite", "fread", "freread"]
+        for idx, op in enumerate(ops):
+            extra = "file size = " + str(fsMB) + " MB, record size = " + str(rlkB) + " kB, step = " + op
+            records.append(((fsMB, rlkB, step + "." + op), int(tokens[2 + idx]) / 1024., extra))
+        return records
+
+    def __getRecordsFromThroughput__(self, log, step, kBSize, rlkB):
+        """Get metric records from the throughput mode report of a log: aggregate and per child throughput"""
+        records = []
+        fsMB = kBSize // 1024
+        op = None
+        for line in self.readLog(log, end="iozone test complete"):
+            match = re.search(r"Children see throughput for\s+(\d+)\s+(.+?)\s*=\s*([\d.]+)", line)
+            if match:
+                op = self.tputOps[match.group(2)] if match.group(2) in self.tputOps else match.group(2)
+                extra = "file size = " + str(fsMB) + " MB (per child), record size = " + str(rlkB) + " kB, "
+                extra += match.group(1) + " children, step = " + op
+                records.append(((fsMB, rlkB, step + "." + op), float(match.group(3)) / 1024., extra))
+                continue
+            match = re.search(r"Avg throughput per process\s*=\s*([\d.]+)", line)
+            if match and op:
+                extra = "file size = " + str(fsMB) + " MB, record size = " + str(rlkB) + " kB, step = " + op
+                records.append(((fsMB, rlkB, step + "." + op + " (per child)"), float(match.group(1)) / 1024., extra))
+                op = None
+        return records
+
+    @staticmethod
+    def __getThroughputArgs__(kBSize, kBRecSize, t, quick):
+        """Get arguments of the throughput mode: t children, each one has its own file"""
+        args = ["-e", "-c", "-s", str(kBSize), "-r", str(kBRecSize), "-t", str(t)]
+        args += ["-i", "0", "-i", "1"] if quick else ["-i", "0", "-i", "1", "-i", "2"]
+        args += ["-F"] + ["iozone.tput.%d" % c for c in range(t)]
+        return args
 
     def downloadTmp(self):
         """Download iozone benchmark in the temporary directory"""
@@ -81,15 +97,80 @@ class iozoneBench(bench):
             oldOptions += ["CFLAGS"]
             newOptions += [cpl["FLAGS"]]
             self.__modifMakefile__(["makefile"], oldOptions, newOptions)
+            key = self.cache.getKey([os.path.join(self.tmp, self.iozTAR), "makefile"], cpl, {"ARCH": self.iozMkArch})
+            if self.cache.restore(self.bName, key, ["iozone"]):
+                return
             log = open("make.log", "w")
             print("Building", self.bName, "...", end="")
             start = time.time()
-            rc = subprocess.call(["make", self.iozMkArch, "VERBOSE=1"], stdout=log, stderr=log)
+            rc = subprocess.call(self.__getMakeCmd__([self.iozMkArch, "VERBOSE=1"]), stdout=log, stderr=log)
             if rc != 0:
                 m = self.bName + " (with makefile arch keyword:" + self.iozMkArch + ")"
                 self.buildError(log, msg=m)
+            else:
+                self.cache.store(self.bName, key, ["iozone"])
             self.printStatus(start, rc)
 
+    def __getDeviceSize__(self):
+        """Get the file size (kB) of device runs: twice the physical memory (RAM), the page cache can not hold files"""
+        if "RAM" in self.device:
+            return 2 * topology.getMemory() // 1024
+        return int(self.args.size * 1024. ** 2)
+
+    @staticmethod
+    def __hasDiskSpace__(iozLog, kBNeeded):
+        """Check the file system of the run directory can hold the files of a run"""
+        if not hasattr(os, "statvfs"):
+            return True
+        st = os.statvfs(".")
+        kBFree = st.f_bavail * st.f_frsize // 1024
+        if kBNeeded <= kBFree:
+            return True
+        print("Running", iozLog, "... KO : not enough free disk space", end="")
+        print(" (%d MB needed, %d MB free)" % (kBNeeded // 1024, kBFree // 1024))
+        return False
+
+    def __runIozone__(self, kBSize, t, runTokens, ext, device=False):
+        """Run iozone for a given file size and thread configuration (device runs bypass the page cache)"""
+        kBMinSize = str(int(kBSize))
+        kBMaxSize = str(int(kBSize))
+        nb = 2 if self.args.more else 1
+        n = 1
+        while n <= nb:
+            if int(kBSize / n) > 0:
+                kBMinSize = str(int(kBSize / n))
+            if not device: # Device files are already bigger than the page cache: do not grow them (disk space)
+                kBMaxSize = str(int(kBSize * n))
+            n *= 2
+        kBMinRecSize = "4" if device else "1" # O_DIRECT needs records aligned on (4 kB) sectors
+        kBMaxRecSize = "128"
+        if self.args.more:
+            kBMaxRecSize = "1024"
+        clDic = {}
+        clDic["EXE"] = "../iozone" if device else "./iozone"
+        direct = ["-I"] if device and "DIRECT" in self.device else [] # O_DIRECT: -e -c include fsync and close
+        if t > 1: # Throughput mode: t children (threads), each one writes and reads its own file
+            kBSize = int(kBSize // t) # Children share the file size: -s is the size of the file of each child
+            iozTokens = [("size", kBSize, "s"), ("Rec", kBMaxRecSize, "s")] + runTokens
+            iozLog = self.buildLogName("iozone", iozTokens, ext)
+            if self.needRun(iozLog) and not self.__hasDiskSpace__(iozLog, kBSize * t):
+                return
+            clDic["ARGS"] = direct + self.__getThroughputArgs__(kBSize, kBMaxRecSize, t, self.args.quick)
+            self.runLog(iozLog, clDic, thd=t, cores=t)
+            return
+        iozTokens = [("size", kBSize, "s")]
+        iozTokens = iozTokens + [("MinSz", kBMinSize, "s"), ("MaxSz", kBMaxSize, "s")]
+        iozTokens = iozTokens + [("MinRec", kBMinRecSize, "s"), ("MaxRec", kBMaxRecSize, "s")]
+        iozTokens = iozTokens + runTokens
+        iozLog = self.buildLogName("iozone", iozTokens, ext)
+        if self.needRun(iozLog) and not self.__hasDiskSpace__(iozLog, int(kBMaxSize)):
+            return
+        clDic["ARGS"] = direct + ["-a", "-e", "-c", "-r", "#k", "-n", kBMinSize, "-g", kBMaxSize]
+        clDic["ARGS"] = clDic["ARGS"] + ["-y", kBMinRecSize, "-q", kBMaxRecSize]
+        if self.args.quick:
+            clDic["ARGS"] = clDic["ARGS"] + ["-i", "0", "-i", "1"]
+        self.runLog(iozLog, clDic, thd=t, cores=t)
+
     def runNT(self, n, t, runTokens, ext):
         """Run iozone benchmark in the temporary directory for a given proc and thread configuration"""
         if n != 1:
@@ -97,91 +178,108 @@ class iozoneBench(bench):
         runDir = os.path.join(self.tmp, self.iozDir, "src", "current")
         if os.path.exists(runDir):
             os.chdir(runDir)
-            kBSize = int(self.args.size * 1024. ** 2)
-            kBMinSize = str(int(kBSize))
-            kBMaxSize = str(int(kBSize))
-            nb = 2 if self.args.more else 1
-            n = 1
-            while n <= nb:
-                if int(kBSize / n) > 0:
-                    kBMinSize = str(int(kBSize / n))
-                kBMaxSize = str(int(kBSize * n))
-                n *= 2
-            kBMinRecSize = "1"
-            kBMaxRecSize = "128"
-            if self.args.more:
-                kBMaxRecSize = "1024"
-            iozTokens = [("size", kBSize, "s")]
-            iozTokens = iozTokens + [("MinSz", kBMinSize, "s"), ("MaxSz", kBMaxSize, "s")]
-            iozTokens = iozTokens + [("MinRec", kBMinRecSize, "s"), ("MaxRec", kBMaxRecSize, "s")]
-            iozTokens = iozTokens + runTokens
-            iozLog = self.buildLogName("iozone", iozTokens, ext)
-            print("Running", iozLog, "...", end="")
-            start = time.time()
-            rc = 0
-            if not os.path.exists(iozLog) or self.args.force:
-                log = open(iozLog, "w")
-                clDic = {}
-                clDic["EXE"] = "./iozone"
-                clDic["ARGS"] = ["-a", "-e", "-c", "-r", "#k", "-n", kBMinSize, "-g", kBMaxSize]
-                clDic["ARGS"] = clDic["ARGS"] + ["-y", kBMinRecSize, "-q", kBMaxRecSize]
-                if self.args.quick:
-                    clDic["ARGS"] = clDic["ARGS"] + ["-i", "0", "-i", "1"]
-                rc = self.runCmdLine(log, clDic, begin=start, thd=t)
-            self.printStatus(start, rc)
+            self.__runIozone__(int(self.args.size * 1024. ** 2), t, runTokens, ext)
+            if len(self.device) > 0: # Device runs are logged apart: cached and uncached results are not mixed
+                devDir = os.path.join(runDir, "device")
+                if not os.path.exists(devDir):
+                    os.makedirs(devDir)
+                os.chdir(devDir)
+                devTokens = [("dev", "-".join(self.device), "s")]
+                self.__runIozone__(self.__getDeviceSize__(), t, devTokens + runTokens, ext, device=True)
+
+    def __parseLog__(self, log):
+        """Parse an iozone log"""
+        records = []
+        logTokens = self.splitLogName(log)
+        step = logTokens["n="] + "." + logTokens["t="]
+        if "Rec=" in logTokens: # Throughput mode
+            return self.__getRecordsFromThroughput__(log, step, int(logTokens.get("size")), int(logTokens.get("Rec")))
+        foundMc = False
+        for line in self.readLog(log, end="iozone test complete"):
+            tokens = line.split()
+            if len(tokens) >= 2:
+                if tokens[0] == "kB" and tokens[1] == "reclen":
+                    foundMc = True
+                    continue
+            if not foundMc:
+                continue
+            if len(tokens) < 2:
+                continue
+            records += self.__getRecordsFromLine__(tokens, step)
+        return records
 
     def getMetric(self, printMax=True, getDict=False, getMaxInfo=False, filterLogs=False):
         """Getting iozone benchmark metric from the temporary directory"""
-        maxMBs = 0.
-        dicMBs = {}
-        maxInfo = {}
         runDir = os.path.join(self.tmp, self.iozDir, "src", "current")
-        if os.path.exists(runDir):
-            os.chdir(runDir)
-            for log in self.__listLogs__(os.path.join(runDir, "iozone*.log"), filterLogs):
-                lines = open(log, "r").readlines()
-                foundMc = False
-                for line in lines:
-                    tokens = line.split()
-                    if len(tokens) >= 2:
-                        if tokens[0] == "kB" and tokens[1] == "reclen":
-                            foundMc = True
-                            continue
-                    if not foundMc:
-                        continue
-                    if line.find("iozone test complete") != -1:
-                        break # End of relevant data
-                    if len(tokens) < 2:
-                        continue
-                    logTokens = self.splitLogName(log)
-                    step = logTokens["n="] + "." + logTokens["t="]
-                    fsMB, rlkB = self.__getMetricFromLine__(tokens, dicMBs, step)
-                    self.steps = list(set(self.steps)) # Remove duplicates
-                    for s in self.steps:
-                        if s in dicMBs[fsMB][rlkB] and dicMBs[fsMB][rlkB][s] > maxMBs:
-                            maxMBs = dicMBs[fsMB][rlkB][s]
-                            maxInfo["LOG"] = os.path.basename(log)
-                            maxInfo["EXTRA"] = "file size = " + str(fsMB) + " MB, record size = " + str(rlkB) + " kB"
-                            maxInfo["EXTRA"] += ", step = " + s.split(".")[2]
+        logRegExp = os.path.join(runDir, "iozone*.log")
+        maxMBs, dicMBs, maxInfo = self.__getMetricFromStore__(logRegExp, filterLogs)
+        self.steps = self.__getStepsFromKey__(dicMBs, "")
         self.__printMetricStatus__(printMax, maxMBs, maxInfo)
+        if printMax and len(self.device) > 0:
+            maxDevMBs, _, maxDevInfo = self.getDeviceMetric()
+            if maxDevMBs > 0.:
+                msg = "device (page cache bypassed): maximum = %11.3f MB/s," % maxDevMBs
+                print("%51s" % " ", msg, maxDevInfo["LOG"])
         return self.__returnMetric__(dicMBs, maxInfo, maxMBs, getDict=getDict, getMaxInfo=getMaxInfo)
 
+    def getDeviceMetric(self, filterLogs=False):
+        """Getting iozone device metric (page cache bypassed) from the temporary directory"""
+        logRegExp = os.path.join(self.tmp, self.iozDir, "src", "current", "device", "iozone*.log")
+        return self.__getMetricFromStore__(logRegExp, filterLogs)
+
+    def getCeilings(self):
+        """Get bandwidth ceilings (MB/s): page cache (cached runs) and device (uncached runs)"""
+        ceilings = {}
+        ceilings["page cache"] = self.getMetric(printMax=False)
+        if len(self.device) > 0:
+            ceilings["device"] = self.getDeviceMetric()[0]
+        self.store.setCeilings(self.bName, ceilings)
+        return ceilings
+
+    def __plotAuto__(self, nKey, dicMBs, plotTokens):
+        """Plotting iozone automatic mode results (t = 1): bandwidth versus file size and record length"""
+        allSteps = self.__getStepsFromKey__(dicMBs, "")
+        tKey = ("t=%0" + str(len(str(max(self.args.proc)))) + "d") % 1 # Automatic mode (t > 1: throughput mode)
+        steps = [s for s in allSteps if s.find("read") != -1 and s.find(nKey) != -1 and s.find(tKey) != -1]
+        plotName = self.plt.buildPlotName([self.bName, "read"] + plotTokens + [nKey, tKey])
+        self.plt.plot3DGraph(plotName, dicMBs, steps, "File size (MB)", "Record length (kB)", "MB/s")
+        steps = [s for s in allSteps if s.find("write") != -1 and s.find(nKey) != -1 and s.find(tKey) != -1]
+        plotName = self.plt.buildPlotName([self.bName, "write"] + plotTokens + [nKey, tKey])
+        self.plt.plot3DGraph(plotName, dicMBs, steps, "File size (MB)", "Record length (kB)", "MB/s")
+
     def plotN(self, nKey):
         """Plotting iozone benchmark results from the temporary directory for a given proc configuration"""
         n = int(nKey.split("=")[1])
         if n != 1:
             return
         dicMBs = self.getMetric(printMax=False, getDict=True, filterLogs=True)
-        t = 1 # Number of thread(s)
-        while n * t <= max(self.args.proc):
-            tKey = ("t=%0" + str(len(str(max(self.args.proc)))) + "d") % t
-            steps = [s for s in self.steps if s.find("read") != -1 and s.find(nKey) != -1 and s.find(tKey) != -1]
-            plotName = self.plt.buildPlotName([self.bName, "read", nKey, tKey])
-            self.plt.plot3DGraph(plotName, dicMBs, steps, "File size (MB)", "Record length (kB)", "MB/s")
-            steps = [s for s in self.steps if s.find("write") != -1 and s.find(nKey) != -1 and s.find(tKey) != -1]
-            plotName = self.plt.buildPlotName([self.bName, "write", nKey, tKey])
-            self.plt.plot3DGraph(plotName, dicMBs, steps, "File size (MB)", "Record length (kB)", "MB/s")
-            t *= 2
+        self.__plotAuto__(nKey, dicMBs, [])
+        self.__plotThroughput__(nKey, dicMBs, int(self.args.size * 1024. ** 2), [])
+        if len(self.device) > 0:
+            dicMBs = self.getDeviceMetric(filterLogs=True)[1]
+            self.__plotAuto__(nKey, dicMBs, ["device"])
+            self.__plotThroughput__(nKey, dicMBs, self.__getDeviceSize__(), ["device"])
+
+    def __plotThroughput__(self, nKey, dicMBs, kBSize, plotTokens):
+        """Plotting iozone aggregate throughput versus threads (scaling curve of the throughput mode)"""
+        rlkB = 1024 if self.args.more else 128
+        plotDic = {}
+        for fsMB in [fsMB for fsMB in dicMBs if rlkB in dicMBs[fsMB]]:
+            for s in dicMBs[fsMB][rlkB]:
+                tKey, op = s.split(".")[1], ".".join(s.split(".")[2:])
+                t = int(tKey.split("=")[1])
+                if fsMB != kBSize // t // 1024: # Children share the file size
+                    continue
+                if s.find(nKey) != -1 and op in self.tputOps.values():
+                    if t not in plotDic:
+                        plotDic[t] = {}
+                    plotDic[t][op] = dicMBs[fsMB][rlkB][s]
+        if len([t for t in plotDic if t > 1]) == 0:
+            return # No throughput mode run
+        steps = [op for op in sorted(self.tputOps.values()) if len([t for t in plotDic if op in plotDic[t]]) > 0]
+        self.plt.setPlotAttr(xTickInt=True)
+        plotName = self.plt.buildPlotName([self.bName, "throughput"] + plotTokens + [nKey])
+        self.plt.plot2DGraph(plotName, plotDic, steps, "Threads", "MB/s")
 
     def genUseCase(self):
         """Generate a use case from the best iozone benchmark run"""
@@ -194,13 +292,16 @@ class iozoneBench(bench):
             os.chmod("iozone", os.stat("iozone").st_mode | stat.S_IEXEC) # chmod +x
             logTokens = self.splitLogName(maxInfo["LOG"])
             exeArg = "-a -e -c -r \"#k\""
-            exeArg += " -n " + logTokens["MinSz="].split("=")[1] + " -g " + logTokens["MaxSz="].split("=")[1]
-            exeArg += " -y " + logTokens["MinRec="].split("=")[1] + " -q " + logTokens["MaxRec="].split("=")[1]
+            exeArg += " -n " + str(logTokens.get("MinSz")) + " -g " + str(logTokens.get("MaxSz"))
+            exeArg += " -y " + str(logTokens.get("MinRec")) + " -q " + str(logTokens.get("MaxRec"))
             if "quick" in logTokens:
                 exeArg += " -i 0 -i 1"
+            if "Rec=" in logTokens: # Throughput mode
+                kBSize, kBRecSize, t = logTokens.get("size"), logTokens.get("Rec"), int(logTokens.get("t"))
+                exeArg = " ".join(self.__getThroughputArgs__(kBSize, kBRecSize, t, "quick" in logTokens))
             jsCfg = {}
             jsCfg["EXE"] = "iozone"
-            jsCfg["THD"] = str(logTokens["t="].split("=")[1])
+            jsCfg["THD"] = str(logTokens.get("t"))
             jsCfg["ARGS"] = str(exeArg)
             jsCfg["COLOR"] = "blue"
             jsCfg["MARKER"] = "."
@@ -0,0 +1,120 @@
+"""This module exports the jobProcess class"""
+
+from __future__ import print_function
+
+import os
+import subprocess
+import threading
+import collections
+import signal
+import time
+
+class jobProcess(object):
+    """Job process class designed to run a command line: outputs are logged on the fly, the tail is kept in memory"""
+
+    grace = 10. # Time (sec) given to a process group to exit after SIGTERM before SIGKILL
+
+    def __init__(self, cmdLine, log, env=None, cwd=None, timeout=None, tailSize=30):
+        """Initialize job process class instance"""
+        self.cmdLine = cmdLine
+        self.log = log
+        self.env = env
+        self.cwd = cwd
+        self.timeout = timeout # Wall-clock timeout (sec): None means no timeout
+        self.tail = collections.deque(maxlen=tailSize) # Ring buffer: last lines of outputs
+        self.proc = None
+        self.reader = None
+        self.begin = None
+        self.termTime = None # Time when SIGTERM has been sent
+        self.timedOut = False
+        self.rc = None
+        self.rusage = None
+
+    def __read__(self):
+        """Read outputs (in a thread): write them to the log, keep the last lines"""
+        for line in iter(self.proc.stdout.readline, b""):
+            if not isinstance(line, str):
+                line = line.decode("utf-8", "replace")
+            self.log.write(line)
+            self.tail.append(line)
+        self.proc.stdout.close()
+
+    def __signal__(self, sig):
+        """Send a signal to the whole process group (mpirun, its children, ...)"""
+        try:
+            os.killpg(self.proc.pid, sig)
+        except OSError:
+            pass # Process group is already over
+
+    def __checkTimeout__(self):
+        """Terminate the process group on timeout: gracefully first, then, hard"""
+        now = time.time()
+        if self.termTime is None:
+            if self.timeout and now - self.begin > self.timeout:
+                self.timedOut = True
+                self.terminate()
+        elif now - self.termTime > self.grace:
+            self.__signal__(signal.SIGKILL)
+
+    def start(self):
+        """Start the command line in its own process group"""
+        self.begin = time.time()
+        self.proc = subprocess.Popen(self.cmdLine, env=self.env, cwd=self.cwd, stdout=subprocess.PIPE,
+                                     stderr=subprocess.STDOUT, preexec_fn=os.setpgrp)
+        self.reader = threading.Thread(target=self.__read__)
+        self.reader.daemon = True
+        self.reader.start()
+        return self
+
+    def poll(self):
+        """Check if the process is over (do not block): return its return code, None if it is still running"""
+        if self.rc is not None:
+            return self.rc
+        self.__checkTimeout__()
+        pid, status, rusage = os.wait4(self.proc.pid, os.WNOHANG)
+        if pid == 0:
+            return None
+        if os.WIFSIGNALED(status):
+            self.proc.returncode = -os.WTERMSIG(status) # Popen must not wait for a process that has been reaped
+        else:
+            self.proc.returncode = os.WEXITSTATUS(status)
+        self.reader.join(1.) # Children may still hold outputs open: they must not outlive the job
+        if self.reader.is_alive():
+            self.__signal__(signal.SIGKILL)
+            self.reader.join()
+        self.log.flush()
+        self.rusage = rusage
+        self.rc = self.proc.returncode
+        return self.rc
+
+    def wait(self):
+        """Wait for the process to be over"""
+        while self.poll() is None:
+            time.sleep(0.05)
+        return self.rc
+
+    @staticmethod
+    def waitAll(procs):
+        """Wait for several processes to be over (they run concurrently)"""
+        while len([p for p in procs if p.poll() is None]) > 0:
+            time.sleep(0.05)
+        return [p.rc for p in procs]
+
+    def terminate(self):
+        """Terminate the process group gracefully: it will be killed if it is still running after a grace time"""
+        if self.termTime is None:
+            self.termTime = time.time()
+            self.__signal__(signal.SIGTERM)
+
+    def kill(self):
+        """Terminate the process group, and, wait for it to be over"""
+        self.terminate()
+        self.wait()
+
+    def getRusage(self):
+        """Get resource usage of the process (and its children) as a string"""
+        if not self.rusage:
+            return ""
+        rus = "rusage : user = %.3f sec, system = %.3f sec" % (self.rusage.ru_utime, self.rusage.ru_stime)
+        rus += ", maxrss = %d kB" % self.rusage.ru_maxrss
+        return rus
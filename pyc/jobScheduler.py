@@ -0,0 +1,137 @@
+"""This module exports the jobScheduler class"""
+
+from __future__ import print_function
+
+import os
+import time
+import multiprocessing
+import distutils.spawn
+
+from pyc.jobProcess import jobProcess
+from pyc.topology import topology
+
+class jobScheduler(object):
+    """Job scheduler class designed to run jobs concurrently on disjoint sets of cores"""
+
+    def __init__(self, args, nbCores):
+        """Initialize job scheduler class instance"""
+        self.args = args
+        self.nbCores = max(1, nbCores)
+        self.freeCores = list(range(self.nbCores))
+        self.queue = []
+        self.running = []
+        self.nbBuilds = 0 # Number of benchmarks being built concurrently (pipeline)
+        self.taskset = distutils.spawn.find_executable("taskset") # Bind jobs to their cores if possible
+        if hasattr(os, "sched_getaffinity"):
+            self.cpus = sorted(os.sched_getaffinity(0))
+        else:
+            self.cpus = list(range(multiprocessing.cpu_count()))
+        if hasattr(args, "numaNode") and args.numaNode is not None:
+            self.cpus = topology.getNodes()[args.numaNode] # Jobs are bound to the cores of a NUMA node
+        if self.nbCores > len(self.cpus):
+            self.taskset = None # Can not bind jobs: more cores in the budget than on the machine
+
+    def __fits__(self, job, nbFreeCores):
+        """Check if a job can start with a given number of free cores"""
+        if job["ALONE"]:
+            return len(self.running) == 0 and self.nbBuilds == 0
+        for rJob in self.running:
+            if rJob["ALONE"]:
+                return False
+        return job["CORES"] <= nbFreeCores
+
+    def __start__(self, job):
+        """Start a job on the first free cores"""
+        job["CPUS"] = self.freeCores[:self.nbCores if job["ALONE"] else job["CORES"]]
+        self.freeCores = self.freeCores[len(job["CPUS"]):]
+        cmdLine = job["CMD"]
+        if self.taskset and len(job["CPUS"]) < self.nbCores:
+            cmdLine = [self.taskset, "-c", ",".join([str(self.cpus[c]) for c in job["CPUS"]])] + cmdLine
+        cmdLine = job["BIND"] + cmdLine # Bind to a NUMA node first: taskset narrows down the binding
+        log = open(job["LOG"], "w")
+        log.write("\n\n" + "~>" + " ".join(cmdLine) + "\n\n")
+        log.flush() # Flush needed before outputs are logged
+        job["START"] = time.time()
+        job["FILE"] = log
+        job["PROC"] = jobProcess(cmdLine, log, env=job["ENV"], cwd=job["CWD"], timeout=job["TIMEOUT"]).start()
+        self.running.append(job)
+
+    def __end__(self, job, rc):
+        """End a job: release its cores, print its status like serial runs do"""
+        self.running.remove(job)
+        self.freeCores = sorted(self.freeCores + job["CPUS"])
+        runner = job["RUNNER"]
+        runner.lsMsg = [] # Reset before printing the status of this job
+        runner.__endCmdLine__(job["FILE"], rc, job["START"], job["PROC"]) # Also process and pack the log
+        if rc != 0 and self.args.stop:
+            self.kill() # Stop other jobs before to exit
+        print("Running", job["NAME"], "...", end="")
+        runner.printStatus(job["START"], rc)
+
+    def __dispatch__(self):
+        """Start queued jobs that fit the free core budget"""
+        nbFreeCores = len(self.freeCores)
+        for job in list(self.queue):
+            if self.__fits__(job, nbFreeCores):
+                self.queue.remove(job)
+                self.__start__(job)
+                nbFreeCores = len(self.freeCores)
+            else:
+                # The first blocked job reserves its cores: next jobs can only backfill what is left.
+                nbFreeCores -= self.nbCores if job["ALONE"] else job["CORES"]
+                if nbFreeCores <= 0:
+                    break
+
+    def submit(self, runner, logName, clDic, thd, cores):
+        """Queue a job (the command line of a runner logged in logName) that needs a given number of cores"""
+        if len([job for job in self.queue + self.running if job["LOG"] == os.path.abspath(logName)]) > 0:
+            return # Same configuration (like -q -n 2 that runs 1 proc twice): both would write the same log
+        job = {}
+        job["RUNNER"] = runner
+        job["NAME"] = logName
+        job["LOG"] = os.path.abspath(logName)
+        job["CMD"] = runner.__getCmdLine__(clDic)
+        job["BIND"] = runner.__getNumaBind__()
+        job["ENV"] = runner.__buildEnv__(thd)
+        job["CWD"] = clDic["CWD"] if "CWD" in clDic else os.getcwd()
+        job["CORES"] = min(max(1, cores), self.nbCores)
+        job["ALONE"] = clDic["ALONE"] if "ALONE" in clDic else runner.alone
+        job["TIMEOUT"] = runner.timeout
+        self.queue.append(job)
+        self.poll()
+
+    def poll(self):
+        """End finished jobs and start queued jobs (do not block)"""
+        for job in list(self.running):
+            rc = job["PROC"].poll()
+            if rc is not None:
+                self.__end__(job, rc)
+        self.__dispatch__()
+
+    def wait(self):
+        """Wait for all jobs to be over"""
+        try:
+            while len(self.queue) > 0 or len(self.running) > 0:
+                self.poll()
+                time.sleep(0.1)
+        except KeyboardInterrupt:
+            self.kill()
+            raise
+
+    def waitFor(self, logName):
+        """Wait for a job (logged in logName) to be over: other jobs go on meanwhile"""
+        logName = os.path.abspath(logName)
+        try:
+            while len([job for job in self.queue + self.running if job["LOG"] == logName]) > 0:
+                self.poll()
+                time.sleep(0.1)
+        except KeyboardInterrupt:
+            self.kill()
+            raise
+
+    def kill(self):
+        """Kill running jobs and forget queued jobs"""
+        self.queue = []
+        for job in self.running:
+            job["PROC"].terminate() # Terminate all process groups first, then, wait for them
+        jobProcess.waitAll([job["PROC"] for job in self.running])
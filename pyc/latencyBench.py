@@ -0,0 +1,195 @@
+"""This module exports the latencyBench class"""
+
+from __future__ import print_function
+
+import os
+import subprocess
+import time
+
+from pyc.bench import bench
+from pyc.topology import topology
+from pyc.statistic import statistic
+
+class latencyBench(bench):
+    """Class dedicated to the memory latency benchmark: randomized pointer chasing over working set sizes"""
+
+    chaseSrc = r'''/* Pointer chasing generated by perfApp: latency (ns per load) of a working set (randomized chain) */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <omp.h>
+
+typedef struct node { struct node * next; char pad[CACHE_LINE_SIZE - sizeof(void *)]; } node; /* One per line */
+
+node * sink = NULL; /* Keep the chase alive (no dead code elimination) */
+
+double chase(size_t nbNodes, size_t nbLoads, unsigned int seed) {
+  node * nodes = (node *) malloc(nbNodes * sizeof(node));
+  size_t * order = (size_t *) malloc(nbNodes * sizeof(size_t));
+  size_t i = 0, j = 0, tmp = 0;
+  if (!nodes || !order) { fprintf(stderr, "ERROR: can not allocate %zu nodes\n", nbNodes); exit(1); }
+  for (i = 0; i < nbNodes; i++) order[i] = i;
+  for (i = nbNodes - 1; i > 0; i--) { /* Random order (Fisher-Yates): hardware prefetchers can not guess it */
+    j = (((size_t) rand_r(&seed) << 31) | (size_t) rand_r(&seed)) % (i + 1);
+    tmp = order[i]; order[i] = order[j]; order[j] = tmp;
+  }
+  for (i = 0; i < nbNodes; i++) nodes[order[i]].next = &nodes[order[(i + 1) % nbNodes]]; /* Single cycle */
+  free(order);
+  node * p = &nodes[0];
+  for (i = 0; i < nbNodes; i++) p = p->next; /* Warm up */
+  double start = omp_get_wtime();
+  for (i = 0; i < nbLoads; i++) p = p->next;
+  double elapse = omp_get_wtime() - start;
+  sink = p;
+  free(nodes);
+  return elapse * 1.e9 / nbLoads;
+}
+
+int main(int argc, char ** argv) {
+  if (argc != 3) { fprintf(stderr, "usage: %s working-set-bytes loads\n", argv[0]); return 1; }
+  size_t nbNodes = strtoull(argv[1], NULL, 10) / sizeof(node), nbLoads = strtoull(argv[2], NULL, 10);
+  if (nbNodes < 2) nbNodes = 2;
+  double latency = 0.;
+  int nbThreads = 1;
+  #pragma omp parallel reduction(+:latency) /* Each thread chases its own chain (first touched by itself) */
+  {
+    #pragma omp single
+    nbThreads = omp_get_num_threads();
+    latency += chase(nbNodes, nbLoads, 12345 + omp_get_thread_num());
+  }
+  printf("Working set = %zu bytes, nodes = %zu, loads = %zu, threads = %d\n",
+         nbNodes * sizeof(node), nbNodes, nbLoads, nbThreads);
+  printf("Latency = %.3f ns per load\n", latency / nbThreads);
+  return 0;
+}
+'''
+
+    def __init__(self, args):
+        """Initialize latency bench class instance"""
+        bench.__init__(self, args, "latency", "LAT-ns")
+        self.latDir = "latency"
+        self.steps = []
+        self.alone = True # Caches and memory are shared: concurrent jobs would spoil measures
+        self.lowerIsBetter = True # The best latency is the lowest one
+        self.caches = topology.getCaches()
+
+    def __getSizes__(self):
+        """Get working set sizes (bytes): logarithmic spacing from L1 / 2 to 4 x the last level cache"""
+        caches = self.caches if len(self.caches) > 0 else [(1, 32 * 1024), (2, 32 * 1024 ** 2)] # Guess if unknown
+        sizes = []
+        wSet = caches[0][1] // 2
+        while wSet <= 4 * caches[-1][1]:
+            sizes.append(int(wSet) // self.args.clSize * self.args.clSize)
+            wSet *= 2. ** 0.5
+        return sizes
+
+    def __getLevel__(self, size):
+        """Get the memory level (L1, L2, ..., RAM) a working set (bytes) fits in"""
+        for cache in self.caches:
+            if size <= cache[1]:
+                return "L%d" % cache[0]
+        return "RAM"
+
+    def build(self, cpl):
+        """Build latency benchmark in the temporary directory: generate and compile the pointer chasing kernel"""
+        buildDir = os.path.join(self.tmp, self.latDir)
+        if not os.path.exists(buildDir):
+            os.makedirs(buildDir)
+        os.chdir(buildDir)
+        if not os.path.exists("pchase.c") or open("pchase.c", "r").read() != latencyBench.chaseSrc:
+            open("pchase.c", "w").write(latencyBench.chaseSrc)
+        key = self.cache.getKey(["pchase.c"], cpl, {"CACHE_LINE_SIZE": self.args.clSize})
+        if self.cache.restore(self.bName, key, ["pchase.exe"]):
+            return
+        log = open("make.log", "w")
+        print("Building", self.bName, "...", end="")
+        start = time.time()
+        buildCmd = [cpl["CC"]] + cpl["FLAGS"].split() + ["-DCACHE_LINE_SIZE=%d" % self.args.clSize]
+        buildCmd += ["-o", "pchase.exe", "pchase.c"]
+        log.write(" ".join(buildCmd) + "\n")
+        log.flush()
+        rc = subprocess.call(buildCmd, stdout=log, stderr=log)
+        if rc != 0:
+            self.buildError(log)
+        else:
+            self.cache.store(self.bName, key, ["pchase.exe"])
+        self.printStatus(start, rc)
+
+    def runNT(self, n, t, runTokens, ext):
+        """Run latency benchmark in the temporary directory for a given proc and thread configuration"""
+        if n != 1:
+            return
+        runDir = os.path.join(self.tmp, self.latDir)
+        if os.path.exists(os.path.join(runDir, "pchase.exe")):
+            os.chdir(runDir)
+            nbLoads = 2 ** 24
+            if self.args.quick:
+                nbLoads = 2 ** 22
+            if self.args.more:
+                nbLoads = 2 ** 26
+            memory = topology.getMemory()
+            for size in self.__getSizes__():
+                if memory > 0 and 4 * t * size > memory:
+                    continue # Each thread has its own working set
+                latLog = self.buildLogName("latency", [("size", size, "s")] + runTokens, ext)
+                clDic = {}
+                clDic["EXE"] = "./pchase.exe"
+                clDic["ARGS"] = [str(size), str(nbLoads)]
+                self.runLog(latLog, clDic, thd=t, cores=t)
+
+    def __parseLog__(self, log):
+        """Parse a latency log"""
+        logTokens = self.splitLogName(log)
+        sizekB = int(logTokens.get("size")) / 1024.
+        t = int(logTokens.get("t"))
+        for line in self.readLog(log):
+            tokens = line.split()
+            if len(tokens) >= 3 and tokens[0] == "Latency" and tokens[1] == "=":
+                extra = "working set = %.1f kB (%s), threads = %d" % (sizekB, self.__getLevel__(sizekB * 1024), t)
+                return [((logTokens["n="], sizekB, "t=%d" % t), float(tokens[2]), extra)]
+        return []
+
+    def getMetric(self, printMax=True, getDict=False, getMaxInfo=False, filterLogs=False):
+        """Getting latency benchmark metric from the temporary directory: the minimum is the L1 latency"""
+        logRegExp = os.path.join(self.tmp, self.latDir, "latency*.log")
+        maxNs, dicNs, maxInfo = self.__getMetricFromStore__(logRegExp, filterLogs)
+        self.steps = sorted(self.__getStepsFromKey__(dicNs, ""), key=lambda s: int(s.split("=")[1]))
+        self.__printMetricStatus__(printMax, maxNs, maxInfo)
+        if printMax and maxNs > 0.:
+            for level, ns in sorted(self.getLatencies().items(), key=lambda kv: kv[1]):
+                print("%51s %s latency = %11.3f ns" % (" ", level, ns))
+        return self.__returnMetric__(dicNs, maxInfo, maxNs, getDict=getDict, getMaxInfo=getMaxInfo)
+
+    def getLatencies(self):
+        """Get latency plateaus (ns) detected on the single thread curve: labeled by cache level (L1, ..., RAM)"""
+        lsLogs = self.__listLogs__(os.path.join(self.tmp, self.latDir, "latency*.log"), False)
+        curve = {}
+        for records in self.store.getRecords(self.bName, lsLogs, self.splitLogName, self.__parseLog__).values():
+            for record in records:
+                if record[0][2] == "t=1":
+                    curve[record[0][1]] = min(curve[record[0][1]], record[1]) if record[0][1] in curve else record[1]
+        plateaus = [] # Consecutive sizes whose latencies are close to the first one
+        for sizekB in sorted(curve):
+            if len(plateaus) > 0 and curve[sizekB] <= 1.2 * curve[plateaus[-1][0]]:
+                plateaus[-1].append(sizekB)
+            else:
+                plateaus.append([sizekB])
+        latencies = {}
+        for idx, plateau in enumerate([p for p in plateaus if len(p) >= 2]): # Transitions are not plateaus
+            mid = plateau[len(plateau) // 2]
+            level = self.__getLevel__(mid * 1024) if len(self.caches) > 0 else "plateau %d" % (idx + 1)
+            if plateau[-1] == max(curve):
+                level = "RAM" # The sweep ends far beyond the last level cache (which may be shared or mis-reported)
+            ns = statistic.median([curve[sizekB] for sizekB in plateau])
+            latencies[level] = min(latencies[level], ns) if level in latencies else ns
+        self.store.setCeilings(self.bName, latencies)
+        return latencies
+
+    def plotN(self, nKey):
+        """Plotting latency benchmark results from the temporary directory for a given proc configuration"""
+        dicNs = self.getMetric(printMax=False, getDict=True, filterLogs=True)
+        if nKey not in dicNs:
+            return
+        self.plt.setPlotAttr(xLogScale=True)
+        plotName = self.plt.buildPlotName([self.bName, nKey])
+        self.plt.plot2DGraph(plotName, dicNs[nKey], self.steps, "Working set (kB)", "ns per load")
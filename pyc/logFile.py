@@ -0,0 +1,120 @@
+"""This module exports the logFile class"""
+
+from __future__ import print_function
+
+import os
+import sys
+import io
+import glob
+import gzip
+import shutil
+try:
+    import zstandard # Optional: gzip is used if zstandard is not available
+except ImportError:
+    zstandard = None
+
+class logFile(object):
+    """Log file class designed to handle logs whatever they are compressed or not"""
+
+    suffixes = {".gz": "gzip", ".zst": "zstd"} # Suffix of compressed logs
+
+    @staticmethod
+    def canCompress(compress):
+        """Check if logs can be compressed with a given method"""
+        if compress == "zstd":
+            return zstandard is not None
+        return compress == "gzip"
+
+    @staticmethod
+    def baseName(logName):
+        """Get the name of a log without the suffix of compression"""
+        for suffix in logFile.suffixes:
+            if logName.endswith(suffix):
+                return logName[:-len(suffix)]
+        return logName
+
+    @staticmethod
+    def find(logName):
+        """Find a log (compressed or not): None if it does not exist"""
+        logName = logFile.baseName(logName)
+        for name in [logName] + [logName + suffix for suffix in sorted(logFile.suffixes)]:
+            if os.path.exists(name):
+                return name
+        return None
+
+    @staticmethod
+    def exists(logName):
+        """Check if a log (compressed or not) exists"""
+        return logFile.find(logName) is not None
+
+    @staticmethod
+    def glob(logRegExp):
+        """List logs (compressed or not) that match a regular expression"""
+        lsLogs = glob.glob(logRegExp)
+        for suffix in logFile.suffixes:
+            lsLogs += glob.glob(logRegExp + suffix)
+        return lsLogs
+
+    @staticmethod
+    def open(logName):
+        """Open a log (compressed or not) to read it line by line"""
+        name = logFile.find(logName)
+        if name is None:
+            return open(logName, "r") # Raise the usual error
+        if name.endswith(".gz"):
+            return gzip.open(name, "rt") if sys.version_info[0] >= 3 else gzip.open(name, "rb")
+        if name.endswith(".zst"):
+            if zstandard is None:
+                sys.exit("ERROR: zstandard is needed to read " + name)
+            return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(name, "rb")))
+        return open(name, "r")
+
+    @staticmethod
+    def trim(logName, maxSize):
+        """Trim a log bigger than maxSize: keep the head and the tail of the log"""
+        size = os.path.getsize(logName)
+        if size <= maxSize:
+            return
+        log = open(logName, "rb")
+        head = log.read(maxSize // 2)
+        head = head[:head.rfind(b"\n") + 1] # Cut on line boundaries
+        log.seek(size - maxSize // 2)
+        tail = log.read()
+        tail = tail[tail.find(b"\n") + 1:]
+        log.close()
+        trimLog = open(logName + ".trim", "wb")
+        trimLog.write(head)
+        trimLog.write(("\n... %d bytes trimmed ...\n\n" % (size - len(head) - len(tail))).encode())
+        trimLog.write(tail)
+        trimLog.close()
+        os.rename(logName + ".trim", logName)
+
+    @staticmethod
+    def compress(logName, compress):
+        """Compress a log: return the name of the compressed log"""
+        if compress == "zstd" and zstandard is not None:
+            zstName = logName + ".zst"
+            zstLog = open(zstName, "wb")
+            zstandard.ZstdCompressor().copy_stream(open(logName, "rb"), zstLog)
+            zstLog.close()
+            os.remove(logName)
+            return zstName
+        gzName = logName + ".gz"
+        gzLog = gzip.open(gzName, "wb")
+        shutil.copyfileobj(open(logName, "rb"), gzLog)
+        gzLog.close()
+        os.remove(logName)
+        return gzName
+
+    @staticmethod
+    def pack(logName, compress=None, maxSize=None):
+        """Pack a finished log (trim it, compress it): return the name of the packed log"""
+        if not os.path.exists(logName):
+            return logFile.find(logName)
+        if maxSize:
+            logFile.trim(logName, maxSize)
+        packName = logFile.compress(logName, compress) if compress else logName
+        for suffix in logFile.suffixes: # Remove logs left by previous runs (may have been packed differently)
+            if os.path.exists(logName + suffix) and logName + suffix != packName:
+                os.remove(logName + suffix)
+        return packName
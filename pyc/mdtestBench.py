@@ -0,0 +1,132 @@
+"""This module exports the mdtestBench class"""
+
+from __future__ import print_function
+
+import os
+import re
+import shutil
+import stat
+import json
+
+from pyc.bench import bench
+
+class mdtestBench(bench):
+    """Class dedicated to the mdtest benchmark (metadata: built with IOR)"""
+
+    def __init__(self, args, runCfg, logID):
+        """Initialize mdtest bench class instance"""
+        bench.__init__(self, args, "mdtest", "MD-ops/s")
+        self.runCfg = runCfg
+        self.logID = logID
+        self.steps = []
+        self.alone = True # Disk is shared and mdtest creates its files in a test directory
+        self.deps = ["IOR"] # mdtest is built from the IOR checkout
+
+    def __getExe__(self):
+        """Get the mdtest binary (built by IOR)"""
+        return os.path.join(self.tmp, "IOR", "ior", "src", "mdtest")
+
+    def __getTestDir__(self):
+        """Get the directory where mdtest creates its files and directories (must be on a local file system)"""
+        if self.runCfg["DIR"]:
+            return self.runCfg["DIR"]
+        return os.path.join(self.tmp, "mdtest", "mdtest.dir")
+
+    def downloadTmp(self):
+        """Download mdtest benchmark in the temporary directory"""
+        pass # mdtest is downloaded with IOR
+
+    def build(self, cpl):
+        """Build mdtest benchmark in the temporary directory"""
+        pass # mdtest is built with IOR
+
+    def runNT(self, n, t, runTokens, ext):
+        """Run mdtest benchmark in the temporary directory for a given proc and thread configuration"""
+        if t != 1:
+            return
+        if not os.path.exists(self.__getExe__()):
+            return
+        runDir = os.path.join(self.tmp, "mdtest")
+        if not os.path.exists(runDir):
+            os.makedirs(runDir)
+        os.chdir(runDir)
+        mdExt = ext if len(self.logID) == 0 else "." + ".".join(self.logID) + ext
+        for items in self.runCfg["ITEMS"]:
+            mdLog = self.buildLogName("mdtest", [("items", items, "s")] + runTokens, mdExt)
+            clDic = {}
+            clDic["EXE"] = self.__getExe__()
+            clDic["ARGS"] = ["-n", items, "-d", self.__getTestDir__()] + self.runCfg["OTHER"]
+            if n > 1:
+                clDic["PREPEND"] = ["mpirun", "-n", str(n)]
+            self.runLog(mdLog, clDic, cores=n)
+
+    def __parseLog__(self, log):
+        """Parse a mdtest log: rates (ops/s) of the summary"""
+        records = []
+        logTokens = self.splitLogName(log)
+        items = int(logTokens.get("items"))
+        n = int(logTokens.get("n"))
+        summary = False
+        for line in self.readLog(log, end="SUMMARY time"): # Recent versions also summarize times
+            if line.startswith("SUMMARY"):
+                summary = True
+            match = re.search(r"^\s*((?:File|Directory|Tree) \w+)\s*:\s*([\d.]+)", line) if summary else None
+            if match:
+                op = match.group(1).lower()
+                extra = "items per rank = " + str(items) + ", ranks = " + str(n) + ", step = " + op
+                records.append(((items, n, op), float(match.group(2)), extra)) # Maximum over iterations
+        return records
+
+    def getMetric(self, printMax=True, getDict=False, getMaxInfo=False, filterLogs=False):
+        """Getting mdtest benchmark metric from the temporary directory"""
+        logRegExp = os.path.join(self.tmp, "mdtest", "mdtest*.log")
+        maxOps, dicOps, maxInfo = self.__getMetricFromStore__(logRegExp, filterLogs)
+        self.steps = sorted(self.__getStepsFromKey__(dicOps, ""))
+        self.__printMetricStatus__(printMax, maxOps, maxInfo)
+        return self.__returnMetric__(dicOps, maxInfo, maxOps, getDict=getDict, getMaxInfo=getMaxInfo)
+
+    def plot(self):
+        """Plot mdtest benchmark results over all possible configurations"""
+        bench.plot(self)
+        dicOps = self.getMetric(printMax=False, getDict=True, filterLogs=True)
+        self.plt.setPlotAttr(xTickStr=True, yTickStr=True)
+        for kind in ["file", "directory"]:
+            steps = [s for s in self.steps if s.startswith(kind)]
+            plotName = self.plt.buildPlotName([self.bName, kind])
+            self.plt.plot3DGraph(plotName, dicOps, steps, "Items per rank", "Ranks", "ops/s")
+
+    def plotN(self, nKey):
+        """Plotting mdtest benchmark results from the temporary directory for a given proc configuration"""
+        dicOps = self.getMetric(printMax=False, getDict=True, filterLogs=True)
+        n = int(nKey.split("=")[1])
+        plotDic = {}
+        for items in dicOps:
+            if n in dicOps[items]:
+                plotDic[items] = dicOps[items][n]
+        if len(plotDic) == 0:
+            return
+        self.plt.setPlotAttr(xLogScale=True)
+        plotName = self.plt.buildPlotName([self.bName, nKey])
+        self.plt.plot2DGraph(plotName, plotDic, self.steps, "Items per rank", "ops/s")
+
+    def genUseCase(self):
+        """Generate a use case from the best mdtest benchmark run"""
+        maxInfo = self.getMetric(printMax=False, getMaxInfo=True)
+        if "LOG" in maxInfo:
+            ucDir = self.__cleanUseCase__(os.path.join(self.args.tmp, "usc"), "pfb" + self.bName)
+            os.chdir(ucDir)
+            shutil.copyfile(self.__getExe__(), "mdtest")
+            os.chmod("mdtest", os.stat("mdtest").st_mode | stat.S_IEXEC) # chmod +x
+            logTokens = self.splitLogName(maxInfo["LOG"])
+            exeArg = "-n " + str(logTokens.get("items")) + " -d mdtest.dir"
+            for o in self.runCfg["OTHER"]:
+                exeArg = exeArg + " " + o
+            jsCfg = {}
+            jsCfg["EXE"] = "mdtest"
+            jsCfg["MPI"] = str(logTokens.get("n"))
+            jsCfg["THD"] = str(logTokens.get("t"))
+            jsCfg["ARGS"] = str(exeArg)
+            jsCfg["COLOR"] = "brown"
+            jsCfg["MARKER"] = "."
+            jsCfg["LABEL"] = self.bName
+            json.dump(jsCfg, open("usc.json", "w"))
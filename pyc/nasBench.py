@@ -24,22 +24,27 @@ class nasBench(bench):
         self.nasTGZ = "NPB" + nasVn +".tar.gz"
         self.nasMPIID = nasMPIID
         self.nasVec = nasVec
-        self.benchLs = []
-        self.classLs = []
+
+    def __getBenchLs__(self, nasImpl):
+        """Get the list of benchs to build for a given NAS implementation"""
+        benchLs = ["bt", "cg", "ep", "ft", "is", "lu", "mg", "sp"]
+        benchLs += ["dc", "ua"] if nasImpl.find("MPI") == -1 else ["dt"]
+        if self.args.quick:
+            if "dc" in benchLs:
+                benchLs.remove("dc") # Long test: remove it for quick benchmark
+            if "sp" in benchLs:
+                benchLs.remove("sp") # Long test: remove it for quick benchmark
+        return benchLs
+
+    def __getClassLs__(self):
+        """Get the list of classes to build for each bench"""
+        return ["S", "W", "A", "B", "C"] if self.args.more else ["S", "W", "A"]
 
     def __writeSuite__(self, nasImpl):
         """Write suite file for NAS builds"""
         suite = open("suite.def", "w")
-        self.benchLs = ["bt", "cg", "ep", "ft", "is", "lu", "mg", "sp"]
-        self.benchLs += ["dc", "ua"] if nasImpl.find("MPI") == -1 else ["dt"]
-        if self.args.quick:
-            if "dc" in self.benchLs:
-                self.benchLs.remove("dc") # Long test: remove it for quick benchmark
-            if "sp" in self.benchLs:
-                self.benchLs.remove("sp") # Long test: remove it for quick benchmark
-        for benchName in self.benchLs:
-            self.classLs = ["S", "W", "A", "B", "C"] if self.args.more else ["S", "W", "A"]
-            for className in self.classLs:
+        for benchName in self.__getBenchLs__(nasImpl):
+            for className in self.__getClassLs__():
                 if nasImpl.find("MPI") == -1:
                     suite.write(benchName + " " + className + "\n")
                 else:
@@ -79,25 +84,21 @@ class nasBench(bench):
                 runNASTokens = [("impl", nasImpl, "s")] + [("bench", benchName, "s")] + [("class", className, "s")]
                 runNASTokens += runTokens
                 nasLog = self.buildLogName("NAS", runNASTokens, nasExt)
-                print("Running", nasLog, "...", end="")
-                start = time.time()
-                rc = 0
-                if not os.path.exists(nasLog) or self.args.force:
-                    log = open(nasLog, "w")
-                    clDic = {}
-                    clDic["EXE"] = "./" + exe
-                    if nasImpl.find("MPI") != -1:
-                        clDic["PREPEND"] = ["mpirun", "-n", str(n)]
-                    rc = self.runCmdLine(log, clDic, begin=start, thd=t)
-                self.printStatus(start, rc)
+                clDic = {}
+                clDic["EXE"] = "./" + exe
+                if nasImpl.find("MPI") != -1:
+                    clDic["PREPEND"] = ["mpirun", "-n", str(n)]
+                if benchName == "dc":
+                    clDic["ALONE"] = True # dc writes its data files in the run directory
+                self.runLog(nasLog, clDic, thd=t, cores=n * t)
             os.chdir(runDir)
 
-    def __getMetricFromFile__(self, log, maxGFlops, dicGFlops, maxInfo, nasImpl):
-        """Get metric from a given log file"""
-        lines = open(log, "r").readlines()
+    def __parseLog__(self, log):
+        """Parse a NAS log"""
+        nasImpl = os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(log))))
         benchName = None
         className = None
-        for line in lines:
+        for line in self.readLog(log):
             if line.find("Benchmark Completed") != -1:
                 benchName = line.split()[0]
             if line.find("Class") != -1:
@@ -105,21 +106,10 @@ class nasBench(bench):
             if line.find("Mop/s total") != -1:
                 if benchName and className:
                     GF = float(line.split()[3]) / 1000.
-                    if maxGFlops < GF:
-                        maxGFlops = GF
-                        maxInfo["LOG"] = os.path.basename(log)
-                    if benchName not in dicGFlops:
-                        dicGFlops[benchName] = {}
-                    if className not in dicGFlops[benchName]:
-                        dicGFlops[benchName][className] = {}
                     logTokens = self.splitLogName(log)
                     step = nasImpl[-3:] + "." + logTokens["n="] + "." + logTokens["t="]
-                    if step not in dicGFlops[benchName][className]:
-                        dicGFlops[benchName][className][step] = GF
-                    if dicGFlops[benchName][className][step] < GF:
-                        dicGFlops[benchName][className][step] = GF
-                    break # End of relevant data
-        return maxGFlops, maxInfo
+                    return [((benchName, className, step), GF, None)] # End of relevant data
+        return []
 
     def downloadTmp(self):
         """Download NAS benchmark in the temporary directory"""
@@ -136,6 +126,7 @@ class nasBench(bench):
         if os.path.exists(buildDir):
             os.chdir(buildDir)
             print("Building", self.bName, "...")
+            lsMake = []
             for nasImpl in sorted(os.listdir(buildDir)):
                 if nasImpl.find("NPB") == -1:
                     continue
@@ -155,21 +146,33 @@ class nasBench(bench):
                 self.__writeSuite__(nasImpl)
                 os.chdir(os.path.join(buildDir, nasImpl))
                 log = open("make.log", "w")
-                print("Building", self.bName, ":", nasImpl, "...", end="")
-                start = time.time()
                 cmdLine = ["make", "suite", "VERSION=VEC"] if self.nasVec else ["make", "suite"]
-                rc = subprocess.call(cmdLine, stdout=log, stderr=log)
-                if rc != 0:
-                    self.buildError(log)
-                self.printStatus(start, rc)
+                pMake = subprocess.Popen(cmdLine, stdout=log, stderr=log) # Implementations are built concurrently
+                lsMake.append((nasImpl, log, pMake, time.time()))
                 os.chdir(buildDir)
+            while len(lsMake) > 0: # Print the status of each implementation (with its own time) when it is over
+                for make in list(lsMake):
+                    nasImpl, log, pMake, start = make
+                    rc = pMake.poll()
+                    if rc is None:
+                        continue
+                    lsMake.remove(make)
+                    print("Building", self.bName, ":", nasImpl, "...", end="")
+                    if rc != 0:
+                        os.chdir(os.path.join(buildDir, nasImpl))
+                        self.buildError(log)
+                        os.chdir(buildDir)
+                    else:
+                        log.close() # Flush
+                    self.printStatus(start, rc)
+                time.sleep(0.1)
 
     def runNT(self, n, t, runTokens, ext):
         """Run NAS benchmark in the temporary directory for a given proc and thread configuration"""
         runDir = os.path.join(self.tmp, self.nasDir)
         if os.path.exists(runDir):
-            for benchName in self.benchLs:
-                for className in self.classLs:
+            for benchName in self.__getBenchLs__("SER"):
+                for className in self.__getClassLs__():
                     os.chdir(runDir)
                     self.__runBenchClass__(benchName, className, n, t, runTokens, ext)
                     if self.args.quick:
@@ -177,22 +180,9 @@ class nasBench(bench):
 
     def getMetric(self, printMax=True, getDict=False, getMaxInfo=False, filterLogs=False):
         """Getting NAS benchmark metric from the temporary directory"""
-        maxGFlops = 0.
-        dicGFlops = {}
-        maxInfo = {}
         runDir = os.path.join(self.tmp, self.nasDir)
-        if os.path.exists(runDir):
-            os.chdir(runDir)
-            for nasImpl in sorted(os.listdir(runDir)):
-                if nasImpl.find("NPB") == -1:
-                    continue
-                if not os.path.isdir(nasImpl):
-                    continue
-                for log in self.__listLogs__(os.path.join(runDir, nasImpl, "bin", "NAS*.log"), filterLogs):
-                    mGFlops, mInfo = self.__getMetricFromFile__(log, maxGFlops, dicGFlops, maxInfo, nasImpl)
-                    if mGFlops > maxGFlops:
-                        maxGFlops = mGFlops
-                        maxInfo = mInfo
+        logRegExp = os.path.join(runDir, "*NPB*", "bin", "NAS*.log")
+        maxGFlops, dicGFlops, maxInfo = self.__getMetricFromStore__(logRegExp, filterLogs)
         self.__printMetricStatus__(printMax, maxGFlops, maxInfo)
         return self.__returnMetric__(dicGFlops, maxInfo, maxGFlops, getDict=getDict, getMaxInfo=getMaxInfo)
 
@@ -217,21 +207,21 @@ class nasBench(bench):
             ucDir = self.__cleanUseCase__(os.path.join(self.args.tmp, "usc"), "pfb" + self.bName)
             os.chdir(ucDir)
             logTokens = self.splitLogName(maxInfo["LOG"])
-            nasImpl = logTokens["impl="].split("=")[1]
+            nasImpl = str(logTokens.get("impl"))
             nasImpl = self.nasDir[0:6] + nasImpl[-4:]
             runDir = os.path.join(self.tmp, self.nasDir, nasImpl, "bin")
-            exe = logTokens["bench="].split("=")[1] + "." + logTokens["class="].split("=")[1]
-            n = int(logTokens["n="].split("=")[1])
+            exe = str(logTokens.get("bench")) + "." + str(logTokens.get("class"))
+            n = int(logTokens.get("n"))
             exe += ".x" if "seq" in logTokens else "." + str(n)
             shutil.copyfile(os.path.join(runDir, exe), exe)
             os.chmod(exe, os.stat(exe).st_mode | stat.S_IEXEC) # chmod +x
             jsCfg = {}
             jsCfg["EXE"] = exe
             if "mpi" in logTokens:
-                jsCfg["MPI"] = str(logTokens["n="].split("=")[1])
+                jsCfg["MPI"] = str(logTokens.get("n"))
             else: # Force MPI if seq as validation tests may broke (different machines, different best use case)
                 jsCfg["MPI"] = "-1" # Force MPI="-1" if sequential (insure same "Configuring" keyword count)
-            jsCfg["THD"] = str(logTokens["t="].split("=")[1])
+            jsCfg["THD"] = str(logTokens.get("t"))
             jsCfg["COLOR"] = "black"
             jsCfg["MARKER"] = "."
             jsCfg["LABEL"] = self.bName
@@ -0,0 +1,199 @@
+"""This module exports the numpyBench class"""
+
+from __future__ import print_function
+
+import os
+import sys
+import stat
+import math
+try:
+    import numpy # Optional: the benchmark can not run if numpy is not available
+except ImportError:
+    numpy = None
+
+from pyc.bench import bench
+
+class numpyBench(bench):
+    """Class dedicated to NumPy benchmarks: quick calibration that needs neither network nor compiler"""
+
+    kernels = {"stream": "RAM-MB/s", "dgemm": "GF"} # Memory bandwidth (STREAM like), floating-point throughput
+    kernelSrc = '''#!%s
+
+"""NumPy kernels generated by perfApp: memory bandwidth (STREAM like) or floating-point throughput (DGEMM)"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+for blasThd in ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"]:
+    os.environ[blasThd] = "1" # Threads are handled by the thread pool: BLAS must not spawn its own
+import multiprocessing
+import multiprocessing.pool
+import numpy
+
+def timeKernel(pool, kernel, slices, nTimes):
+    """Time a kernel run over slices of arrays by a pool of threads (numpy releases the GIL): best time"""
+    times = []
+    for _ in range(nTimes):
+        start = time.time()
+        pool.map(kernel, slices)
+        times.append(time.time() - start)
+    return min(times[1:]) if nTimes > 1 else times[0] # Skip the first iteration (warm up)
+
+def streamWorker(cfg):
+    """Run memory kernels in a process: bandwidths (MB/s)"""
+    size, nbThd, nTimes = cfg
+    pool = multiprocessing.pool.ThreadPool(nbThd)
+    slices = [slice(size * i // nbThd, size * (i + 1) // nbThd) for i in range(nbThd)]
+    a, b, c = numpy.empty(size), numpy.empty(size), numpy.empty(size)
+    def touch(s):
+        """Initialize arrays (first touch by the thread that uses them)"""
+        a[s], b[s], c[s] = 1., 2., 0.
+    pool.map(touch, slices)
+    scalar = 3.
+    def copy(s):
+        """Copy: c = a"""
+        numpy.copyto(c[s], a[s])
+    def scale(s):
+        """Scale: b = scalar * c"""
+        numpy.multiply(c[s], scalar, out=b[s])
+    def add(s):
+        """Add: c = a + b"""
+        numpy.add(a[s], b[s], out=c[s])
+    def triad(s):
+        """Triad: a = b + scalar * c"""
+        numpy.multiply(c[s], scalar, out=a[s])
+        numpy.add(a[s], b[s], out=a[s])
+    rates = {}
+    for name, kernel, nbArrays in [("Copy", copy, 2), ("Scale", scale, 2), ("Add", add, 3), ("Triad", triad, 3)]:
+        rates[name] = nbArrays * 8 * size / timeKernel(pool, kernel, slices, nTimes) / 1.e6 # STREAM convention
+    pool.close()
+    return rates
+
+def dgemmWorker(cfg):
+    """Run DGEMM in a process: throughput (GFlops)"""
+    size, nbThd, nTimes = cfg
+    pool = multiprocessing.pool.ThreadPool(nbThd)
+    slices = [slice(size * i // nbThd, size * (i + 1) // nbThd) for i in range(nbThd)]
+    a, b, c = numpy.ones((size, size)), numpy.ones((size, size)), numpy.empty((size, size))
+    def dgemm(s):
+        """DGEMM: c = a * b (block of rows)"""
+        numpy.dot(a[s], b, out=c[s])
+    rates = {"DGEMM": 2. * size ** 3 / timeKernel(pool, dgemm, slices, nTimes) / 1.e9}
+    pool.close()
+    return rates
+
+def main():
+    """Run a kernel with a pool of processes: rates are summed over processes"""
+    kernel = sys.argv[1]
+    size, nbProc, nbThd, nTimes = [int(arg) for arg in sys.argv[2:6]]
+    worker = dgemmWorker if kernel == "dgemm" else streamWorker
+    print("numpy", numpy.__version__, ": kernel", kernel, ", size =", size, end="")
+    print(", processes =", nbProc, ", threads =", nbThd)
+    if nbProc > 1:
+        pool = multiprocessing.Pool(nbProc)
+        lsRates = pool.map(worker, [(size, nbThd, nTimes)] * nbProc)
+        pool.close()
+    else:
+        lsRates = [worker((size, nbThd, nTimes))]
+    print("Function    Best Rate", "GFlops" if kernel == "dgemm" else "MB/s")
+    for name in sorted(lsRates[0]):
+        print("%%-11s %%12.3f" %% (name + ":", sum([rates[name] for rates in lsRates])))
+
+if __name__ == "__main__":
+    main()
+'''
+
+    def __init__(self, args, kernel):
+        """Initialize numpy bench class instance"""
+        bench.__init__(self, args, "np" + kernel, numpyBench.kernels[kernel])
+        self.kernel = kernel
+        if kernel == "stream":
+            self.alone = True # Bandwidth is shared: concurrent jobs would spoil measures
+        self.npDir = "numpy"
+        self.steps = []
+        self.needCpl = False
+        self.provisional = True # Ceilings are provisional: benchmarks built from sources are more accurate
+
+    def __getSize__(self, n):
+        """Get the problem size of a process: array length (stream), or, matrix order (dgemm)"""
+        size = self.args.size * 1024. ** 3 / 8 / n # Like stream: S GB per array (shared by processes)
+        if self.kernel == "dgemm":
+            return int(math.sqrt(size / 3)) # S GB for 3 matrices
+        return int(size)
+
+    def __getKernel__(self):
+        """Get the kernel script"""
+        return os.path.join(self.tmp, self.npDir, self.bName + ".py")
+
+    def check(self):
+        """Check numpy benchmark consistency"""
+        print("Checking", self.bName, "benchmark ...", end="")
+        if numpy is None:
+            print(" KO : numpy is not available")
+            return False
+        print(" OK")
+        return True
+
+    def build(self, cpl):
+        """Build numpy benchmark in the temporary directory: generate the kernel script"""
+        buildDir = os.path.join(self.tmp, self.npDir)
+        if not os.path.exists(buildDir):
+            os.makedirs(buildDir)
+        kernel = self.__getKernel__()
+        src = numpyBench.kernelSrc % sys.executable
+        if not os.path.exists(kernel) or open(kernel, "r").read() != src:
+            print("Building", self.bName, "...")
+            open(kernel, "w").write(src)
+            os.chmod(kernel, os.stat(kernel).st_mode | stat.S_IEXEC) # chmod +x
+
+    def runNT(self, n, t, runTokens, ext):
+        """Run numpy benchmark in the temporary directory for a given proc and thread configuration"""
+        runDir = os.path.join(self.tmp, self.npDir)
+        if os.path.exists(self.__getKernel__()):
+            os.chdir(runDir)
+            size = self.__getSize__(n)
+            nTimes = 3 if self.kernel == "dgemm" else 10 # DGEMM is long enough to be timed
+            if self.args.quick:
+                nTimes = 2
+            npLog = self.buildLogName(self.bName, [("size", size, "s")] + runTokens, ext)
+            clDic = {}
+            clDic["EXE"] = "./" + os.path.basename(self.__getKernel__())
+            clDic["ARGS"] = [self.kernel, str(size), str(n), str(t), str(nTimes)]
+            self.runLog(npLog, clDic, thd=t, cores=n * t)
+
+    def __parseLog__(self, log):
+        """Parse a numpy log"""
+        records = []
+        logTokens = self.splitLogName(log)
+        nKey = logTokens["n="]
+        t = int(logTokens.get("t"))
+        foundFunction = False
+        for line in self.readLog(log):
+            tokens = line.split()
+            if len(tokens) > 1 and tokens[0] == "Function":
+                foundFunction = True
+                continue
+            if foundFunction and len(tokens) == 2 and tokens[0].endswith(":"):
+                step = tokens[0][:-1]
+                extra = "size = " + str(logTokens.get("size")) + ", step = " + step
+                records.append(((nKey, t, step), float(tokens[1]), extra))
+        return records
+
+    def getMetric(self, printMax=True, getDict=False, getMaxInfo=False, filterLogs=False):
+        """Getting numpy benchmark metric from the temporary directory"""
+        logRegExp = os.path.join(self.tmp, self.npDir, self.bName + "*.log")
+        maxMc, dicMc, maxInfo = self.__getMetricFromStore__(logRegExp, filterLogs)
+        self.steps = sorted(self.__getStepsFromKey__(dicMc, ""))
+        self.__printMetricStatus__(printMax, maxMc, maxInfo)
+        return self.__returnMetric__(dicMc, maxInfo, maxMc, getDict=getDict, getMaxInfo=getMaxInfo)
+
+    def plotN(self, nKey):
+        """Plotting numpy benchmark results from the temporary directory for a given proc configuration"""
+        dicMc = self.getMetric(printMax=False, getDict=True, filterLogs=True)
+        if nKey not in dicMc:
+            return
+        self.plt.setPlotAttr(xTickInt=True)
+        plotName = self.plt.buildPlotName([self.bName, nKey])
+        self.plt.plot2DGraph(plotName, dicMc[nKey], self.steps, "Threads", self.getUnit())
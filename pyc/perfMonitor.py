@@ -3,15 +3,19 @@
 from __future__ import print_function
 
 import os
+import re
 import sys
 import subprocess
 import time
 import distutils.spawn
-import glob
+import json
 import psutil
 
 from pyc.runJob import runJob
+from pyc.logFile import logFile
 from pyc.download import download
+from pyc.buildCache import buildCache
+from pyc.topology import topology
 
 class perfMonitor(runJob):
     """Performance monitoring class designed to handle general purpose monitoring topics"""
@@ -20,6 +24,7 @@ class perfMonitor(runJob):
         """Initialize perfMonitor class instance"""
         runJob.__init__(self, args)
         self.dld = download(os.path.join(args.tmp))
+        self.cache = buildCache(args)
         self.pfm4StGFReg = []
         self.pfm4StCMReg = []
         self.pfm4RpReg = []
@@ -36,54 +41,97 @@ class perfMonitor(runJob):
                 if evt[len(evt) - 2:] != ":u":
                     evtLs[idx] = evt + ":u" # Add user modifier
 
-    def __getRegisterFromEvent__(self, evt, umask, descr, lsReg):
-        """Get register associated to an event used for profiling"""
-        chkEvt = os.path.join(os.getcwd(), "check_events") # Use absolute path as os.getcwd is not in PATH's
-        cmdLine = [chkEvt, evt + ":" + umask] if umask != "none" else [chkEvt, evt]
-        evtLog = "_".join(cmdLine) + ".log"
-        log = open(evtLog, "w")
-        log.write("\n\n" + "~>" + " ".join(cmdLine) + "\n\n")
-        log.flush() # Flush needed before subprocess.call
-        rc = subprocess.call(cmdLine, stdout=log, stderr=log)
-        if rc != 0:
-            print("Can not check HW events (" + evt + "/" + umask + "), skip it")
-            return
-        log.close() # Flush needed between write and read
-        lines = open(evtLog, "r").readlines()
-        lastLine = lines[len(lines) - 1]
-        if lastLine.find("Codes") == -1:
-            print("Can not get HW event code (" + evt + "/" + umask + "), skip it")
-            return
-        reg = lastLine.split()[2].replace("0x", "r") # Last line: Codes <=> register
-        lsReg.append(reg)
-        self.regInfo.append((reg, evt, umask, descr))
+    @staticmethod
+    def __getEventIndex__(lines):
+        """Index libpfm4 events (showevtinfo log) once: umasks (umask, description, line) of each event"""
+        index = {}
+        evtName = None
+        for line in lines:
+            tokens = line.split()
+            if len(tokens) >= 3 and tokens[0] == "Name" and tokens[1] == ":":
+                evtName = tokens[2] if tokens[2] not in index else None # Keep the first PMU that knows the event
+                if evtName:
+                    index[evtName] = []
+            elif evtName and len(tokens) >= 3 and tokens[0].find("Umask") != -1 and tokens[1] == ":":
+                index[evtName].append((tokens[2], " ".join(tokens[4:]), line))
+            elif line.startswith("#-"):
+                evtName = None
+        return index
 
-    def __findRegisterFromPfm4__(self, lines, evt, lsReg):
-        """Find register in libpfm4 logs"""
-        evtFound = False
-        umFound = False
+    @staticmethod
+    def __getEventUmasks__(index, evt):
+        """Get (event, umask, description) to check for an event used for profiling (all umasks if none is given)"""
         evtName = evt
         umName = "ALL" # Look for all umasks
-        nbReg = len(lsReg)
         if evt.find(":") != -1:
             evtName = evt.split(":")[0]
             umName = evt.split(":")[1]
-        for line in lines:
-            tokens = line.split()
-            if len(tokens) >= 3 and tokens[0] == "Name" and tokens[1] == ":" and tokens[2] == evtName:
-                evtFound = True
-            if evtFound:
-                if len(tokens) >= 3 and tokens[0].find("Umask") != -1 and tokens[1] == ":":
-                    if umName != "ALL" and line.find(umName) == -1:
-                        continue # Look for a specific umask
-                    umFound = True
-                    self.__getRegisterFromEvent__(evtName, tokens[2], " ".join(tokens[4:]), lsReg)
-                if line[0] == "#" and line[1] == "-":
-                    if not umFound:
-                        self.__getRegisterFromEvent__(evtName, "none", "none", lsReg)
-                    break
-        if len(lsReg) == nbReg: # No register has been added
-            print("Can not find HW event", evt, "(" + umName + ")")
+        if evtName not in index:
+            return []
+        lsEvtUm = []
+        for umask, descr, line in index[evtName]:
+            if umName == "ALL" or line.find(umName) != -1: # Look for a specific umask
+                lsEvtUm.append((evtName, umask, descr))
+        if len(lsEvtUm) == 0:
+            lsEvtUm.append((evtName, "none", "none"))
+        return lsEvtUm
+
+    @staticmethod
+    def __checkEvents__(lsChk):
+        """Check events with libpfm4 in a single run: codes (registers) of events"""
+        chkEvt = os.path.join(os.getcwd(), "check_events") # Use absolute path as os.getcwd is not in PATH's
+        codes = {}
+        log = open("check_events.log", "w")
+        todo = lsChk
+        while len(todo) > 0:
+            cmdLine = [chkEvt] + todo
+            log.write("\n\n" + "~>" + " ".join(cmdLine) + "\n\n")
+            pProc = subprocess.Popen(cmdLine, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            stdout = pProc.communicate()[0].decode("utf-8", "replace")
+            log.write(stdout)
+            evt = None
+            for line in stdout.split("\n"):
+                tokens = line.split()
+                if len(tokens) >= 3 and tokens[0] == "Requested" and tokens[1] == "Event:":
+                    evt = tokens[2]
+                if evt and len(tokens) >= 3 and tokens[0] == "Codes" and tokens[1] == ":":
+                    codes[evt] = tokens[2].replace("0x", "r") # Codes <=> register
+                    evt = None
+            failed = [chk for chk in todo if chk not in codes]
+            if pProc.returncode == 0 or len(failed) == 0:
+                break
+            todo = failed[1:] # check_events stops at the first event it can not encode: go on from the next one
+        log.close()
+        return codes
+
+    def __findRegistersFromPfm4__(self, lsEvt):
+        """Find registers of events in libpfm4 logs: (register, event, umask, description) per event"""
+        index = self.__getEventIndex__(open("showevtinfo.log", "r").readlines())
+        dicEvtUm = {}
+        for evt in lsEvt:
+            dicEvtUm[evt] = self.__getEventUmasks__(index, evt)
+        lsChk = []
+        for evt in lsEvt:
+            for evtName, umask, _ in dicEvtUm[evt]:
+                chk = evtName + ":" + umask if umask != "none" else evtName
+                if chk not in lsChk:
+                    lsChk.append(chk)
+        codes = self.__checkEvents__(lsChk) if len(lsChk) > 0 else {}
+        dicReg = {}
+        for evt in lsEvt:
+            dicReg[evt] = []
+            for evtName, umask, descr in dicEvtUm[evt]:
+                chk = evtName + ":" + umask if umask != "none" else evtName
+                if chk in codes:
+                    dicReg[evt].append((codes[chk], evtName, umask, descr))
+                else:
+                    print("Can not get HW event code (" + evtName + "/" + umask + "), skip it")
+        return dicReg
+
+    @staticmethod
+    def __getRegisterCacheKey__(args):
+        """Get the key of registers cached on disk: registers depend on the CPU model and the libpfm4 version"""
+        return topology.getCpuModel() + ", libpfm4 " + args.pfm4Vn
 
     def __logMemoryHistory__(self, initLog, logTokens, ptChildren, elapsedTime):
         """Log memory history to a file"""
@@ -137,7 +185,7 @@ class perfMonitor(runJob):
     @staticmethod
     def __cleanPerfTopHistory__(evt):
         """Clean perf-top history logs for a given event"""
-        for logName in glob.glob(os.path.join("*.perf-top." + evt + ".*.log")):
+        for logName in logFile.glob(os.path.join("*.perf-top." + evt + ".*.log")):
             os.remove(logName) # Clean previous run before next run
 
     @staticmethod
@@ -188,6 +236,11 @@ class perfMonitor(runJob):
                 if not pProc.poll(): # Some events may not be supported by perf-top
                     pProc.stdin.write("q\n".encode()) # Send "q" to the process to quit perf-top
                     pProc.terminate()
+            for pProc in lsProc:
+                pProc.wait() # Make sure perf-top is over before packing its log
+            for pLog in lsLog:
+                pLog.close()
+                self.packLog(pLog.name)
 
     def downloadTmp(self):
         """Download libpfm4 in the temporary directory"""
@@ -203,25 +256,39 @@ class perfMonitor(runJob):
     def getRegisters(self):
         """Get registers associated to events used for profiling"""
         print("Searching for registers with libpfm4 ...")
-        self.build()
-        self.showEvt()
         self.__addUserModifier__([self.args.perfStGFEvt, self.args.perfStCMEvt])
         self.__addUserModifier__([self.args.perfRpEvt, self.args.perfTpEvt])
-        if os.path.exists("showevtinfo.log"):
-            lines = open("showevtinfo.log", "r").readlines()
-            for evt in self.args.pfm4StGFEvt:
-                self.__findRegisterFromPfm4__(lines, evt, self.pfm4StGFReg)
-            for evt in self.args.pfm4StCMEvt:
-                self.__findRegisterFromPfm4__(lines, evt, self.pfm4StCMReg)
-            for evt in self.args.pfm4RpEvt:
-                self.__findRegisterFromPfm4__(lines, evt, self.pfm4RpReg)
-            for evt in self.args.pfm4TpEvt:
-                self.__findRegisterFromPfm4__(lines, evt, self.pfm4TpReg)
-            self.__addUserModifier__([self.pfm4StGFReg, self.pfm4StCMReg, self.pfm4RpReg, self.pfm4TpReg])
-            self.regInfo = list(set(self.regInfo)) # Remove duplicates
-            self.regInfo.sort(key=lambda r: r[1] + r[2])
-            for r in self.regInfo:
-                print("Register", r[0], "is mapped to", r[1] + ":" + r[2])
+        lsEvtReg = [(self.args.pfm4StGFEvt, self.pfm4StGFReg), (self.args.pfm4StCMEvt, self.pfm4StCMReg)]
+        lsEvtReg += [(self.args.pfm4RpEvt, self.pfm4RpReg), (self.args.pfm4TpEvt, self.pfm4TpReg)]
+        regCacheName = os.path.join(self.args.tmp, "pfm4.registers.json") # Registers found by previous runs
+        regCache = json.load(open(regCacheName, "r")) if os.path.exists(regCacheName) else {}
+        regKey = self.__getRegisterCacheKey__(self.args)
+        dicReg = dict([(evt, reg) for evt, reg in regCache.get(regKey, {}).items() if len(reg) > 0]) # Resolved ones
+        lsEvt = [evt for lsPfm4Evt, _ in lsEvtReg for evt in lsPfm4Evt]
+        if len([evt for evt in lsEvt if evt not in dicReg]) > 0: # libpfm4 is needed only for new events
+            lsEvt = [evt for evt in lsEvt if evt not in dicReg]
+            self.build()
+            self.showEvt()
+            if os.path.exists("showevtinfo.log") and os.path.exists("check_events"):
+                dicReg.update(self.__findRegistersFromPfm4__(lsEvt))
+                regCache[regKey] = dict([(evt, reg) for evt, reg in dicReg.items() if len(reg) > 0]) # Retry others
+                json.dump(regCache, open(regCacheName, "w"), indent=2, sort_keys=True)
+        elif len(lsEvt) > 0:
+            print("Searching for registers with libpfm4 : OK, cached for", regKey)
+        for lsPfm4Evt, lsReg in lsEvtReg:
+            for evt in lsPfm4Evt:
+                if evt not in dicReg:
+                    continue # libpfm4 is not available
+                if len(dicReg[evt]) == 0:
+                    print("Can not find HW event", evt)
+                for regInfo in dicReg[evt]:
+                    lsReg.append(regInfo[0])
+                    self.regInfo.append(tuple(regInfo))
+        self.__addUserModifier__([self.pfm4StGFReg, self.pfm4StCMReg, self.pfm4RpReg, self.pfm4TpReg])
+        self.regInfo = list(set(self.regInfo)) # Remove duplicates
+        self.regInfo.sort(key=lambda r: r[1] + r[2])
+        for r in self.regInfo:
+            print("Register", r[0], "is mapped to", r[1] + ":" + r[2])
         print("") # Output separator for clarity
 
     def build(self):
@@ -230,12 +297,19 @@ class perfMonitor(runJob):
         buildDir = os.path.join(self.args.tmp, pfm4Dir)
         if os.path.exists(buildDir):
             os.chdir(buildDir)
+            pfm4TGZ = os.path.join(self.args.tmp, pfm4Dir + ".tar.gz")
+            key = self.cache.getKey([pfm4TGZ], {"CC": distutils.spawn.find_executable("gcc")})
+            targets = ["lib", "examples"] # showevtinfo, check_events, and, the library they may be linked to
+            if self.cache.restore("libpfm4", key, targets):
+                return
             log = open("make.log", "w")
             print("Building libpfm4 ...", end="")
             start = time.time()
             rc = subprocess.call(["make", "VERBOSE=1"], stdout=log, stderr=log)
             if rc != 0:
                 self.buildError(log)
+            else:
+                self.cache.store("libpfm4", key, targets)
             self.printStatus(start, rc)
 
     def showEvt(self):
@@ -264,7 +338,7 @@ class perfMonitor(runJob):
             initCpuLog = True if self.args.watch else False
             cEnv = self.__buildEnv__(t)
             rLog = open(perfLog + ".sh.log", "w")
-            rProc = subprocess.Popen(["./" + runSh], env=cEnv, stdout=rLog, stderr=rLog)
+            rProc = subprocess.Popen(self.__getNumaBind__() + ["./" + runSh], env=cEnv, stdout=rLog, stderr=rLog)
             rPU = psutil.Process(rProc.pid)
             ptChildren = self.__getPerfTopProc__(rProc, rPU, logTokens["n="])
             if len(ptChildren) > 0:
@@ -278,6 +352,75 @@ class perfMonitor(runJob):
             return rProc.returncode, perfLog + ".sh.log"
         return 0, perfLog + ".sh.log"
 
+    @staticmethod
+    def __slicePerfTimeline__(perfData, slot):
+        """Slice perf-record samples streamed by perf-script: periods per event, slot, process-thread and function"""
+        cmdLine = ["perf", "script", "-i", perfData, "-F", "pid,tid,time,period,event,sym"]
+        sProc = subprocess.Popen(cmdLine, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        sample = re.compile(r"^\s*(\d+)/(\d+)\s+([\d.]+):\s+(\d+)\s+(\S+):\s*(.*)$") # pid/tid time: period evt: sym
+        dicSlot = {}
+        start = None
+        for line in iter(sProc.stdout.readline, b""): # Stream: samples are never all in memory
+            match = sample.match(line.decode("utf-8", "replace"))
+            if not match:
+                continue
+            pid, tid, sTime, period, evt, fct = match.groups()
+            start = float(sTime) if start is None else start
+            t = int((float(sTime) - start) / slot) * slot
+            fct = fct.strip() if fct.strip() else "[unknown]"
+            dicFct = dicSlot.setdefault(evt, {}).setdefault((t, pid + "-" + tid), {})
+            dicFct[fct] = dicFct.get(fct, 0) + int(period)
+        sProc.stdout.close()
+        sProc.wait()
+        return dicSlot if sProc.returncode == 0 else None # None if perf-script failed
+
+    def __logPerfTimeline__(self, dicSlot, lsEvt, perfLog, slot):
+        """Log perf timeline of each event to a file: percentage of the period of a process-thread per function"""
+        for evt in lsEvt:
+            pKey = evt if evt in dicSlot else None # perf-script may print a modified event name (modifiers)
+            for k in dicSlot:
+                if pKey is None and k.split(":")[0] == evt.split(":")[0]:
+                    pKey = k
+            pLogName = perfLog.replace(".perf-timeline", ".perf-timeline." + evt) + ".log"
+            for logName in logFile.glob(pLogName):
+                os.remove(logName) # Clean previous run before next run
+            if pKey is None:
+                continue # Some events may not be supported by perf-record
+            pLog = open(pLogName, "w")
+            pLog.write("# perf timeline: event %s, slot %s sec, time pid-tid pct function\n" % (evt, slot))
+            for t, pidThd in sorted(dicSlot[pKey]):
+                dicFct = dicSlot[pKey][(t, pidThd)]
+                total = float(sum(dicFct.values()))
+                for fct in sorted(dicFct, key=dicFct.get, reverse=True):
+                    pLog.write("%.3f %s %.3f %s\n" % (t, pidThd, 100. * dicFct[fct] / total, fct))
+            pLog.close()
+            self.packLog(pLogName, trim=False) # Trimming would cut the timeline
+
+    def runPerfTimeline(self, perfLog, logTokens, runSh, t, lsEvt, slot):
+        """Run perf-record once for all events, then, slice samples into a timeline (replaces repeated perf-top)"""
+        perfLog = perfLog + "." + logTokens["n="] + "." + logTokens["t="]
+        for k in list(logTokens.keys()):
+            if perfLog.find(logTokens[k]) == -1:
+                perfLog = perfLog + "." + logTokens[k]
+        print("Running", perfLog + ".sh.log", "...", end="")
+        start = time.time()
+        rc = 0
+        if not os.path.exists(perfLog + ".sh.log") or self.args.force:
+            mp = str(self.args.mp) if hasattr(self.args, "mp") else "1000"
+            cmdLine = ["perf", "record", "-T", "-F", mp, "-e", ",".join(lsEvt), "-o", perfLog + ".data"]
+            cmdLine += ["--", "./" + runSh] # Children (mpirun, MPI processes, threads) are followed
+            rLog = open(perfLog + ".sh.log", "w")
+            rLog.write("\n\n" + "~>" + " ".join(cmdLine) + "\n\n")
+            rLog.flush() # Flush needed before subprocess.call
+            rc = subprocess.call(self.__getNumaBind__() + cmdLine, env=self.__buildEnv__(t), stdout=rLog, stderr=rLog)
+            rLog.close()
+            dicSlot = self.__slicePerfTimeline__(perfLog + ".data", slot) if rc == 0 else None
+            if dicSlot is not None:
+                self.__logPerfTimeline__(dicSlot, lsEvt, perfLog, slot)
+                os.remove(perfLog + ".data") # Samples are sliced into timelines: raw data would be the biggest log
+        self.printStatus(start, rc, printError=False)
+        return rc, perfLog + ".sh.log"
+
     def runObjDump(self, odpLog, exe):
         """Run objdump"""
         if not distutils.spawn.find_executable("objdump"):
@@ -311,7 +454,7 @@ class perfMonitor(runJob):
         print("Running", perfLog, "...", end="")
         start = time.time()
         rc = 0
-        if not os.path.exists(perfLog) or self.args.force:
+        if self.needRun(perfLog):
             log = open(perfLog, "w")
             eInfo = "\n".join([ei[0] + " = " + ei[1] + "-" + ei[2] + " <=> " + ei[3] for ei in self.regInfo])
             log.write(eInfo) # Info: event <=> register
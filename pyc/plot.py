@@ -18,6 +18,7 @@ class plot(object):
         self.yTickStr = False
         self.xTickInt = False
         self.yTickInt = False
+        self.xLogScale = False
         matplotlib.rcParams["xtick.major.pad"] = 8 # Add space between tick labels and axis
         matplotlib.rcParams["ytick.major.pad"] = 8 # Add space between tick labels and axis
         if self.args.figWidth and self.args.figHeight: # Figure size: (width, height) in inches
@@ -157,7 +158,8 @@ class plot(object):
         else:
             matplotlib.pyplot.show()
 
-    def setPlotAttr(self, colors=None, xTickStr=False, yTickStr=False, xTickInt=False, yTickInt=False):
+    def setPlotAttr(self, colors=None, xTickStr=False, yTickStr=False, xTickInt=False, yTickInt=False,
+                    xLogScale=False):
         """Set plot attributes before plotting"""
         # Reset always all parameters (override previous values)
         self.colors = colors
@@ -165,6 +167,7 @@ class plot(object):
         self.yTickStr = yTickStr
         self.xTickInt = xTickInt
         self.yTickInt = yTickInt
+        self.xLogScale = xLogScale
 
     def filterLog(self, logName):
         """Filter log if filter is required"""
@@ -208,6 +211,8 @@ class plot(object):
             else:
                 axis.plot(nGrid, plotData, marker="o", label=s, color=self.getAutoColor(idxS, len(steps)))
         axis.set_xlabel(xLabel)
+        if self.xLogScale:
+            axis.set_xscale("log")
         if self.xTickInt:
             axis.set_xticks(N)
         axis.set_ylabel(yLabel)
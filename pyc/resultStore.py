@@ -0,0 +1,133 @@
+"""This module exports the resultStore class"""
+
+from __future__ import print_function
+
+import os
+import json
+import sqlite3
+
+class resultStore(object):
+    """Result store class designed to parse each log once and keep its results in a database"""
+
+    nbLogsPerPath = 64 # Under this number of logs (like repetitions of a run), logs are queried one by one
+
+    def __init__(self, dbName):
+        """Initialize result store class instance"""
+        self.dbName = dbName
+        self.db = None # Connect only when needed
+
+    def __connect__(self):
+        """Connect to the database (create it if needed)"""
+        if self.db:
+            return self.db
+        if not os.path.exists(os.path.dirname(self.dbName)):
+            os.makedirs(os.path.dirname(self.dbName))
+        self.db = sqlite3.connect(self.dbName)
+        self.db.execute("CREATE TABLE IF NOT EXISTS logs (path TEXT PRIMARY KEY, bench TEXT, " + \
+                        "mtime REAL, size INTEGER, tokens TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS records (path TEXT, bench TEXT, " + \
+                        "keys TEXT, value REAL, extra TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS recordsByBench ON records (bench)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS recordsByPath ON records (path)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS stats (bench TEXT, config TEXT, keys TEXT, " + \
+                        "nb INTEGER, mean REAL, median REAL, stddev REAL, max REAL, ci REAL)")
+        self.db.execute("CREATE UNIQUE INDEX IF NOT EXISTS statsByConfig ON stats (bench, config, keys)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS ceilings (bench TEXT, level TEXT, value REAL, " + \
+                        "PRIMARY KEY (bench, level))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS numa (bench TEXT, cpu INTEGER, mem INTEGER, value REAL, " + \
+                        "PRIMARY KEY (bench, cpu, mem))")
+        return self.db
+
+    @staticmethod
+    def __statLog__(logName):
+        """Get the modification time and the size of a log"""
+        st = os.stat(logName)
+        return st.st_mtime, st.st_size
+
+    def __select__(self, query, bName, lsLogs, perPath, order=""):
+        """Select rows of a bench: rows of all its logs, or, rows of given logs (queried one by one)"""
+        db = self.__connect__()
+        if not perPath:
+            return db.execute(query + " WHERE bench = ?" + order, (bName,)).fetchall()
+        rows = []
+        for logName in lsLogs:
+            rows += db.execute(query + " WHERE path = ? AND bench = ?" + order, (os.path.abspath(logName), bName))
+        return rows
+
+    def __ingest__(self, bName, logName, tokens, parseLog):
+        """Parse a log and store its results (replace previous ones)"""
+        db = self.__connect__()
+        mtime, size = self.__statLog__(logName)
+        db.execute("DELETE FROM records WHERE path = ?", (logName,))
+        db.execute("INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?)", \
+                   (logName, bName, mtime, size, json.dumps(tokens.toDict(), sort_keys=True)))
+        records = [(logName, bName, json.dumps(r[0]), r[1], r[2]) for r in parseLog(logName)]
+        db.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?)", records)
+
+    def ingest(self, bName, logName, tokens, parseLog):
+        """Parse a log and store its results"""
+        logName = os.path.abspath(logName)
+        if os.path.exists(logName):
+            self.__ingest__(bName, logName, tokens, parseLog)
+            self.__connect__().commit()
+
+    def moveLog(self, logName, newLogName):
+        """Move results of a log that has been packed (renamed, compressed, trimmed): do not parse it again"""
+        logName, newLogName = os.path.abspath(logName), os.path.abspath(newLogName)
+        db = self.__connect__()
+        if logName != newLogName:
+            db.execute("DELETE FROM logs WHERE path = ?", (newLogName,))
+            db.execute("DELETE FROM records WHERE path = ?", (newLogName,))
+            db.execute("UPDATE records SET path = ? WHERE path = ?", (newLogName, logName))
+        mtime, size = self.__statLog__(newLogName)
+        db.execute("UPDATE logs SET path = ?, mtime = ?, size = ? WHERE path = ?", (newLogName, mtime, size, logName))
+        db.commit()
+
+    def setStats(self, bName, lsStats):
+        """Store statistics (over repetitions) of each configuration of a benchmark: replace previous ones"""
+        db = self.__connect__() # Replace per configuration: a bench may store statistics of several log sets
+        stats = [(bName, json.dumps(s[0]), json.dumps(s[1]), s[2]["NB"], s[2]["MEAN"], s[2]["MEDIAN"], \
+                  s[2]["STDDEV"], s[2]["MAX"], s[2]["CI"]) for s in lsStats]
+        db.executemany("INSERT OR REPLACE INTO stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", stats)
+        db.commit()
+
+    def setCeilings(self, bName, ceilings):
+        """Store ceilings (cache levels, RAM, ...) of a benchmark: replace previous ones"""
+        db = self.__connect__()
+        db.execute("DELETE FROM ceilings WHERE bench = ?", (bName,))
+        db.executemany("INSERT INTO ceilings VALUES (?, ?, ?)", [(bName, k, v) for k, v in ceilings.items()])
+        db.commit()
+
+    def setNumaMatrix(self, bName, matrix):
+        """Store the NUMA matrix (CPU node, memory node) of a benchmark: replace the previous one"""
+        db = self.__connect__()
+        db.execute("DELETE FROM numa WHERE bench = ?", (bName,))
+        db.executemany("INSERT INTO numa VALUES (?, ?, ?, ?)", [(bName, k[0], k[1], v) for k, v in matrix.items()])
+        db.commit()
+
+    def getBestPerLog(self, bName, lowerIsBetter=False):
+        """Get the best record value of each log of a benchmark (the minimum if lower is better)"""
+        db = self.__connect__()
+        best = "MIN" if lowerIsBetter else "MAX"
+        return dict(db.execute("SELECT path, " + best + "(value) FROM records WHERE bench = ? GROUP BY path", (bName,)))
+
+    def getRecords(self, bName, lsLogs, getTokens, parseLog):
+        """Get records (keys, value, extra) of logs: (re)parse only new logs or logs that changed"""
+        db = self.__connect__()
+        perPath = len(lsLogs) < resultStore.nbLogsPerPath # Few logs: do not read all logs of the bench (indexes)
+        known = {}
+        for path, mtime, size in self.__select__("SELECT path, mtime, size FROM logs", bName, lsLogs, perPath):
+            known[path] = (mtime, size)
+        dicRecords = {}
+        for logName in lsLogs:
+            logName = os.path.abspath(logName)
+            dicRecords[logName] = []
+            if logName not in known or known[logName] != self.__statLog__(logName):
+                self.__ingest__(bName, logName, getTokens(logName), parseLog)
+        db.commit()
+        for path, keys, value, extra in self.__select__("SELECT path, keys, value, extra FROM records", bName,
+                                                        lsLogs, perPath, order=" ORDER BY rowid"):
+            if path in dicRecords:
+                dicRecords[path].append((tuple(json.loads(keys)), value, extra))
+        return dicRecords
+
@@ -2,13 +2,16 @@
 
 from __future__ import print_function
 
-import subprocess
 import time
 import os
 import sys
-import glob
+import collections
 
 from pyc.plot import plot
+from pyc.runKey import runKey
+from pyc.jobProcess import jobProcess
+from pyc.logFile import logFile
+from pyc.topology import topology
 
 class runJob(object):
     """Run time class designed to handle jobs and associated logs"""
@@ -18,46 +21,79 @@ class runJob(object):
         self.plt = plot(args)
         self.args = args
         self.lsMsg = []
+        self.sched = None # Job scheduler: if set, jobs are queued and run concurrently
+        self.alone = False # If set, scheduled jobs run alone (they do not share the node with other jobs)
+        self.timeout = args.timeout # Wall-clock timeout (sec) of runs: None means no timeout
+        self.placement = None # Current placement policy (name, environment, mpirun options): None means default
+        self.numaBind = None # Command line prefix binding runs to a NUMA node (CPU and memory)
+        if hasattr(args, "numaNode") and args.numaNode is not None:
+            self.numaBind = topology.getBind(args.numaNode)
 
     def __listLogs__(self, logRegExp, filterLogs):
-        """List logs to consider according to eventual filter to apply"""
+        """List logs (compressed or not) to consider according to eventual filter to apply"""
         lsLogs = []
-        for logName in sorted(glob.glob(logRegExp)):
+        for logName in sorted(logFile.glob(logRegExp)):
             if filterLogs:
                 if self.plt.filterLog(logName):
                     continue
             lsLogs.append(logName)
         return lsLogs
 
-    def __tailLog__(self, logName):
-        """Get the tail of a log"""
+    def __tailLog__(self, logName, tail=None):
+        """Get the tail of a log (use the tail kept in memory if any)"""
         self.lsMsg = []
         self.lsMsg.append("  current working directory : " + os.getcwd())
         self.lsMsg.append("  log tail :")
-        lines = open(logName, "r").readlines()
-        nbLinesToPrint = min(30, len(lines))
-        while nbLinesToPrint > 0:
-            line = lines[len(lines)-nbLinesToPrint].strip()
+        for line in tail if tail is not None else self.readLastLines(logName, 30):
+            line = line.strip()
             if len(line) == 0:
-                nbLinesToPrint = nbLinesToPrint - 1
                 continue
             self.lsMsg.append("    " + line)
-            nbLinesToPrint = nbLinesToPrint - 1
 
     def __addMpiOptToCmdLine__(self, cmdLine):
-        """Add mpirun options to a command line"""
+        """Add mpirun options to a command line (options of the current placement policy override default ones)"""
+        mpirunOpt = self.args.mpirunOpt
+        if self.placement and self.placement[2] is not None:
+            mpirunOpt = self.placement[2]
+        if not mpirunOpt:
+            return
         for idx, cl in enumerate(cmdLine):
             if cl == "mpirun":
-                for opt in self.args.mpirunOpt.split():
+                for opt in mpirunOpt.split():
                     idx = idx + 1
                     cmdLine.insert(idx, opt)
                 break
 
+    def __getNumaBind__(self):
+        """Get the command line prefix binding runs to a NUMA node (empty if runs are not bound)"""
+        return self.numaBind if self.numaBind else []
+
+    def __getNumaTokens__(self):
+        """Get run tokens of the NUMA node runs are bound to (if any): bound and unbound runs must not share logs"""
+        if not self.numaBind:
+            return []
+        return [("node", self.args.numaNode, "d", max(topology.getNodes()))]
+
+    def __getPlacements__(self):
+        """Get placement policies to sweep ([None] if there is no policy: default placement)"""
+        if hasattr(self.args, "placements") and self.args.placements:
+            return self.args.placements
+        return [None]
+
+    def __getPlacementTokens__(self):
+        """Get run tokens of the current placement policy (if any)"""
+        if not self.placement:
+            return []
+        return [("pl", self.placement[0], "s")]
+
     def __buildEnv__(self, thd):
         """Build environment to run a job"""
         cEnv = os.environ.copy()
         for vv in self.args.env:
             cEnv[vv[0]] = vv[1]
+        if self.placement:
+            for vv in self.placement[1]: # Placement policy overrides default affinity settings
+                cEnv[vv[0]] = vv[1]
         if thd:
             cEnv["OMP_NUM_THREADS"] = str(thd)
         return cEnv
@@ -82,8 +118,9 @@ class runJob(object):
 
     @staticmethod
     def buildLogName(baseName, runTokens, ext):
-        """Build log name from tokens"""
+        """Build log name from tokens (the run key of the log is interned: parameters are kept as is)"""
         logName = baseName
+        params, tokens = [], []
         for token in runTokens:
             infoBase = "." + token[0] + "="
             logName += infoBase
@@ -96,56 +133,121 @@ class runJob(object):
             elif infoType == "d": # Integer
                 tnMax = token[3]
                 logName += ("%0" + str(len(str(tnMax))) + "d") % infoVal
+            params.append((token[0], infoVal))
+            tokens.append(logName.split(".")[-1])
+        flags = runKey.splitLogName(baseName + ext).flags
         logName += ext
+        runKey.intern(logName, runKey(baseName, params, tokens, flags))
         return logName
 
     @staticmethod
     def splitLogName(logName):
-        """Split log name to get information from it"""
-        logTokens = {}
-        for token in os.path.basename(logName).split("."):
-            if token == "log":
-                continue
-            if "root=" not in logTokens:
-                logTokens["root="] = token
-                continue
-            if token.find("n=") == 0:
-                logTokens["n="] = token
-            elif token.find("t=") == 0:
-                logTokens["t="] = token
-            elif token.find("=") != -1:
-                logTokens[token.split("=")[0] + "="] = token
-            else:
-                logTokens[token] = token
-        return logTokens
+        """Split log name to get information from it: get its run key"""
+        return runKey.fromLogName(logName)
 
-    def runCmdLine(self, log, clDic, begin=None, thd=None):
-        """Run a command line"""
-        if not "EXE" in clDic or (clDic["EXE"] != "perf" and not os.path.exists(clDic["EXE"])):
-            log.write("\nERROR : binary not found - " + str(clDic["EXE"]))
-            log.close() # Flush is needed
-            return 1 # Avoid crash if exe doesn't exist (if build KO)
-        self.lsMsg = [] # Reset before new run
+    @staticmethod
+    def __findExe__(clDic):
+        """Check the executable of a command line exists"""
+        if not "EXE" in clDic:
+            return False
+        if clDic["EXE"] == "perf":
+            return True
+        cwd = clDic["CWD"] if "CWD" in clDic else os.getcwd()
+        return os.path.exists(os.path.join(cwd, clDic["EXE"]))
+
+    def __getCmdLine__(self, clDic):
+        """Get the command line to run from a command line dictionnary"""
         cmdLine = [clDic["EXE"]]
         if "PREPEND" in clDic:
             cmdLine = clDic["PREPEND"] + cmdLine
         if "ARGS" in clDic:
             cmdLine = cmdLine + clDic["ARGS"]
         self.__addMpiOptToCmdLine__(cmdLine)
-        log.write("\n\n" + "~>" + " ".join(cmdLine) + "\n\n")
-        log.flush() # Flush needed before subprocess.call
-        cEnv = self.__buildEnv__(thd)
-        rc = subprocess.call(cmdLine, env=cEnv, stdout=log, stderr=log)
+        return cmdLine
+
+    def __endCmdLine__(self, log, rc, begin, proc=None):
+        """End the run of a command line: close the log, get its tail if the run failed, process and pack the log"""
+        logName = log.name
         if rc == 0:
+            if proc and proc.rusage:
+                log.write("\n" + proc.getRusage())
             if begin:
-                log.write("\ntime = %11.3f sec" % (time.time() - begin))
+                log.write("\ntime = %11.3f sec" % (time.time() - begin)) # Must be the last line
             log.close() # Flush is needed
         else:
-            logName = log.name
             log.close() # Flush is needed
-            self.__tailLog__(logName)
+            self.__tailLog__(logName, proc.tail if proc else None)
+            if proc and proc.timedOut:
+                self.lsMsg.append("  timeout : killed after %d sec" % proc.timeout)
+        self.ingestLog(logName) # Process the full log before it is packed
+        self.packLog(logName, trim=(rc == 0)) # Keep failed logs as is for debugging
+
+    @staticmethod
+    def readLog(logName, end=None):
+        """Read a log (compressed or not) line by line (generator): stop at the end marker of relevant data if any"""
+        endMarker = end.lower() if end else None
+        log = logFile.open(logName)
+        try:
+            for line in log:
+                if endMarker and line.lower().find(endMarker) != -1:
+                    break # End of relevant data
+                yield line
+        finally:
+            log.close()
+
+    def readLastLines(self, logName, nbLines):
+        """Read the last lines of a log"""
+        return list(collections.deque(self.readLog(logName), maxlen=nbLines))
+
+    def needRun(self, logName):
+        """Check if a log needs to be (re)generated"""
+        return not logFile.exists(logName) or self.args.force
+
+    def runCmdLine(self, log, clDic, begin=None, thd=None):
+        """Run a command line"""
+        if not self.__findExe__(clDic):
+            log.write("\nERROR : binary not found - " + str(clDic["EXE"] if "EXE" in clDic else None))
+            log.close() # Flush is needed
+            return 1 # Avoid crash if exe doesn't exist (if build KO)
+        self.lsMsg = [] # Reset before new run
+        cmdLine = self.__getNumaBind__() + self.__getCmdLine__(clDic)
+        log.write("\n\n" + "~>" + " ".join(cmdLine) + "\n\n")
+        log.flush() # Flush needed before outputs are logged
+        cEnv = self.__buildEnv__(thd)
+        cwd = clDic["CWD"] if "CWD" in clDic else None
+        proc = jobProcess(cmdLine, log, env=cEnv, cwd=cwd, timeout=self.timeout).start()
+        try:
+            rc = proc.wait()
+        except KeyboardInterrupt:
+            proc.kill()
+            raise
+        self.__endCmdLine__(log, rc, begin, proc)
         return rc
 
+    def runLog(self, logName, clDic, thd=None, cores=1):
+        """Run a command line logged in logName (if needed): run it now, or, queue it if a scheduler is set"""
+        if self.needRun(logName):
+            self.splitLogName(logName).writeManifest(logName) # Record run parameters
+        if self.needRun(logName) and self.sched and self.__findExe__(clDic):
+            self.sched.submit(self, logName, clDic, thd, cores)
+            return 0
+        print("Running", logName, "...", end="")
+        start = time.time()
+        rc = 0
+        if self.needRun(logName):
+            log = open(logName, "w")
+            rc = self.runCmdLine(log, clDic, begin=start, thd=thd)
+        self.printStatus(start, rc)
+        return rc
+
+    def ingestLog(self, logName):
+        """Process a log once it has been generated"""
+        pass # To be overriden by inherited class
+
+    def packLog(self, logName, trim=True):
+        """Pack a finished log: trim it (keep head and tail) and compress it if needed"""
+        return logFile.pack(logName, self.args.logCompress, self.args.logMaxSize if trim else None)
+
     def printStatus(self, start, rc, printError=True):
         """Print the status of a run (OK or KO)"""
         if rc == 0:
@@ -0,0 +1,153 @@
+"""This module exports the runKey class"""
+
+from __future__ import print_function
+
+import os
+import json
+
+from pyc.logFile import logFile
+
+class runKey(object):
+    """Run key class designed to identify a run (log) by its parameters: keys are hashable and interned"""
+
+    __slots__ = ["root", "params", "tokens", "flags", "hashKey"]
+    interned = {} # Interned keys, by log (absolute path): logs of different run directories may share names
+    manifests = {} # Manifest entries (key dictionnary by log name), by run directory
+    manifestName = "manifest.jsonl"
+
+    def __init__(self, root, params, tokens, flags):
+        """Initialize run key class instance"""
+        self.root = root
+        self.params = tuple(params) # Parameters (name, value): values are typed (not altered like in log names)
+        self.tokens = tuple(tokens) # Tokens as written in log names: "name=value"
+        self.flags = tuple(flags) # Other tokens: log ID, more/less, quick/long, ...
+        self.hashKey = hash((self.root, self.tokens, self.flags))
+
+    def __hash__(self):
+        """Hash run key"""
+        return self.hashKey
+
+    def __eq__(self, other):
+        """Compare run keys: tokens are compared as parameters are typed (manifest) or not (log name)"""
+        if not isinstance(other, runKey):
+            return False
+        return (self.root, self.tokens, self.flags) == (other.root, other.tokens, other.flags)
+
+    def __ne__(self, other):
+        """Compare run keys"""
+        return not self.__eq__(other)
+
+    def __getitem__(self, key):
+        """Get a token like splitLogName did: "root=", "name=" (token "name=value") or a flag"""
+        if key == "root=":
+            return self.root
+        for token in self.tokens:
+            if token.split("=")[0] + "=" == key:
+                return token
+        if key in self.flags:
+            return key
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        """Check if a token is part of the run key"""
+        try:
+            self.__getitem__(key)
+        except KeyError:
+            return False
+        return True
+
+    def keys(self):
+        """Get tokens like splitLogName did (log name order)"""
+        return ["root="] + [token.split("=")[0] + "=" for token in self.tokens] + list(self.flags)
+
+    def get(self, name, default=None):
+        """Get the value of a parameter"""
+        for param in self.params:
+            if param[0] == name:
+                return param[1]
+        return default
+
+    def toDict(self):
+        """Convert run key to dictionnary"""
+        return {"ROOT": self.root, "PARAMS": [list(p) for p in self.params], "TOKENS": list(self.tokens),
+                "FLAGS": list(self.flags)}
+
+    @staticmethod
+    def fromDict(dic):
+        """Convert dictionnary to run key"""
+        return runKey(dic["ROOT"], [tuple(p) for p in dic["PARAMS"]], dic["TOKENS"], dic["FLAGS"])
+
+    @staticmethod
+    def intern(logName, key):
+        """Intern a run key: a log name is split or read only once"""
+        runKey.interned[os.path.abspath(logFile.baseName(logName))] = key
+        return key
+
+    @staticmethod
+    def fromLogName(logName):
+        """Get the run key of a log: interned key, then run directory manifest, then log name"""
+        logName = os.path.abspath(logFile.baseName(logName)) # Compressed logs share the key of the log
+        if logName in runKey.interned:
+            return runKey.interned[logName]
+        runDir = os.path.dirname(logName)
+        if runDir not in runKey.manifests:
+            runKey.readManifest(runDir)
+            if logName in runKey.interned:
+                return runKey.interned[logName]
+        return runKey.intern(logName, runKey.splitLogName(logName)) # Backward compatibility: logs without manifest
+
+    @staticmethod
+    def splitLogName(logName):
+        """Split log name to get the run key"""
+        root = None
+        params, tokens, flags = [], [], []
+        for token in os.path.basename(logName).split("."):
+            if token == "log":
+                continue
+            if root is None:
+                root = token
+            elif token.find("=") != -1:
+                name = token.split("=")[0]
+                for idx, t in enumerate(tokens):
+                    if t.split("=")[0] == name: # Last token wins
+                        del tokens[idx]
+                        del params[idx]
+                        break
+                params.append((name, token[len(name) + 1:]))
+                tokens.append(token)
+            elif token not in flags:
+                flags.append(token)
+        return runKey(root, params, tokens, flags)
+
+    @staticmethod
+    def readManifest(runDir):
+        """Read the manifest of a run directory: compact it if a log has been recorded more than once"""
+        entries = {}
+        nbLines = 0
+        manifest = os.path.join(runDir, runKey.manifestName)
+        if os.path.exists(manifest):
+            for line in open(manifest, "r"):
+                entry = json.loads(line)
+                entries[entry["LOG"]] = entry["KEY"] # Last entry wins
+                nbLines += 1
+        runKey.manifests[runDir] = entries
+        for name in entries:
+            runKey.interned[os.path.join(runDir, name)] = runKey.fromDict(entries[name])
+        if nbLines > len(entries): # Rewrite (then, publish atomically): the manifest must not grow with reruns
+            manifestTmp = manifest + ".tmp." + str(os.getpid())
+            with open(manifestTmp, "w") as f:
+                for name in sorted(entries):
+                    f.write(json.dumps({"LOG": name, "KEY": entries[name]}, sort_keys=True) + "\n")
+            os.rename(manifestTmp, manifest)
+
+    def writeManifest(self, logName):
+        """Record the run key of a log in the manifest of its run directory (if it has not already been recorded)"""
+        runDir = os.path.dirname(os.path.abspath(logName))
+        if runDir not in runKey.manifests:
+            runKey.readManifest(runDir)
+        entry = {"LOG": os.path.basename(logName), "KEY": json.loads(json.dumps(self.toDict()))} # As read back
+        if runKey.manifests[runDir].get(entry["LOG"]) == entry["KEY"]:
+            return # Same key (rerun with -f for instance)
+        runKey.manifests[runDir][entry["LOG"]] = entry["KEY"]
+        manifest = os.path.join(runDir, runKey.manifestName)
+        open(manifest, "a").write(json.dumps(entry, sort_keys=True) + "\n") # One line per log: append only
@@ -0,0 +1,61 @@
+"""This module exports the statistic class"""
+
+from __future__ import print_function
+
+import math
+
+class statistic(object):
+    """Statistic class designed to summarize repeated measures of a metric"""
+
+    # Student t quantiles (two-sided 95% confidence) by degrees of freedom: 1.96 (normal) beyond
+    tTable = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+              2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+              2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+    estimators = ["max", "mean", "median"]
+
+    @staticmethod
+    def mean(values):
+        """Get the mean of values"""
+        return sum(values) / float(len(values))
+
+    @staticmethod
+    def median(values):
+        """Get the median of values"""
+        srt = sorted(values)
+        mid = len(srt) // 2
+        return srt[mid] if len(srt) % 2 == 1 else (srt[mid - 1] + srt[mid]) / 2.
+
+    @staticmethod
+    def stddev(values):
+        """Get the (sample) standard deviation of values"""
+        if len(values) < 2:
+            return 0.
+        mean = statistic.mean(values)
+        return math.sqrt(sum([(v - mean) ** 2 for v in values]) / (len(values) - 1))
+
+    @staticmethod
+    def confidence(values):
+        """Get the relative half width of the 95% confidence interval of the mean (None if it can not be computed)"""
+        if len(values) < 2:
+            return None
+        mean = statistic.mean(values)
+        if mean == 0.:
+            return None
+        dof = len(values) - 1
+        tQuantile = statistic.tTable[dof - 1] if dof <= len(statistic.tTable) else 1.96
+        return tQuantile * statistic.stddev(values) / math.sqrt(len(values)) / abs(mean)
+
+    @staticmethod
+    def estimate(values, estimator, lowerIsBetter=False):
+        """Estimate a metric from repeated measures (max, mean or median): max is the best (min if lower is better)"""
+        if estimator == "mean":
+            return statistic.mean(values)
+        if estimator == "median":
+            return statistic.median(values)
+        return min(values) if lowerIsBetter else max(values)
+
+    @staticmethod
+    def summarize(values):
+        """Summarize repeated measures: number, mean, median, standard deviation, maximum, confidence"""
+        return {"NB": len(values), "MEAN": statistic.mean(values), "MEDIAN": statistic.median(values),
+                "STDDEV": statistic.stddev(values), "MAX": max(values), "CI": statistic.confidence(values)}
@@ -8,20 +8,25 @@ import time
 import stat
 import shutil
 import json
+import collections
 
 from pyc.streamBench import streamBench
 
 class stream2Bench(streamBench):
     """Class dedicated to the stream2 benchmark"""
 
-    def __init__(self, args, prereq, url):
+    def __init__(self, args, prereq, url, multiProc=False):
         """Initialize stream2 bench class instance"""
-        streamBench.__init__(self, args, prereq, name="stream2")
+        streamBench.__init__(self, args, prereq, name="stream2", multiProc=multiProc)
         self.stream2Dir = "stream2"
         self.prereq = prereq
         self.url = url
         self.steps = ["FILL", "COPY", "DAXPY", "DOT"]
 
+    def __getPbSize__(self, n=1):
+        """Get the problem size (array length)"""
+        return int(streamBench.__getPbSize__(self, n) / 2) # In stream2, 2 arrays are allocated
+
     def downloadTmp(self):
         """Download stream2 benchmark in the temporary directory"""
         os.chdir(self.tmp)
@@ -39,95 +44,103 @@ class stream2Bench(streamBench):
             os.chdir(buildDir)
             if not os.path.exists("stream2.f"):
                 return
-            self.pbSize = self.args.size * 1024. ** 3 # 1GB by default
-            self.pbSize = int(self.pbSize / 8)
-            self.pbSize = int(self.pbSize / 2) # In stream2, 2 arrays are allocated
-            if self.pbSize == 0:
+            if self.__getPbSize__() == 0:
                 return
-            stream2LOC = open("stream2.f", "r").readlines()
-            for idx, loc in enumerate(stream2LOC):
-                oldParam = "parameter (NMIN=30,NMAX=2 000 000)"
-                if loc.find(oldParam) != -1:
-                    newParam = "parameter (NMIN=30,NMAX=" + str(self.pbSize) + ")\n"
-                    stream2LOC[idx] = loc.replace(oldParam, newParam)
-                if self.args.more:
-                    oldParam = "parameter (NTIMES=10,NUMSIZES=32)"
-                    if loc.find(oldParam) != -1:
-                        newParam = "parameter (NTIMES=20,NUMSIZES=64)"
-                        stream2LOC[idx] = loc.replace(oldParam, newParam)
-            stream2Run = "stream2.size=%s" % self.pbSize
-            open(stream2Run + ".f", "w").writelines(stream2LOC)
+            sizes = [self.__getPbSize__()]
+            if self.multiProc: # Processes of multi runs share the problem size: one binary per number of processes
+                sizes += sorted(set([self.__getPbSize__(n) for n in self.args.proc if n > 1]), reverse=True)
             mkf = open("Makefile", "w")
             mkf.write("all:" + "\n")
             buildCmd = cpl["CC"] + " " + cpl["NOOPTFLAGS"] + " -o mysecond.o -c mysecond.c\n"
             mkf.write("\t" + buildCmd)
-            buildCmd = cpl["FC"] + " " + cpl["NOOPTFLAGS"] + " -o " + stream2Run + ".o" + " "
-            buildCmd += "-c " + stream2Run + ".f\n"
-            mkf.write("\t" + buildCmd)
-            buildCmd = cpl["FC"] + " " + cpl["NOOPTFLAGS"] + " -o " + stream2Run + ".exe" + " "
-            buildCmd += stream2Run + ".o mysecond.o\n"
-            mkf.write("\t" + buildCmd)
+            sources = ["Makefile", "mysecond.c"]
+            targets = []
+            for size in sizes:
+                stream2LOC = open("stream2.f", "r").readlines()
+                for idx, loc in enumerate(stream2LOC):
+                    oldParam = "parameter (NMIN=30,NMAX=2 000 000)"
+                    if loc.find(oldParam) != -1:
+                        newParam = "parameter (NMIN=30,NMAX=" + str(size) + ")\n"
+                        stream2LOC[idx] = loc.replace(oldParam, newParam)
+                    if self.args.more:
+                        oldParam = "parameter (NTIMES=10,NUMSIZES=32)"
+                        if loc.find(oldParam) != -1:
+                            newParam = "parameter (NTIMES=20,NUMSIZES=64)"
+                            stream2LOC[idx] = loc.replace(oldParam, newParam)
+                stream2Run = "stream2.size=%s" % size
+                open(stream2Run + ".f", "w").writelines(stream2LOC)
+                buildCmd = cpl["FC"] + " " + cpl["NOOPTFLAGS"] + " -o " + stream2Run + ".o" + " "
+                buildCmd += "-c " + stream2Run + ".f\n"
+                mkf.write("\t" + buildCmd)
+                buildCmd = cpl["FC"] + " " + cpl["NOOPTFLAGS"] + " -o " + stream2Run + ".exe" + " "
+                buildCmd += stream2Run + ".o mysecond.o\n"
+                mkf.write("\t" + buildCmd)
+                sources.append(stream2Run + ".f")
+                targets.append(stream2Run + ".exe")
             mkf.close() # Flush file before make
+            key = self.cache.getKey(sources, cpl)
+            if self.cache.restore(self.bName, key, targets):
+                return
             log = open("make.log", "w")
             print("Building", self.bName, "...", end="")
             start = time.time()
-            rc = subprocess.call(["make", "VERBOSE=1"], stdout=log, stderr=log)
+            rc = subprocess.call(self.__getMakeCmd__(["VERBOSE=1"]), stdout=log, stderr=log)
             if rc != 0:
                 self.buildError(log)
+            else:
+                self.cache.store(self.bName, key, targets)
             self.printStatus(start, rc)
 
     def runNT(self, n, t, runTokens, ext):
         """Run stream2 benchmark in the temporary directory for a given proc and thread configuration"""
-        if n != 1:
+        if n != 1 and not self.multiProc:
             return
         runDir = os.path.join(self.tmp, self.stream2Dir)
         if os.path.exists(runDir):
             os.chdir(runDir)
-            if self.pbSize == 0:
+            pbSize = self.__getPbSize__(n)
+            if pbSize == 0:
                 return
-            stream2Run = "stream2.size=%s" % self.pbSize
+            stream2Run = "stream2.size=%s" % pbSize
             if not os.path.exists(stream2Run + ".exe"):
                 return
-            stream2Log = self.buildLogName("stream2", [("size", self.pbSize, "s")] + runTokens, ext)
-            print("Running", stream2Log, "...", end="")
-            start = time.time()
-            rc = 0
-            if not os.path.exists(stream2Log) or self.args.force:
-                log = open(stream2Log, "w")
-                clDic = {}
-                clDic["EXE"] = "./" + stream2Run + ".exe"
-                rc = self.runCmdLine(log, clDic, begin=start, thd=t)
-            self.printStatus(start, rc)
+            stream2Log = self.buildLogName("stream2", [("size", pbSize, "s")] + runTokens, ext)
+            clDic = {}
+            clDic["EXE"] = "./" + stream2Run + ".exe"
+            if n != 1:
+                clDic = self.__getMultiProcRun__(n, t, clDic["EXE"])
+            self.runLog(stream2Log, clDic, thd=t, cores=n * t)
+
+    def __parseLog__(self, log):
+        """Parse a stream2 log: bandwidths of multi-process runs are summed over processes"""
+        bwMB = collections.OrderedDict()
+        nbProcs = 0
+        foundDataBegin = False
+        for line in self.readLog(log):
+            tokens = line.split()
+            if len(tokens) == 6 and tokens[0] == "Size" and tokens[5] == "DOT":
+                foundDataBegin = True
+                nbProcs += 1
+                continue
+            if not foundDataBegin:
+                continue
+            if len(tokens) != 7:
+                foundDataBegin = False # End of relevant data (of this process)
+                continue
+            N = int(tokens[0])
+            for stepInfo in [("FILL", 2), ("COPY", 3), ("DAXPY", 4), ("DOT", 5)]:
+                if tokens[stepInfo[1]].lower() == "infinity":
+                    continue
+                bw = bwMB[(N, stepInfo[0])] if (N, stepInfo[0]) in bwMB else (0., 0)
+                bwMB[(N, stepInfo[0])] = (bw[0] + float(tokens[stepInfo[1]]), bw[1] + 1)
+        # Aggregate bandwidth makes sense only if all processes report it
+        return [self.__getRecord__(log, k[0], k[1], bwMB[k][0]) for k in bwMB if bwMB[k][1] == nbProcs]
 
     def getMetric(self, printMax=True, getDict=False, getMaxInfo=False, filterLogs=False):
         """Getting stream2 benchmark metric from the temporary directory"""
-        maxMBs = 0.
-        dicMBs = {}
-        maxInfo = {}
         runDir = os.path.join(self.tmp, self.stream2Dir)
-        if os.path.exists(runDir):
-            os.chdir(runDir)
-            for log in self.__listLogs__(os.path.join(runDir, "stream2*.log"), filterLogs):
-                lines = open(log, "r").readlines()
-                foundDataBegin = False
-                for idx in range(0, len(lines) - 1):
-                    tokens = lines[idx].split()
-                    if len(tokens) == 6 and tokens[0] == "Size" and tokens[5] == "DOT":
-                        foundDataBegin = True
-                        continue
-                    if not foundDataBegin:
-                        continue
-                    if len(tokens) != 7:
-                        break # End of relevant data
-                    N = int(tokens[0])
-                    for stepInfo in [("FILL", 2), ("COPY", 3), ("DAXPY", 4), ("DOT", 5)]:
-                        if tokens[stepInfo[1]].lower() == "infinity":
-                            continue
-                        bwMB = float(tokens[stepInfo[1]])
-                        mMBs, mInfo = self.__updateDicMetric__(maxMBs, bwMB, log, N, stepInfo[0], dicMBs)
-                        if mMBs > maxMBs:
-                            maxMBs = mMBs
-                            maxInfo = mInfo
+        logRegExp = os.path.join(runDir, "stream2*.log")
+        maxMBs, dicMBs, maxInfo = self.__getMetricFromStore__(logRegExp, filterLogs)
         self.__printMetricStatus__(printMax, maxMBs, maxInfo)
         return self.__returnMetric__(dicMBs, maxInfo, maxMBs, getDict=getDict, getMaxInfo=getMaxInfo)
 
@@ -144,7 +157,7 @@ class stream2Bench(streamBench):
             os.chmod(exe, os.stat(exe).st_mode | stat.S_IEXEC) # chmod +x
             jsCfg = {}
             jsCfg["EXE"] = exe
-            jsCfg["THD"] = str(logTokens["t="].split("=")[1])
+            jsCfg["THD"] = str(logTokens.get("t"))
             jsCfg["COLOR"] = "orange"
             jsCfg["MARKER"] = "."
             jsCfg["LABEL"] = self.bName
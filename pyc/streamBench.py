@@ -8,42 +8,154 @@ import time
 import stat
 import shutil
 import json
+import multiprocessing
+import distutils.spawn
 
 from pyc.bench import bench
+from pyc.topology import topology
 
 class streamBench(bench):
     """Class dedicated to the stream benchmark"""
 
-    def __init__(self, args, url, name="stream"):
+    def __init__(self, args, url, name="stream", sweep=False, multiProc=False, numa=False):
         """Initialize stream bench class instance"""
         bench.__init__(self, args, name, "RAM-MB/s")
         self.streamDir = "stream"
         self.url = url
-        self.pbSize = 0
         self.colors = ["r", "g", "b", "c"]
         self.steps = ["Copy", "Scale", "Add", "Triad"]
+        self.alone = True # Bandwidth is shared: concurrent jobs would spoil measures
+        self.sweep = sweep # Working set sweep: from L1 to several times the last level cache
+        self.caches = topology.getCaches() if sweep else []
+        self.multiProc = multiProc # Multi-process runs: n concurrent processes, bandwidths are summed
+        self.nodes = topology.getNodes() if numa else {} # NUMA matrix: bandwidth of each (CPU node, memory node)
 
-    def __updateDicMetric__(self, maxMBs, bwMB, log, N, step, dicMBs):
-        """Update metric dictionnary"""
-        maxInfo = {}
-        if maxMBs < bwMB:
-            maxMBs = bwMB
-            maxInfo["LOG"] = os.path.basename(log)
-            maxInfo["EXTRA"] = "N = " + str(N) + ", step = " + step
+    def __runNuma__(self, t, runTokens, ext):
+        """Run the NUMA matrix for a given thread configuration: each CPU node accesses each memory node"""
+        numaDir = os.path.join(self.tmp, self.streamDir, "numa")
+        if not os.path.exists(numaDir):
+            os.makedirs(numaDir)
+        os.chdir(numaDir)
+        streamRun = "stream.size=%s" % self.__getPbSize__()
+        for cpuNode in sorted(self.nodes):
+            if t > len(self.nodes[cpuNode]):
+                continue # Threads must fit in the node
+            for memNode in sorted(self.nodes):
+                bind = topology.getBind(cpuNode, memNode)
+                if bind is None:
+                    continue # Remote memory binding needs numactl
+                numaTokens = [("cpu", cpuNode, "d", max(self.nodes)), ("mem", memNode, "d", max(self.nodes))]
+                sizeTokens = [("size", self.__getPbSize__(), "s")]
+                streamLog = self.buildLogName("stream", sizeTokens + numaTokens + runTokens, ext)
+                clDic = {}
+                clDic["EXE"] = os.path.join("..", streamRun + ".exe")
+                clDic["PREPEND"] = bind
+                self.runLog(streamLog, clDic, thd=t, cores=t)
+
+    def __getMultiProcRun__(self, n, t, exe):
+        """Get the command line dictionnary to run n concurrent processes (bound to disjoint cores, started together)"""
+        if self.__getNumaBind__(): # Processes must stay on the cores of the node the run is bound to
+            cpus = topology.getNodes()[self.args.numaNode]
+        elif hasattr(os, "sched_getaffinity"):
+            cpus = sorted(os.sched_getaffinity(0))
+        else:
+            cpus = list(range(multiprocessing.cpu_count()))
+        taskset = distutils.spawn.find_executable("taskset") if n * t <= len(cpus) else None
+        binds = [",".join([str(c) for c in cpus[p * t:(p + 1) * t]]) for p in range(n)]
+        lines = ["#!/bin/bash\n"]
+        lines.append("# Run %d processes concurrently: each one is bound to its own cores, all start together\n" % n)
+        lines.append("sync=$(mktemp -d)\n")
+        lines.append("binds=(" + " ".join(binds) + ")\n")
+        lines.append("pids=\"\"\n")
+        lines.append("for p in $(seq 0 %d); do\n" % (n - 1))
+        lines.append("  (\n")
+        if taskset: # Otherwise, processes are not bound (more cores needed than available)
+            lines.append("    %s -pc ${binds[$p]} $BASHPID > /dev/null\n" % taskset)
+        lines.append("    : > $sync/ready.$p\n")
+        lines.append("    while [ ! -e $sync/go ]; do sleep 0.01; done # Barrier: do not spin on measured cores\n")
+        lines.append("    exec \"$@\" > $sync/out.$p 2>&1\n")
+        lines.append("  ) &\n")
+        lines.append("  pids=\"$pids $!\"\n")
+        lines.append("done\n")
+        lines.append("while [ $(ls $sync/ready.* 2> /dev/null | wc -l) -lt %d ]; do sleep 0.01; done\n" % n)
+        lines.append(": > $sync/go\n")
+        lines.append("rc=0\n")
+        lines.append("for pid in $pids; do wait $pid || rc=1; done\n")
+        lines.append("for p in $(seq 0 %d); do echo \"Process $p :\"; cat $sync/out.$p; done\n" % (n - 1))
+        lines.append("rm -rf $sync\n")
+        lines.append("exit $rc\n")
+        launcher = "multi.n=%d.t=%d.sh" % (n, t)
+        open(launcher, "w").writelines(lines)
+        os.chmod(launcher, os.stat(launcher).st_mode | stat.S_IEXEC) # chmod +x
+        clDic = {}
+        clDic["EXE"] = "./" + launcher
+        clDic["ARGS"] = [exe]
+        return clDic
+
+    def __getSweepSizes__(self):
+        """Get array sizes of the working set sweep: logarithmic spacing from L1 / 2 to 4 x the last level cache"""
+        sizes = []
+        if len(self.caches) == 0:
+            return sizes
+        wSet = self.caches[0][1] // 2 # Working set (bytes): 3 arrays of doubles
+        while wSet <= 4 * self.caches[-1][1]:
+            sizes.append(int(wSet) // (3 * 8))
+            wSet *= 2. ** 0.5
+        return sizes
+
+    def __buildSweep__(self, cpl):
+        """Build the family of stream binaries of the working set sweep (concurrently)"""
+        sweepDir = os.path.join(self.tmp, self.streamDir, "sweep")
+        if not os.path.exists(sweepDir):
+            os.makedirs(sweepDir)
+        shutil.copyfile(os.path.join(self.tmp, self.streamDir, "stream.c"), os.path.join(sweepDir, "stream.c"))
+        os.chdir(sweepDir)
+        sizes = self.__getSweepSizes__()
+        lines = ["all: " + " ".join(["sweep%d" % size for size in sizes]) + "\n"]
+        for size in sizes:
+            nTimes = max(10, min(100000, 1024 ** 3 // (3 * 8 * size))) # Small arrays: more iterations to be timed
+            lines.append("sweep%d: stream.c\n" % size) # Make can not handle "=" in target names
+            buildCmd = "\t" + cpl["CC"] + " " + cpl["FLAGS"] + " -DSTREAM_ARRAY_SIZE=" + str(size)
+            buildCmd += " -DNTIMES=" + str(nTimes) + " -o stream.size=" + str(size) + ".exe stream.c\n"
+            lines.append(buildCmd)
+        open("Makefile.sweep", "w").writelines(lines)
+        key = self.cache.getKey(["Makefile.sweep", "stream.c"], cpl) # Makefile has sizes
+        targets = ["stream.size=%d.exe" % size for size in sizes]
+        if self.cache.restore(self.bName + " sweep", key, targets):
+            return
+        log = open("make.log", "w")
+        print("Building", self.bName, "sweep (%d sizes) ..." % len(sizes), end="")
+        start = time.time()
+        rc = subprocess.call(self.__getMakeCmd__(["-f", "Makefile.sweep", "all"]), stdout=log, stderr=log)
+        if rc != 0:
+            self.buildError(log)
+        else:
+            self.cache.store(self.bName + " sweep", key, targets)
+        self.printStatus(start, rc)
+
+    def __runSweep__(self, t, runTokens, ext):
+        """Run the working set sweep for a given thread configuration"""
+        sweepDir = os.path.join(self.tmp, self.streamDir, "sweep")
+        if os.path.exists(sweepDir):
+            os.chdir(sweepDir)
+            for size in self.__getSweepSizes__():
+                streamRun = "stream.size=%s" % size
+                if not os.path.exists(streamRun + ".exe"):
+                    continue
+                streamLog = self.buildLogName("stream", [("size", size, "s")] + runTokens, ext)
+                clDic = {}
+                clDic["EXE"] = "./" + streamRun + ".exe"
+                self.runLog(streamLog, clDic, thd=t, cores=t)
+
+    def __getPbSize__(self, n=1):
+        """Get the problem size (array length): read when building or running, options depend on the mode"""
+        return int(self.args.size * 1024. ** 3 / 8 / n) # 1GB by default, shared by the processes of multi runs
+
+    def __getRecord__(self, log, N, step, bwMB):
+        """Get a metric record (keys, value, extra)"""
         logTokens = self.splitLogName(log)
-        t = int(logTokens["t="].split("=")[1])
-        nKey = logTokens["n="]
-        if nKey not in dicMBs:
-            dicMBs[nKey] = {}
-        if N not in dicMBs[nKey]:
-            dicMBs[nKey][N] = {}
-        if t not in dicMBs[nKey][N]:
-            dicMBs[nKey][N][t] = {}
-        if step not in dicMBs[nKey][N][t]:
-            dicMBs[nKey][N][t][step] = bwMB
-        if dicMBs[nKey][N][t][step] < bwMB:
-            dicMBs[nKey][N][t][step] = bwMB
-        return maxMBs, maxInfo
+        t = int(logTokens.get("t"))
+        return ((logTokens["n="], N, t, step), bwMB, "N = " + str(N) + ", step = " + step)
 
     def downloadTmp(self):
         """Download stream benchmark in the temporary directory"""
@@ -65,91 +177,187 @@ class streamBench(bench):
             self.__modifMakefile__(["Makefile"], ["CC", "CFLAGS"], [cpl["CC"], cpl["FLAGS"]])
             self.__modifMakefile__(["Makefile"], ["FF", "FFLAGS"], [cpl["FC"], cpl["FLAGS"]])
             lines = open("Makefile", "r").readlines()
-            self.pbSize = self.args.size * 1024. ** 3 # 1GB by default
-            self.pbSize = int(self.pbSize / 8)
-            if self.pbSize == 0:
+            if self.__getPbSize__() == 0:
                 return
-            target = "stream_pfa.exe: stream.c\n"
-            buildCmd = "\t" + cpl["CC"] + " " + cpl["FLAGS"] + " -DSTREAM_ARRAY_SIZE=" + str(self.pbSize)
-            if self.args.more:
-                buildCmd += " -DNTIMES=20"
-            streamRun = "stream.size=%s" % self.pbSize
-            buildCmd += " -o " + streamRun + ".exe stream.c\n"
-            if len(lines) == 22:
-                lines.append(target)
-                lines.append(buildCmd)
-            else:
-                lines[22] = target
-                lines[23] = buildCmd
+            sizes = [self.__getPbSize__()]
+            if self.multiProc: # Processes of multi runs share the problem size: one binary per number of processes
+                sizes += sorted(set([self.__getPbSize__(n) for n in self.args.proc if n > 1]), reverse=True)
+            lines = lines[:22] + ["stream_pfa.exe: stream.c\n"]
+            targets = ["stream_c.exe", "stream_f.exe"]
+            for size in sizes:
+                buildCmd = "\t" + cpl["CC"] + " " + cpl["FLAGS"] + " -DSTREAM_ARRAY_SIZE=" + str(size)
+                if self.args.more:
+                    buildCmd += " -DNTIMES=20"
+                streamRun = "stream.size=%s" % size
+                lines.append(buildCmd + " -o " + streamRun + ".exe stream.c\n")
+                targets.append(streamRun + ".exe")
             open("Makefile", "w").writelines(lines)
-            log = open("make.log", "w")
-            print("Building", self.bName, "...", end="")
-            start = time.time()
-            rc = subprocess.call(["make", "all", "stream_pfa.exe", "VERBOSE=1"], stdout=log, stderr=log)
-            if rc != 0:
-                self.buildError(log)
-            self.printStatus(start, rc)
+            key = self.cache.getKey(["Makefile", "mysecond.c", "stream.c", "stream.f"], cpl) # Makefile has sizes
+            if not self.cache.restore(self.bName, key, targets):
+                log = open("make.log", "w")
+                print("Building", self.bName, "...", end="")
+                start = time.time()
+                makeCmd = self.__getMakeCmd__(["all", "stream_pfa.exe", "VERBOSE=1"])
+                rc = subprocess.call(makeCmd, stdout=log, stderr=log)
+                if rc != 0:
+                    self.buildError(log)
+                else:
+                    self.cache.store(self.bName, key, targets)
+                self.printStatus(start, rc)
+            if self.sweep:
+                self.__buildSweep__(cpl)
 
     def runNT(self, n, t, runTokens, ext):
         """Run stream benchmark in the temporary directory for a given proc and thread configuration"""
-        if n != 1:
+        if n != 1 and not self.multiProc:
             return
         runDir = os.path.join(self.tmp, self.streamDir)
         if os.path.exists(runDir):
             os.chdir(runDir)
-            if self.pbSize == 0:
+            pbSize = self.__getPbSize__(n)
+            if pbSize == 0:
                 return
-            streamRun = "stream.size=%s" % self.pbSize
+            streamRun = "stream.size=%s" % pbSize
             if not os.path.exists(streamRun + ".exe"):
                 return
-            streamLog = self.buildLogName("stream", [("size", self.pbSize, "s")] + runTokens, ext)
-            print("Running", streamLog, "...", end="")
-            start = time.time()
-            rc = 0
-            if not os.path.exists(streamLog) or self.args.force:
-                log = open(streamLog, "w")
-                clDic = {}
-                clDic["EXE"] = "./" + streamRun + ".exe"
-                rc = self.runCmdLine(log, clDic, begin=start, thd=t)
-            self.printStatus(start, rc)
+            streamLog = self.buildLogName("stream", [("size", pbSize, "s")] + runTokens, ext)
+            clDic = {}
+            clDic["EXE"] = "./" + streamRun + ".exe"
+            if n != 1:
+                clDic = self.__getMultiProcRun__(n, t, clDic["EXE"])
+            self.runLog(streamLog, clDic, thd=t, cores=n * t)
+            if self.sweep and n == 1:
+                self.__runSweep__(t, runTokens, ext)
+            if len(self.nodes) > 0 and n == 1:
+                self.__runNuma__(t, runTokens, ext)
+
+    def __parseLog__(self, log):
+        """Parse a stream log: bandwidths of multi-process runs are summed over processes"""
+        bwMB = {}
+        nbProcs = 0
+        N = -1
+        foundFunction = False
+        for line in self.readLog(log):
+            tokens = line.split()
+            if len(tokens) >= 4 and " ".join(tokens[0:3]) == "Array size =":
+                N = int(tokens[3])
+                nbProcs += 1
+                foundFunction = False
+                continue
+            if N > 0 and len(tokens) > 1 and tokens[0] == "Function":
+                foundFunction = True
+                continue
+            if not foundFunction:
+                continue
+            for s in self.steps:
+                if len(tokens) >= 2 and tokens[0] == s + ":" and tokens[1].lower() != "inf":
+                    bwMB[s] = (bwMB[s][0] + float(tokens[1]), bwMB[s][1] + 1) if s in bwMB else (float(tokens[1]), 1)
+                    break
+        # Aggregate bandwidth makes sense only if all processes report it
+        return [self.__getRecord__(log, N, s, bwMB[s][0]) for s in self.steps if s in bwMB and bwMB[s][1] == nbProcs]
 
     def getMetric(self, printMax=True, getDict=False, getMaxInfo=False, filterLogs=False):
         """Getting stream benchmark metric from the temporary directory"""
-        maxMBs = 0.
-        dicMBs = {}
-        maxInfo = {}
         runDir = os.path.join(self.tmp, self.streamDir)
-        if os.path.exists(runDir):
-            os.chdir(runDir)
-            for log in self.__listLogs__(os.path.join(runDir, "stream*.log"), filterLogs):
-                lines = open(log, "r").readlines()
-                N = -1
-                foundFunction = False
-                for line in lines:
-                    tokens = line.split()
-                    if len(tokens) >= 4 and " ".join(tokens[0:3]) == "Array size =":
-                        N = int(tokens[3])
-                        continue
-                    if N > 0 and len(tokens) > 1 and tokens[0] == "Function":
-                        foundFunction = True
-                        continue
-                    if not foundFunction:
-                        continue
-                    for s in self.steps:
-                        if len(tokens) >= 2 and tokens[0] == s + ":" and tokens[1].lower() != "inf":
-                            bwMB = float(tokens[1])
-                            mMBs, mInfo = self.__updateDicMetric__(maxMBs, bwMB, log, N, s, dicMBs)
-                            if mMBs > maxMBs:
-                                maxMBs = mMBs
-                                maxInfo = mInfo
-                            break
+        logRegExp = os.path.join(runDir, "stream*.log")
+        maxMBs, dicMBs, maxInfo = self.__getMetricFromStore__(logRegExp, filterLogs)
         self.__printMetricStatus__(printMax, maxMBs, maxInfo)
         return self.__returnMetric__(dicMBs, maxInfo, maxMBs, getDict=getDict, getMaxInfo=getMaxInfo)
 
+    def getSweep(self, filterLogs=False):
+        """Getting stream working set sweep results from the temporary directory"""
+        logRegExp = os.path.join(self.tmp, self.streamDir, "sweep", "stream*.log")
+        return self.__getMetricFromStore__(logRegExp, filterLogs)[1]
+
+    def getCeilings(self):
+        """Get bandwidth ceilings (MB/s) of each cache level (L1, L2, ...) and of the RAM from the sweep"""
+        ceilings = {}
+        if not self.sweep:
+            return ceilings
+        dicMBs = self.getSweep()
+        for nKey in dicMBs:
+            for N in dicMBs[nKey]:
+                level = "RAM"
+                for cache in self.caches:
+                    if 3 * 8 * N <= cache[1]: # Working set fits in this cache level
+                        level = "L%d" % cache[0]
+                        break
+                for t in dicMBs[nKey][N]:
+                    for s in dicMBs[nKey][N][t]:
+                        ceilings[level] = max(ceilings[level] if level in ceilings else 0., dicMBs[nKey][N][t][s])
+        self.store.setCeilings(self.bName, ceilings)
+        return ceilings
+
+    def getNumaMatrix(self):
+        """Get the NUMA matrix: best bandwidth (MB/s) of each (CPU node, memory node)"""
+        matrix = {}
+        if len(self.nodes) == 0:
+            return matrix
+        lsLogs = self.__listLogs__(os.path.join(self.tmp, self.streamDir, "numa", "stream*.log"), False)
+        dicRecords = self.store.getRecords(self.bName, lsLogs, self.splitLogName, self.__parseLog__)
+        for log in lsLogs:
+            logTokens = self.splitLogName(log)
+            numaKey = (int(logTokens.get("cpu")), int(logTokens.get("mem")))
+            for record in dicRecords[os.path.abspath(log)]:
+                matrix[numaKey] = max(matrix[numaKey] if numaKey in matrix else 0., record[1])
+        self.store.setNumaMatrix(self.bName, matrix)
+        return matrix
+
+    def __plotNuma__(self):
+        """Plotting the NUMA matrix: bandwidth versus memory node for each CPU node"""
+        matrix = self.getNumaMatrix()
+        plotDic = {}
+        for numaKey in matrix:
+            if numaKey[1] not in plotDic:
+                plotDic[numaKey[1]] = {}
+            plotDic[numaKey[1]]["CPU node %d" % numaKey[0]] = matrix[numaKey]
+        steps = ["CPU node %d" % cpuNode for cpuNode in sorted(self.nodes)]
+        self.plt.setPlotAttr(xTickInt=True)
+        plotName = self.plt.buildPlotName([self.bName, "numa"])
+        self.plt.plot2DGraph(plotName, plotDic, steps, "Memory node", "MB/s")
+
+    def __plotSweep__(self, nKey):
+        """Plotting stream working set sweep: bandwidth versus working set per kernel and per thread configuration"""
+        dicMBs = self.getSweep(filterLogs=True)
+        if nKey not in dicMBs:
+            return
+        lsT = sorted(list(set([t for N in dicMBs[nKey] for t in dicMBs[nKey][N]])))
+        for t in lsT:
+            plotDic = {}
+            for N in dicMBs[nKey]:
+                if t in dicMBs[nKey][N]:
+                    plotDic[3 * 8 * N // 1024] = dicMBs[nKey][N][t] # Working set in kB
+            self.plt.setPlotAttr(colors=self.colors, xLogScale=True)
+            plotName = self.plt.buildPlotName([self.bName, "sweep", nKey, "t=%d" % t])
+            self.plt.plot2DGraph(plotName, plotDic, self.steps, "Working set (kB)", "MB/s")
+
+    def plot(self):
+        """Plot stream benchmark results over all possible configurations"""
+        bench.plot(self)
+        if self.multiProc:
+            self.__plotMultiProc__()
+        if len(self.nodes) > 0:
+            self.__plotNuma__()
+
+    def __plotMultiProc__(self):
+        """Plotting aggregate bandwidth of multi-process runs versus processes and threads (biggest N of each n)"""
+        dicMBs = self.getMetric(printMax=False, getDict=True, filterLogs=True)
+        plotDic = {}
+        totN = 0 # Total size: processes share the arrays
+        for nKey in [nKey for nKey in dicMBs if len(dicMBs[nKey]) > 0]:
+            n = int(nKey.split("=")[1])
+            plotDic[n] = dicMBs[nKey][max(dicMBs[nKey])]
+            totN = max(totN, n * max(dicMBs[nKey]))
+        if len(plotDic) == 0:
+            return
+        self.plt.setPlotAttr(colors=self.colors, xTickInt=True, yTickInt=True)
+        plotName = self.plt.buildPlotName([self.bName, "aggregate", "N=%d" % totN])
+        self.plt.plot3DGraph(plotName, plotDic, self.steps, "Processes", "Threads", "MB/s")
+
     def plotN(self, nKey):
         """Plotting stream benchmark results from the temporary directory for a given proc configuration"""
         n = int(nKey.split("=")[1])
-        if n != 1:
+        if n != 1 and not self.multiProc:
             return
         dicMBs = self.getMetric(printMax=False, getDict=True, filterLogs=True)
         self.plt.setPlotAttr(colors=self.colors, yTickInt=True)
@@ -166,6 +374,8 @@ class streamBench(bench):
         if nKey in dicMBs:
             plotName = self.plt.buildPlotName([self.bName, nKey])
             self.plt.plot3DGraph(plotName, dicMBs[nKey], steps, "N", "Threads", "MB/s")
+        if self.sweep:
+            self.__plotSweep__(nKey)
 
     def genUseCase(self):
         """Generate a use case from the best stream benchmark run"""
@@ -180,7 +390,7 @@ class streamBench(bench):
             os.chmod(exe, os.stat(exe).st_mode | stat.S_IEXEC) # chmod +x
             jsCfg = {}
             jsCfg["EXE"] = exe
-            jsCfg["THD"] = str(logTokens["t="].split("=")[1])
+            jsCfg["THD"] = str(logTokens.get("t"))
             jsCfg["COLOR"] = "magenta"
             jsCfg["MARKER"] = "."
             jsCfg["LABEL"] = self.bName
@@ -0,0 +1,112 @@
+"""This module exports the topology class"""
+
+from __future__ import print_function
+
+import os
+import distutils.spawn
+
+class topology(object):
+    """Topology class designed to get features of the machine (caches, ...) from sysfs"""
+
+    sysCPU = "/sys/devices/system/cpu"
+    sysNode = "/sys/devices/system/node"
+
+    @staticmethod
+    def __readSysFile__(sysFile):
+        """Read a sysfs file: None if it does not exist"""
+        if not os.path.exists(sysFile):
+            return None
+        return open(sysFile, "r").read().strip()
+
+    @staticmethod
+    def __getSizeInBytes__(size):
+        """Convert a sysfs size (like 32K, 8M) to bytes"""
+        units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+        if size[-1] in units:
+            return int(size[:-1]) * units[size[-1]]
+        return int(size)
+
+    @staticmethod
+    def __getCpuList__(cpuList):
+        """Convert a sysfs CPU list (like 0-3,8-11) to a list of CPUs"""
+        cpus = []
+        for cpuRange in cpuList.split(","):
+            if cpuRange.find("-") != -1:
+                cpuRange = cpuRange.split("-")
+                cpus += list(range(int(cpuRange[0]), int(cpuRange[1]) + 1))
+            elif cpuRange != "":
+                cpus.append(int(cpuRange))
+        return cpus
+
+    @staticmethod
+    def getNodes():
+        """Get NUMA nodes: dictionnary of CPUs per node (nodes without CPU are skipped)"""
+        nodes = {}
+        if not os.path.exists(topology.sysNode):
+            return nodes
+        for node in os.listdir(topology.sysNode):
+            if not node.startswith("node") or not node[len("node"):].isdigit():
+                continue
+            cpuList = topology.__readSysFile__(os.path.join(topology.sysNode, node, "cpulist"))
+            cpus = topology.__getCpuList__(cpuList) if cpuList else []
+            if len(cpus) > 0:
+                nodes[int(node[len("node"):])] = cpus
+        return nodes
+
+    @staticmethod
+    def getBind(cpuNode, memNode=None):
+        """Get the command line prefix that binds a run to NUMA nodes (CPU and memory): None if it can not be done"""
+        memNode = cpuNode if memNode is None else memNode
+        nodes = topology.getNodes()
+        if cpuNode not in nodes:
+            return None
+        numactl = distutils.spawn.find_executable("numactl")
+        if numactl:
+            return [numactl, "--cpunodebind=%d" % cpuNode, "--membind=%d" % memNode]
+        taskset = distutils.spawn.find_executable("taskset")
+        if taskset and memNode == cpuNode: # Memory is local if it is first touched by CPUs of the node
+            return [taskset, "-c", ",".join([str(c) for c in nodes[cpuNode]])]
+        return None
+
+    @staticmethod
+    def getMemory():
+        """Get the physical memory (bytes) from /proc/meminfo: 0 if it can not be found"""
+        if not os.path.exists("/proc/meminfo"):
+            return 0
+        for line in open("/proc/meminfo", "r"):
+            tokens = line.split()
+            if len(tokens) >= 2 and tokens[0] == "MemTotal:":
+                return topology.__getSizeInBytes__(tokens[1] + "K") # Size is given in kB
+        return 0
+
+    @staticmethod
+    def getCpuModel():
+        """Get the CPU model of the first CPU from /proc/cpuinfo: empty if it can not be found"""
+        if not os.path.exists("/proc/cpuinfo"):
+            return ""
+        info = {}
+        for line in open("/proc/cpuinfo", "r"):
+            if line.strip() == "" and len(info) > 0:
+                break # First CPU only
+            if line.find(":") != -1:
+                info[line.split(":")[0].strip()] = line.split(":", 1)[1].strip()
+        keys = ["vendor_id", "cpu family", "model", "model name", "CPU implementer", "CPU part", "cpu"] # x86, arm, ppc
+        return ", ".join([k + " " + info[k] for k in keys if k in info])
+
+    @staticmethod
+    def getCaches():
+        """Get data caches of the first CPU: list of (level, size in bytes) sorted by level"""
+        caches = []
+        cacheDir = os.path.join(topology.sysCPU, "cpu0", "cache")
+        if not os.path.exists(cacheDir):
+            return caches
+        for index in sorted(os.listdir(cacheDir)):
+            if not index.startswith("index"):
+                continue
+            level = topology.__readSysFile__(os.path.join(cacheDir, index, "level"))
+            cType = topology.__readSysFile__(os.path.join(cacheDir, index, "type"))
+            size = topology.__readSysFile__(os.path.join(cacheDir, index, "size"))
+            if level is None or size is None or cType == "Instruction":
+                continue
+            caches.append((int(level), topology.__getSizeInBytes__(size)))
+        return sorted(caches)
@@ -8,8 +8,10 @@ import glob
 import json
 import stat
 import time
+import shutil
 
 from pyc.perfMonitor import perfMonitor
+from pyc.logFile import logFile
 
 class useCase(perfMonitor):
     """Use case class designed to handle general purpose use case run-time topics"""
@@ -63,6 +65,8 @@ class useCase(perfMonitor):
     def __createRunShell__(self, n, t, a, logTokens):
         """Create run shell if not present"""
         runSh = "run." + logTokens["n="] + "." + logTokens["t="] + ".sh"
+        if "pl=" in logTokens: # mpirun options depend on the placement policy
+            runSh = "run." + logTokens["n="] + "." + logTokens["t="] + "." + logTokens["pl="] + ".sh"
         if not os.path.exists(runSh):
             runLOC = []
             ucRunLOC = os.path.join(self.pth, "run.sh")
@@ -84,13 +88,13 @@ class useCase(perfMonitor):
             os.chmod(runSh, os.stat(runSh).st_mode | stat.S_IEXEC) # chmod +x
         return runSh
 
-    def __getUseCaseStatLog__(self, ntKey, lsMsg, msg):
-        """Get use case statistics log"""
+    def __getUseCaseStatLog__(self, ntKey, lsMsg, msg, plKey=None):
+        """Get use case statistics log (of a given placement policy if any)"""
         perfLog = None
         logPath = os.path.join(os.path.basename(self.pth) + ".perf-stat" + ntKey + "*")
         for logName in glob.glob(logPath):
             allLogIDFound = True
-            for logID in self.logID + self.args.logID:
+            for logID in self.logID + self.args.logID + ([plKey] if plKey else []):
                 if logName.find(logID) == -1:
                     allLogIDFound = False
             if not allLogIDFound:
@@ -101,7 +105,7 @@ class useCase(perfMonitor):
         if not perfLog:
             lsMsg.append("  - %4s : can not find log in %s" % (msg, os.getcwd()))
             return perfLog
-        if not os.path.exists(perfLog):
+        if not logFile.exists(perfLog):
             lsMsg.append("  - %4s : missing %s" % (msg, os.path.basename(perfLog)))
             perfLog = None
         return perfLog
@@ -137,25 +141,40 @@ class useCase(perfMonitor):
         if not perfLog:
             return mc, elapsedSec, lsMsg
         factor, unit = 1., ""
-        lines = open(perfLog, "r").readlines()
+        dicEvtScore = {} # Scores of all events are gathered in one pass
+        dicTokenEvt = {}
+        for evt in lsEvt:
+            if evt in dicEvtScore:
+                continue
+            dicEvtScore[evt] = []
+            lsToken = [evt, evt[:-2]] if evt[-2:] == ":u" else [evt] # perf may drop :u
+            for token in lsToken:
+                if token not in dicTokenEvt:
+                    dicTokenEvt[token] = []
+                dicTokenEvt[token].append(evt)
+        foundCounter = False
+        foundEvt = False
+        for line in self.readLog(perfLog):
+            if line.find("Performance counter stats") != -1:
+                foundCounter = True
+            if not foundCounter:
+                continue
+            tokens = line.split()
+            if len(tokens) >= 2 and tokens[1] in dicTokenEvt:
+                for evt in dicTokenEvt[tokens[1]]:
+                    dicEvtScore[evt].append(tokens[0])
+                foundEvt = True
+            if foundEvt:
+                if len(tokens) == 4 and " ".join(tokens[1:]) == "seconds time elapsed":
+                    elapsedSec = float(tokens[0])
         for evt in lsEvt:
-            foundCounter = False
             foundEvt = False
-            for line in lines:
-                if line.find("Performance counter stats") != -1:
-                    foundCounter = True
-                if not foundCounter:
-                    continue
-                tokens = line.split()
-                if len(tokens) >= 2 and (tokens[1] == evt or tokens[1] + ":u" == evt): # perf may drop :u
-                    evtMc, factor, unit = self.__getUseCaseMetricFromEvt__(evt, tokens[0], GFOrCM)
-                    mc += evtMc
-                    foundEvt = True
-                    if self.verbose:
-                        lsMsg.append("  - %4s : %30s %20d (%20d)" % (GFOrCM, evt, evtMc, mc))
-                if foundEvt:
-                    if len(tokens) == 4 and " ".join(tokens[1:]) == "seconds time elapsed":
-                        elapsedSec = float(tokens[0])
+            for evtScore in dicEvtScore[evt]:
+                evtMc, factor, unit = self.__getUseCaseMetricFromEvt__(evt, evtScore, GFOrCM)
+                mc += evtMc
+                foundEvt = True
+                if self.verbose:
+                    lsMsg.append("  - %4s : %30s %20d (%20d)" % (GFOrCM, evt, evtMc, mc))
             if self.verbose:
                 if not foundEvt:
                     lsMsg.append("  - %4s : %30s not found" % (GFOrCM, evt))
@@ -209,6 +228,16 @@ class useCase(perfMonitor):
                     self.__tailLog__(perfLog)
                     self.__runUseCaseNTError__(rc)
 
+    def __runUseCaseNTPerfTimeline__(self, logTokens, runSh, t):
+        """Run perf-record timeline for a given use case"""
+        if hasattr(self.args, "timeline") and self.args.timeline:
+            perfLog = os.path.basename(self.pth) + ".perf-timeline"
+            lsEvt = self.pfm4TpReg + self.args.perfTpEvt # All events are recorded by one perf-record session
+            rc, perfLog = self.runPerfTimeline(perfLog, logTokens, runSh, t, lsEvt, float(self.args.timeline))
+            if rc != 0:
+                self.__tailLog__(perfLog)
+                self.__runUseCaseNTError__(rc)
+
     def __getUseCaseMemoryHistory__(self, nKey, tKey):
         """Get use case memory information"""
         dicMB = None
@@ -220,19 +249,23 @@ class useCase(perfMonitor):
             if not dicMB:
                 dicMB = {}
             mega = 1024. ** 2
-            lines = open(log, "r").readlines()
-            lsPID = lines[0].split()[2:]
-            for pid in lsPID:
-                dicMB[pid] = {}
-                for idx in range(2, len(lines)):
-                    tokens = lines[idx].split()
-                    t = int(tokens[0])
+            for idx, line in enumerate(self.readLog(log)):
+                tokens = line.split()
+                if idx == 0:
+                    lsPID = tokens[2:]
+                    for pid in lsPID:
+                        dicMB[pid] = {}
+                if idx < 2:
+                    continue
+                t = int(tokens[0])
+                for pid in lsPID:
                     if t not in dicMB[pid]:
                         dicMB[pid][t] = {}
                     dicMB[pid][t]["vms"] = float(tokens[1]) / mega
                     dicMB[pid][t]["rss"] = float(tokens[2]) / mega
                     dicMB[pid][t]["uss"] = float(tokens[3]) / mega
                     dicMB[pid][t]["swap"] = float(tokens[4]) / mega
+            for pid in lsPID:
                 if self.verbose:
                     for step in ["vms", "rss", "uss", "swap"]:
                         mb = [dicMB[pid][t][step] for t in dicMB[pid].keys()]
@@ -253,16 +286,15 @@ class useCase(perfMonitor):
     def __getReport__(self):
         """Get perf-report statistics"""
         dicPct = None
-        lsFct = []
-        lsStep = []
+        lsFct = set()
+        lsStep = set()
         mc = None
         for log in self.__listLogs__(os.path.join("n=*.t=*", "*.perf-report.*.log"), True):
             if not dicPct:
                 dicPct = {}
             logTokens = self.splitLogName(log)
             step = logTokens["n="] + "." + logTokens["t="]
-            lines = open(log, "r").readlines()
-            for line in lines:
+            for line in self.readLog(log):
                 tokens = line.split()
                 if len(tokens) >= 2 and tokens[0] == "#" and tokens[1] == "Samples:":
                     mc = tokens[len(tokens)-1]
@@ -282,12 +314,10 @@ class useCase(perfMonitor):
                     if fct not in dicPct[mc]:
                         dicPct[mc][fct] = {}
                     dicPct[mc][fct][step] = pct
-                    lsFct.append(fct)
-                    lsFct = list(set(lsFct)) # Remove duplicates
-                    lsStep.append(step)
-                    lsStep = list(set(lsStep)) # Remove duplicates
+                    lsFct.add(fct)
+                    lsStep.add(step)
         self.__fillDictMissingDataWithZero__(dicPct, lsFct, lsStep)
-        return dicPct, lsStep
+        return dicPct, list(lsStep)
 
     def __plotMemoryHistory__(self, nKey, tKey):
         """Plot use case memory history"""
@@ -320,16 +350,20 @@ class useCase(perfMonitor):
             lsMsg.append("  - log found " + log)
             if not dicCPU:
                 dicCPU = {}
-            lines = open(log, "r").readlines()
-            lsPID = lines[0].split()[2:]
-            for pid in lsPID:
-                dicCPU[pid] = {}
-                for idx in range(2, len(lines)):
-                    tokens = lines[idx].split()
-                    t = int(tokens[0])
+            for idx, line in enumerate(self.readLog(log)):
+                tokens = line.split()
+                if idx == 0:
+                    lsPID = tokens[2:]
+                    for pid in lsPID:
+                        dicCPU[pid] = {}
+                if idx < 2:
+                    continue
+                t = int(tokens[0])
+                for pid in lsPID:
                     if t not in dicCPU[pid]:
                         dicCPU[pid][t] = {}
                     dicCPU[pid][t]["cpu"] = float(tokens[1])
+            for pid in lsPID:
                 if self.verbose:
                     pc = [dicCPU[pid][t]["cpu"] for t in dicCPU[pid].keys()]
                     msg = "  - PID " + pid + ", %4s" % "cpu" + " : min %11.3f, max %11.3f" % (min(pc), max(pc))
@@ -362,15 +396,12 @@ class useCase(perfMonitor):
         """Get use case perf-top information for a given file of a given event"""
         lsFctLog = []
         foundPerfTop = False
-        lines = open(logName, "r").readlines()
-        for line in lines:
+        for line in self.readLog(logName, end="mapped keys"): # May appear when perf-top is killed
             if line.find("PerfTop") != -1:
                 foundPerfTop = True
                 continue
             if not foundPerfTop:
                 continue
-            if line.lower().find("mapped keys") != -1: # May appear when perf-top is killed
-                break # End of relevant data
             tokens = line.split()
             if len(tokens) != 4:
                 continue
@@ -411,8 +442,8 @@ class useCase(perfMonitor):
         lsMsg = []
         nbEmptyLogs = 0
         logPath = os.path.join(os.path.basename(self.pth) + ".perf-top." + evt + "." + nKey + "." + tKey + "*.log")
-        for logName in glob.glob(logPath):
-            tokens = logName.split(".")
+        for logName in logFile.glob(logPath):
+            tokens = logFile.baseName(logName).split(".")
             if tokens[-2] == "sh":
                 continue
             if not dicPT:
@@ -435,6 +466,36 @@ class useCase(perfMonitor):
             lsMsg.append("  - For " + evt + ", perf-top history not available")
         return dicPT, lsPIDThd, lsMsg
 
+    def __getUseCasePerfTimeline__(self, evt, nKey, tKey):
+        """Get use case perf-record timeline for a given event: same information as perf-top history"""
+        dicPT = None
+        lsFct = []
+        lsPIDThd = []
+        lsMsg = []
+        logPath = os.path.join(os.path.basename(self.pth) + ".perf-timeline." + evt + "." + nKey + "." + tKey + "*.log")
+        for logName in logFile.glob(logPath):
+            lsMsg.append("  - log found " + logName)
+            for line in self.readLog(logName):
+                tokens = line.split(None, 3)
+                if len(tokens) != 4 or tokens[0] == "#":
+                    continue
+                t, pidThd, pct, fct = float(tokens[0]), tokens[1], float(tokens[2]), tokens[3].strip()
+                if pct < self.args.ptMinPct:
+                    continue
+                if len([excFct for excFct in self.args.ptExclude if fct.find(excFct) != -1]) > 0:
+                    continue
+                if not dicPT:
+                    dicPT = {}
+                dicPT.setdefault(t, {}).setdefault(fct, {})[pidThd] = pct
+                lsFct.append(fct)
+                lsPIDThd.append(pidThd)
+        lsFct = list(set(lsFct)) # Remove duplicates
+        lsPIDThd = sorted(list(set(lsPIDThd))) # Remove duplicates
+        self.__fillDictMissingDataWithZero__(dicPT, lsFct, lsPIDThd)
+        if not dicPT:
+            lsMsg.append("  - For " + evt + ", perf-record timeline not available")
+        return dicPT, lsPIDThd, lsMsg
+
     def __plotPerfTopHistory__(self, nKey, tKey):
         """Plot use case perf-top history"""
         n = int(nKey.split("=")[1])
@@ -442,19 +503,22 @@ class useCase(perfMonitor):
         uc = os.path.basename(self.pth)
         print("Analysing", uc, "perf-top history for n =", n, "and for t =", t, "...")
         lsEvt = self.pfm4TpReg + self.args.perfTpEvt
+        lsHistory = [("perf-top", "history", self.__getUseCasePerfTopHistory__)]
+        lsHistory.append(("perf-timeline", "timeline", self.__getUseCasePerfTimeline__)) # ucase -l
         for evt in lsEvt:
-            print("Analysing", uc, "perf-top history for n =", n, "and for t =", t, "and for", evt, "...", end="")
-            dicPT, lsPIDThd, lsMsg = self.__getUseCasePerfTopHistory__(evt, nKey, tKey)
-            print(" OK" if dicPT else " No result found")
-            if self.verbose: # Print verbose message after OK message
-                for msg in lsMsg:
-                    print(msg)
-            if dicPT:
-                plotName = os.path.basename(self.pth) + ".perf-top." + evt
-                plotName += "." + nKey if n != -1 else ".seq"
-                plotName += "." + tKey
-                self.plt.setPlotAttr(yTickStr=True)
-                self.plt.plot3DGraph(plotName, dicPT, lsPIDThd, "Time (sec)", None, "%")
+            for kind, name, getHistory in lsHistory:
+                print("Analysing", uc, "perf-top", name, "for n =", n, "and for t =", t, "and for", evt, "...", end="")
+                dicPT, lsPIDThd, lsMsg = getHistory(evt, nKey, tKey)
+                print(" OK" if dicPT else " No result found")
+                if self.verbose: # Print verbose message after OK message
+                    for msg in lsMsg:
+                        print(msg)
+                if dicPT:
+                    plotName = os.path.basename(self.pth) + "." + kind + "." + evt
+                    plotName += "." + nKey if n != -1 else ".seq"
+                    plotName += "." + tKey
+                    self.plt.setPlotAttr(yTickStr=True)
+                    self.plt.plot3DGraph(plotName, dicPT, lsPIDThd, "Time (sec)", None, "%")
 
     def __getUseCaseGFStat__(self, ntKey):
         """Get use case GFlops statistics for a given proc and thread configuration"""
@@ -483,23 +547,25 @@ class useCase(perfMonitor):
                 if n == -1: # Sequential
                     n = 1
                 t = int(tKey.split("=")[1])
-                lsMsg = []
-                perfLog = self.__getUseCaseStatLog__("." + nKey + "." + tKey, lsMsg, "SU")
-                if not perfLog:
-                    if self.verbose: # Print verbose message after OK message
-                        for msg in lsMsg:
-                            print(msg)
-                else:
-                    lines = open(perfLog, "r").readlines()
-                    lastLine = lines[len(lines)-1].split() if len(lines) >= 1 else []
-                    if len(lastLine) >= 3 and lastLine[0] == "time":
-                        elapsedTime = float(lastLine[2])
-                        if n not in dicET:
-                            dicET[n] = {}
-                        if t not in dicET[n]:
-                            dicET[n][t] = {}
-                        dicET[n][t]["elapse"] = elapsedTime
-                        nbRuns += 1
+                for pl in self.__getPlacements__():
+                    plKey = ".pl=" + pl[0].replace(".", "-") if pl else None # Token of the placement policy
+                    lsMsg = []
+                    perfLog = self.__getUseCaseStatLog__("." + nKey + "." + tKey, lsMsg, "SU", plKey)
+                    if not perfLog:
+                        if self.verbose: # Print verbose message after OK message
+                            for msg in lsMsg:
+                                print(msg)
+                    else:
+                        lines = self.readLastLines(perfLog, 1)
+                        lastLine = lines[0].split() if len(lines) >= 1 else []
+                        if len(lastLine) >= 3 and lastLine[0] == "time":
+                            elapsedTime = float(lastLine[2])
+                            if n not in dicET:
+                                dicET[n] = {}
+                            if t not in dicET[n]:
+                                dicET[n][t] = {}
+                            dicET[n][t]["elapse" + plKey if plKey else "elapse"] = elapsedTime
+                            nbRuns += 1
                 os.chdir(self.pth)
         return nbRuns, dicET
 
@@ -544,8 +610,8 @@ class useCase(perfMonitor):
         print("") # Output separator for clarity
         return rc
 
-    def prepUseCase(self):
-        """Prepare the use case"""
+    def prepUseCase(self, cpl=None):
+        """Prepare the use case (with the compilers and flags of a flag set if any)"""
         rc = 0
         if os.path.exists(self.pth):
             os.chdir(self.pth)
@@ -553,16 +619,60 @@ class useCase(perfMonitor):
                 log = open("prep.log", "w")
                 print("Preparing", os.path.basename(self.pth), "...", end="")
                 start = time.time()
-                rc = subprocess.call(["./prep.sh"], stdout=log, stderr=log)
+                env = None
+                if cpl: # Flag set: export compilers and flags the usual way (Makefiles, configure, cmake)
+                    env = os.environ.copy()
+                    for k, v in [("CC", cpl["CC"]), ("FC", cpl["FC"]), ("MPICC", cpl["MPICC"]),
+                                 ("MPIFC", cpl["MPIFC"]), ("CFLAGS", cpl["FLAGS"]), ("CXXFLAGS", cpl["FLAGS"]),
+                                 ("FFLAGS", cpl["FLAGS"]), ("LDFLAGS", cpl["LINKFLAGS"])]:
+                        if v:
+                            env[k] = v
+                    env["PFA_FLAGSET"] = os.path.basename(self.pth).split(".fs=")[-1]
+                rc = subprocess.call(["./prep.sh"], stdout=log, stderr=log, env=env)
                 if rc != 0:
                     self.buildError(log)
                 self.printStatus(start, rc)
                 print("") # Output separator for clarity
         return rc
 
-    def runUseCase(self):
-        """Run the use case over all possible proc and thread configurations"""
-        rc = self.prepUseCase()
+    def __getFlagSetPath__(self, ucPth, flagSet):
+        """Get the directory of a flag set variant of the use case: a sibling copy of the use case files"""
+        fsPth = ucPth.rstrip(os.sep) + ".fs=" + flagSet
+        ignore = shutil.ignore_patterns("*.log", "n=*.t=*") # Skip logs and run directories
+        if not os.path.exists(fsPth):
+            shutil.copytree(ucPth, fsPth, ignore=ignore) # Keep permissions (prep.sh, run.sh) and sub-directories
+        else: # Refresh the copy: runs of the variant are kept
+            names = os.listdir(ucPth)
+            for name in [name for name in names if name not in ignore(ucPth, names)]:
+                src, dst = os.path.join(ucPth, name), os.path.join(fsPth, name)
+                if os.path.isdir(src):
+                    if os.path.exists(dst):
+                        shutil.rmtree(dst)
+                    shutil.copytree(src, dst, ignore=ignore)
+                else:
+                    shutil.copy(src, dst)
+        jsCfg = json.load(open(os.path.join(fsPth, "usc.json"), "r"))
+        if "LABEL" in jsCfg: # Variants must be told apart on plots
+            jsCfg["LABEL"] = jsCfg["LABEL"] + "-" + flagSet
+        json.dump(jsCfg, open(os.path.join(fsPth, "usc.json"), "w"))
+        return fsPth
+
+    def runUseCase(self, cpls=None):
+        """Run the use case over all possible proc and thread configurations (built with each flag set if any)"""
+        if os.path.basename(self.pth.rstrip(os.sep)).find(".fs=") != -1:
+            print("Skipping", os.path.basename(self.pth), ": flag set variant (run with its use case)")
+            return
+        self.__runUseCase__()
+        if cpls and os.path.exists(os.path.join(self.pth, "prep.sh")): # Variants make sense only if the use case builds
+            ucPth = self.pth
+            for flagSet in sorted(cpls):
+                self.pth = self.__getFlagSetPath__(ucPth, flagSet)
+                self.__runUseCase__(cpls[flagSet])
+            self.pth = ucPth
+
+    def __runUseCase__(self, cpl=None):
+        """Run the use case over all possible proc and thread configurations once it is prepared"""
+        rc = self.prepUseCase(cpl)
         if rc == 0:
             if "EXE" in self.exe:
                 self.runObjDump(os.path.basename(self.pth) + ".objdump.log", self.exe["EXE"])
@@ -572,10 +682,13 @@ class useCase(perfMonitor):
                     continue
                 t = self.exe["THD"][idx]
                 a = self.exe["ARGS"][idx] if "ARGS" in self.exe else None
-                runTokens = [("n", n, "d", max(self.exe["MPI"]))]
-                runTokens += [("t", t, "d", max(self.exe["MPI"]))]
-                self.runUseCaseNT(n, t, a, runTokens)
-                print("") # Output separator for clarity
+                for self.placement in self.__getPlacements__():
+                    runTokens = [("n", n, "d", max(self.exe["MPI"]))]
+                    runTokens += [("t", t, "d", max(self.exe["MPI"]))]
+                    runTokens += self.__getNumaTokens__() + self.__getPlacementTokens__()
+                    self.runUseCaseNT(n, t, a, runTokens)
+                    print("") # Output separator for clarity
+                self.placement = None
 
     def runUseCaseNT(self, n, t, a, runTokens):
         """Run the use case for a given proc and thread configuration"""
@@ -593,6 +706,7 @@ class useCase(perfMonitor):
             self.__runUseCaseNTPerfStat__(logTokens, runSh, t)
             self.__runUseCaseNTPerfReport__(logTokens, runSh, t)
             self.__runUseCaseNTPerfTop__(logTokens, runSh, t)
+            self.__runUseCaseNTPerfTimeline__(logTokens, runSh, t)
 
     def getUseCaseStat(self):
         """Get use case statistics"""
@@ -672,23 +786,30 @@ class useCase(perfMonitor):
         """Plot use case speed up"""
         nbRuns, dicET = self.__getElapsedTimeDict__()
         if nbRuns > 1:
+            steps = sorted(list(set([s for nKey in dicET for tKey in dicET[nKey] for s in dicET[nKey][tKey]])))
             plotName = os.path.basename(self.pth) + ".elapse"
             if len(dicET.keys()) == 1 and 1 in dicET:
                 self.plt.setPlotAttr(xTickInt=True)
-                self.plt.plot2DGraph(plotName, dicET[1], ["elapse"], "Threads", "Time (sec)")
+                self.plt.plot2DGraph(plotName, dicET[1], steps, "Threads", "Time (sec)")
             else:
                 self.plt.setPlotAttr(xTickInt=True, yTickInt=True)
-                self.plt.plot3DGraph(plotName, dicET, ["elapse"], "Proc.", "Threads", "Time (sec)")
+                self.plt.plot3DGraph(plotName, dicET, steps, "Proc.", "Threads", "Time (sec)")
             if 1 in dicET and 1 in dicET[1]:
-                refElapsedTime = dicET[1][1]["elapse"] # 1 proc, 1 thread
-                for nKey in dicET.keys():
-                    for tKey in dicET[nKey].keys():
-                        if nKey in dicET and tKey in dicET[nKey]:
-                            dicET[nKey][tKey]["speedup"] = refElapsedTime / dicET[nKey][tKey]["elapse"]
+                suSteps = []
+                for step in steps: # Each placement policy (if any) has its own reference
+                    if step not in dicET[1][1]:
+                        continue
+                    refElapsedTime = dicET[1][1][step] # 1 proc, 1 thread
+                    suStep = step.replace("elapse", "speedup")
+                    suSteps.append(suStep)
+                    for nKey in dicET.keys():
+                        for tKey in dicET[nKey].keys():
+                            if step in dicET[nKey][tKey]:
+                                dicET[nKey][tKey][suStep] = refElapsedTime / dicET[nKey][tKey][step]
                 plotName = os.path.basename(self.pth) + ".speedup"
                 if len(dicET.keys()) == 1 and 1 in dicET:
                     self.plt.setPlotAttr(xTickInt=True)
-                    self.plt.plot2DGraph(plotName, dicET[1], ["speedup"], "Threads", "Speed up")
+                    self.plt.plot2DGraph(plotName, dicET[1], suSteps, "Threads", "Speed up")
                 else:
                     self.plt.setPlotAttr(xTickInt=True, yTickInt=True)
-                    self.plt.plot3DGraph(plotName, dicET, ["speedup"], "Proc.", "Threads", "Speed up")
+                    self.plt.plot3DGraph(plotName, dicET, suSteps, "Proc.", "Threads", "Speed up")
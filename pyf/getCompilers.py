@@ -3,10 +3,16 @@
 from __future__ import print_function
 
 import sys
+import copy
 import distutils.spawn
 
-def getCompilers(args):
-    """Get and return compilers"""
+def getCompilers(args, required=True, flagSet=None):
+    """Get and return compilers (exit if they are required but can not be found): a flag set may override them"""
+    if flagSet: # Named flag set (name, overrides): its compilers and flags override build time customization
+        print("Flag set", flagSet[0], ":")
+        args = copy.copy(args)
+        for k, v in flagSet[1].items():
+            setattr(args, k, v)
     cpl = {}
     cpl["CC"] = distutils.spawn.find_executable(args.CC if args.CC else "gcc")
     cpl["FC"] = distutils.spawn.find_executable(args.FC if args.FC else "gfortran")
@@ -40,6 +46,6 @@ def getCompilers(args):
 
     for k in ["CC", "FC", "MPICC", "MPIF77", "MPIF90", "MPIFC", "OMPFLAGS", "FLAGS", "NOOPTFLAGS", "LINKFLAGS"]:
         print(k, "=", cpl[k])
-    if not cpl["CC"] or not cpl["MPICC"] or not cpl["FC"] or not cpl["MPIFC"]:
+    if required and (not cpl["CC"] or not cpl["MPICC"] or not cpl["FC"] or not cpl["MPIFC"]):
         sys.exit("ERROR: can not find C/Fortran compilers")
     return cpl
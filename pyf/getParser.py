@@ -23,6 +23,14 @@ def getParser():
     e += "  2. this tool is based on linux perf tools: run as root, or allow users to run perf (not paranoid mode)\n"
     e += "  3. json's enable to customise BUILDTIME, RUNTIME, BENCH, UCASE, PLOT (use LOGID for later plot filtering)\n"
     e += "  4. forecast disk space, the tmp directory (created to handle benchmarks and logs) may be big (10-100 GB)\n"
+    e += "     (use RUNTIME LOGCOMPRESS/LOGMAXSIZE to compress logs and to cap their size)\n"
+    e += "  5. use RUNTIME PLACEMENT to compare thread placements: each policy is a run dimension (pl token), like\n"
+    e += "     \"PLACEMENT\" : {\"close\" : {\"OMP_PLACES\" : \"cores\", \"OMP_PROC_BIND\" : \"close\", "
+    e += "\"MPIRUN_OPT\" : \"--bind-to core\"}}\n"
+    e += "  6. use BUILDTIME FLAGSETS to compare codegen variants: benchmarks and use cases (with prep.sh) are built\n"
+    e += "     with each named flag set side by side (fs token), like \"FLAGSETS\" : {\"O2\" : {\"FLAGS\" : \"-O2\"}}\n"
+    e += "  7. builds are cached (skipped if sources, compilers, flags and parameters did not change) in tmp/cache:\n"
+    e += "     use BUILDTIME CACHE to share a cache directory between nodes (same toolchain), or, NO to disable it\n"
     e += "\n"
     e += "first, know about HW events your architecture can support, and, tune your json configuration accordingly:\n"
     e += "  ~>./perfApp.py check;\n"
@@ -80,6 +88,19 @@ def addBenchSubParser(subParser):
     benchParser.add_argument("-m", "--more", action="store_true", help="run more benchmark configurations")
     ucHelp = "generate a use case (./tmp/usc/pfb*) from the best benchmark run"
     benchParser.add_argument("-u", "--ucase", action="store_true", help=ucHelp)
+    parHelp = "run benchmark jobs concurrently: jobs (n x t cores) that fit free cores run on disjoint sets of cores\n"
+    parHelp += "bandwidth benchmarks (stream, iozone, IOR) always run alone (once downloads and builds are over)\n"
+    parHelp += "benchmarks are downloaded and built concurrently: each one runs as soon as it has been built"
+    benchParser.add_argument("-p", "--parallel", action="store_true", help=parHelp)
+    repHelp = "repeat each benchmark configuration up to R times (R defaults to 1)\n"
+    repHelp += "repetitions stop as soon as the confidence interval (95%%) of the metric is narrow enough (see -e)"
+    benchParser.add_argument("-r", "--repeat", type=int, default=1, help=repHelp, metavar="R")
+    errHelp = "if added to -r, target half width (%% of the mean) of the confidence interval (E defaults to 5)"
+    benchParser.add_argument("-e", "--error", type=float, default=5., help=errHelp, metavar="E")
+    estHelp = "if added to -r, statistic of repeated runs: max (best, min for latency), mean or median\n"
+    estHelp += "the metric printed after runs uses this statistic (X defaults to max)"
+    benchParser.add_argument("-x", "--estimator", default="max", choices=["max", "mean", "median"], help=estHelp,
+                             metavar="X")
 
 def addUCaseSubParser(subParser):
     """Add ucase subparser to the main parser"""
@@ -104,6 +125,10 @@ def addUCaseSubParser(subParser):
     topHelp = "if added to -u, generate use case profiles with perf-top (sampled every S seconds, S defaults to 10)\n"
     topHelp += "perf-top metrics can be customised in the json file (UCASE, PERF-TOP)"
     ucaseParser.add_argument("-t", "--top", default=False, const=10, nargs="?", help=topHelp, metavar="S")
+    tlHelp = "if added to -u, generate use case timelines with a single perf-record session (all perf-top metrics)\n"
+    tlHelp += "samples are sliced every S seconds (S defaults to 1) per process-thread and function: lower overhead\n"
+    tlHelp += "and full coverage (all threads, all the run) compared to -t, timelines are plotted with plot -t"
+    ucaseParser.add_argument("-l", "--timeline", default=False, const=1, nargs="?", help=tlHelp, metavar="S")
     watHelp = "if added to -t, watch over use case memory/cpu usage"
     ucaseParser.add_argument("-w", "--watch", action="store_true", help=watHelp)
     ucaseParser.add_argument("-v", "--verbose", action="store_true", help="verbose, detail use case runs")
@@ -120,7 +145,8 @@ def addPlotSubParser(subParser):
     plotParser.add_argument("-u", "--uc", default=False, const="*", nargs="?", help=uscHelp, metavar="U")
     repHelp = "if added to -u, plot use case profiles generated by perf-report"
     plotParser.add_argument("-r", "--report", action="store_true", help=repHelp)
-    topHelp = "if added to -u, plot use case profiles generated by perf-top with ucase -t (T defaults to \"n=\")"
+    topHelp = "if added to -u, plot use case profiles generated by perf-top with ucase -t (T defaults to \"n=\")\n"
+    topHelp += "use case timelines generated by perf-record with ucase -l are plotted too"
     plotParser.add_argument("-t", "--top", default=False, const="n=", nargs="?", help=topHelp, metavar="T")
     watHelp = "if added to -u, plot use case memory/cpu usage history with ucase -w (W defaults to \"n=\")"
     plotParser.add_argument("-w", "--watch", default=False, const="n=", nargs="?", help=watHelp, metavar="W")
@@ -131,6 +157,10 @@ def addPlotSubParser(subParser):
     plotParser.add_argument("-m", "--rlm", default=False, const=-1, nargs="?", help=rlmHelp, metavar="U")
     plotParser.add_argument("-a", "--annotate", action="store_true", help="annotate plots")
     plotParser.add_argument("-v", "--verbose", action="store_true", help="verbose before plot, detail plotted data")
+    estHelp = "statistic used to estimate metrics of repeated benchmark runs (bench -r): max (best), mean or median\n"
+    estHelp += "plots and the roof line model use this statistic (X defaults to max)"
+    plotParser.add_argument("-x", "--estimator", default="max", choices=["max", "mean", "median"], help=estHelp,
+                            metavar="X")
     svHelp = "save plot as png in ./tmp/plt (do not plot)\n"
     svHelp += "plot features (font size, dpi, ...) can be customised in the json file (PLOT)"
     plotParser.add_argument("-s", "--save", action="store_true", help=svHelp)
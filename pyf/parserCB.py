@@ -10,6 +10,8 @@ import distutils.spawn
 import glob
 
 from pyc.useCase import useCase
+from pyc.jobScheduler import jobScheduler
+from pyc.buildPipeline import buildPipeline
 from pyf.getCompilers import getCompilers
 from pyf.plotRLM import plotRLM
 
@@ -44,19 +46,37 @@ def benchCB(args):
         return
 
     print("Looking for compilers ...")
-    cpl = getCompilers(args)
+    needCpl = [bm.needCpl for bm in args.bmLs if args.bench == "All" or args.bench == bm.getName()]
+    cpls = {None: getCompilers(args, required=any(needCpl))} # Compilers per flag set (None: default)
+    for flagSet in args.flagSets:
+        cpls[flagSet[0]] = getCompilers(args, required=any(needCpl), flagSet=flagSet)
     print("") # Output separator for clarity
 
     ext = ".more" if args.more else ".less" # Do not lost short results when re-running more runs
     ext += ".quick" if args.quick else ".long"
     ext = "." + ".".join(args.logID) + ext + ".log" if len(args.logID) > 0 else ext + ".log"
-    for bm in args.bmLs:
-        if args.bench == "All" or args.bench == bm.getName():
-            print("Benchmarking", bm.getName(), "...")
-            if bm.check():
-                bm.build(cpl)
-                bm.run(ext)
-            print("") # Output separator for clarity
+    sched = jobScheduler(args, max(args.proc)) if args.parallel else None
+    if sched: # Pipeline: download and build concurrently, run each benchmark as soon as it has been built
+        pipe = buildPipeline(args, cpls, sched)
+        for bm in args.bmLs:
+            if args.bench == "All" or args.bench == bm.getName():
+                if bm.check():
+                    pipe.add(bm)
+        print("Downloading and building benchmarks ...")
+        print("") # Output separator for clarity
+        pipe.run(ext)
+    else:
+        for bm in args.bmLs:
+            if args.bench == "All" or args.bench == bm.getName():
+                print("Benchmarking", bm.getName(), "...")
+                if bm.check():
+                    bm.build(cpls[bm.getFlagSet()])
+                    bm.run(ext)
+                print("") # Output separator for clarity
+    if sched:
+        print("Waiting for benchmark jobs ...")
+        sched.wait()
+        print("") # Output separator for clarity
 
     print("Analysing benchmark logs ...")
     for bm in args.bmLs:
@@ -69,14 +89,21 @@ def ucaseCB(args):
     if not distutils.spawn.find_executable("perf"):
         sys.exit("ERROR: can't find perf, install it, allow users to run it (not paranoid mode) or run as root")
 
-    if not args.stat and not args.report and not args.top:
+    if not args.stat and not args.report and not args.top and not args.timeline:
         args.stat = True # Stat as default option
 
+    cpls = {} # Compilers per flag set: use cases that build are prepared with each of them
+    if len(args.flagSets) > 0:
+        print("Looking for compilers of flag sets ...")
+        for flagSet in args.flagSets:
+            cpls[flagSet[0]] = getCompilers(args, required=False, flagSet=flagSet)
+        print("") # Output separator for clarity
+
     uc = useCase(args)
     for ucp in glob.glob(os.path.join(args.usc, args.uc)):
         if os.path.isdir(ucp):
             if uc.readConfig(ucp):
-                uc.runUseCase()
+                uc.runUseCase(cpls)
 
 def plotCB(args):
     """Callback for plot mode"""
@@ -5,6 +5,7 @@
 from __future__ import print_function
 
 from pyc.plot import plot
+from pyc.topology import topology
 
 # Functions
 
@@ -13,6 +14,10 @@ def plotRLM(lsUCS, args):
     maxGFlops, maxRAMMBs = analysingBenchmarkLogs(args)
     if maxGFlops <= 0. or maxRAMMBs <= 0.:
         return
+    ceilings = analysingCeilings(args, maxRAMMBs, maxGFlops)
+    ceilings.update(analysingNumaCeilings(args, maxGFlops))
+    ceilings.update(analysingFlagSetCeilings(args))
+    latencies = analysingLatencies(args)
     print("Plotting the roof line model", end="")
     maxFlops = maxGFlops * 1000. ** 3
     maxBs = maxRAMMBs * 1024. ** 2
@@ -35,7 +40,9 @@ def plotRLM(lsUCS, args):
     xRLM = [groundPt[0], ridgePt[0], endPt[0]]
     yRLM = [groundPt[1], ridgePt[1], endPt[1]]
     axis.plot(xRLM, yRLM, marker="o", linewidth=2, color="r", label="roof line model")
+    plotRLMCeilings(ceilings, axis, endPt)
     annotateRLM(ridgePt, args, axis, maxRAMMBs, maxGFlops)
+    annotateRLMLatencies(latencies, args, axis)
     plotRLMUseCase(lsUCS, axis, args)
     axis.set_xlim([xStart, xStop])
     ymax = args.rlmYMax if args.rlmYMax else (1.1 + len(lsUCS) * 0.1) * endPt[1]
@@ -51,15 +58,102 @@ def analysingBenchmarkLogs(args):
     """Analyse benchmark logs to get maximum values"""
     print("Analysing benchmark logs ...")
     maxGF, maxRAMMBs = 0., 0.
+    provGF, provRAMMBs = 0., 0. # Provisional metrics (quick calibration): used if no other benchmark ran
     for bm in args.bmLs:
         bMc = bm.getMetric()
-        if bm.getType() == "GF" and bMc > maxGF:
+        if bm.getFlagSet() is not None:
+            continue # Flag set variants have their own ceilings
+        if bm.getType() == "GF" and bm.provisional:
+            provGF = max(provGF, bMc)
+        elif bm.getType() == "GF" and bMc > maxGF:
             maxGF = bMc
-        if bm.getType() == "RAM-MB/s" and bMc > maxRAMMBs:
+        if bm.getType() == "RAM-MB/s" and bm.provisional:
+            provRAMMBs = max(provRAMMBs, bMc)
+        elif bm.getType() == "RAM-MB/s" and bMc > maxRAMMBs:
             maxRAMMBs = bMc
+    if maxGF <= 0. and provGF > 0.:
+        print("Analysing benchmark logs: provisional GFlops ceiling (quick calibration)")
+        maxGF = provGF
+    if maxRAMMBs <= 0. and provRAMMBs > 0.:
+        print("Analysing benchmark logs: provisional MB/s ceiling (quick calibration)")
+        maxRAMMBs = provRAMMBs
     print("") # Output separator for clarity
     return maxGF, maxRAMMBs
 
+def analysingCeilings(args, maxRAMMBs, maxGFlops):
+    """Analyse benchmark logs to get cache level ceilings (MB/s, GFlops) above the RAM one, and, disk ones below it"""
+    ceilings = {}
+    for bm in args.bmLs:
+        if not hasattr(bm, "getCeilings") or bm.getFlagSet() is not None:
+            continue
+        if bm.getType() == "IO-MB/s": # Page cache and device ceilings: bound out-of-core use cases
+            bmCeilings = bm.getCeilings()
+            for level in bmCeilings:
+                if bmCeilings[level] > 0.:
+                    ceilings[bm.getName() + " " + level] = (bmCeilings[level], maxGFlops)
+            continue
+        if bm.getType() != "RAM-MB/s":
+            continue
+        bmCeilings = bm.getCeilings()
+        for level in bmCeilings:
+            if level != "RAM" and bmCeilings[level] > maxRAMMBs:
+                maxMBs = max(ceilings[level][0] if level in ceilings else 0., bmCeilings[level])
+                ceilings[level] = (maxMBs, maxGFlops)
+    return ceilings
+
+def analysingNumaCeilings(args, maxGFlops):
+    """Analyse benchmark logs to get NUMA node ceilings (MB/s, GFlops): local and (worst) remote bandwidth"""
+    ceilings = {}
+    nodes = topology.getNodes()
+    nbCpus = sum([len(nodes[node]) for node in nodes])
+    for bm in args.bmLs:
+        if not hasattr(bm, "getNumaMatrix") or bm.getFlagSet() is not None:
+            continue
+        matrix = bm.getNumaMatrix()
+        for cpuNode in nodes:
+            nodeGFlops = maxGFlops * len(nodes[cpuNode]) / nbCpus # Share of the node (HPL runs over all nodes)
+            if (cpuNode, cpuNode) in matrix:
+                ceilings["node %d, local" % cpuNode] = (matrix[(cpuNode, cpuNode)], nodeGFlops)
+            remote = [matrix[k] for k in matrix if k[0] == cpuNode and k[1] != cpuNode]
+            if len(remote) > 0:
+                ceilings["node %d, remote" % cpuNode] = (min(remote), nodeGFlops)
+    return ceilings
+
+def analysingFlagSetCeilings(args):
+    """Analyse benchmark logs to get flag set ceilings (MB/s, GFlops): best variants built with each flag set"""
+    ceilings = {}
+    for flagSet in args.flagSets:
+        fsGF, fsRAMMBs = 0., 0.
+        for bm in args.bmLs:
+            if bm.getFlagSet() != flagSet[0]:
+                continue
+            if bm.getType() == "GF":
+                fsGF = max(fsGF, bm.getMetric(printMax=False))
+            if bm.getType() == "RAM-MB/s":
+                fsRAMMBs = max(fsRAMMBs, bm.getMetric(printMax=False))
+        if fsGF > 0. and fsRAMMBs > 0.:
+            print("Analysing flag set %s: ceiling = (%11.3f MB/s, %11.3f GFlops)" % (flagSet[0], fsRAMMBs, fsGF))
+            ceilings["flags " + flagSet[0]] = (fsRAMMBs, fsGF)
+    return ceilings
+
+def analysingLatencies(args):
+    """Analyse benchmark logs to get latency plateaus (ns) of each memory level (L1, ..., RAM)"""
+    latencies = {}
+    for bm in args.bmLs:
+        if not hasattr(bm, "getLatencies") or bm.getFlagSet() is not None:
+            continue
+        for level, ns in bm.getLatencies().items():
+            latencies[level] = min(latencies[level], ns) if level in latencies else ns
+    return latencies
+
+def plotRLMCeilings(ceilings, axis, endPt):
+    """Plot ceilings (cache levels, NUMA nodes) on the roof line model"""
+    for level in sorted(ceilings):
+        ceilMBs, ceilGFlops = ceilings[level]
+        ridgeX = ceilGFlops * 1000. ** 3 / (ceilMBs * 1024. ** 2)
+        axis.plot([0., ridgeX, endPt[0]], [0., ceilGFlops, ceilGFlops], linestyle="--", linewidth=1,
+                  label="roof line model (%s)" % level)
+
 def plotRLMUseCase(lsUCS, axis, args):
     """Plot use cases on the roof line model"""
     for ucs in lsUCS:
@@ -81,3 +175,13 @@ def annotateRLM(ridgePt, args, axis, maxRAMMBs, maxGFlops):
         axis.annotate(msg % (maxRAMMBs, maxGFlops), xy=ridgePt, xytext=xy, size=args.rlmAFS)
     else:
         axis.annotate(msg % (maxRAMMBs, maxGFlops), xy=ridgePt, xytext=xy)
+
+def annotateRLMLatencies(latencies, args, axis):
+    """Annotate the roof line model with latencies: latency bounded use cases stay below ceilings"""
+    if len(latencies) == 0:
+        return
+    msg = "\n".join(["%s latency = %.3f ns" % (level, latencies[level]) for level in sorted(latencies)])
+    if args.rlmAFS:
+        axis.text(0.02, 0.98, msg, transform=axis.transAxes, verticalalignment="top", size=args.rlmAFS)
+    else:
+        axis.text(0.02, 0.98, msg, transform=axis.transAxes, verticalalignment="top")
@@ -4,15 +4,23 @@
 
 from __future__ import print_function
 
+import os
+import sys
+import copy
 import json
 
 from pyc.streamBench import streamBench
 from pyc.stream2Bench import stream2Bench
 from pyc.iozoneBench import iozoneBench
 from pyc.iorBench import iorBench
+from pyc.mdtestBench import mdtestBench
 from pyc.hplBench import hplBench
 from pyc.hydroBench import hydroBench
 from pyc.nasBench import nasBench
+from pyc.numpyBench import numpyBench
+from pyc.latencyBench import latencyBench
+from pyc.logFile import logFile
+from pyc.topology import topology
 
 # Functions
 
@@ -57,6 +65,8 @@ def readBuildTimeConfig(args, jsCfg):
     args.FLAGS = None
     args.NOOPTFLAGS = None
     args.LINKFLAGS = None
+    args.flagSets = []
+    args.buildCache = os.path.join(args.tmp, "cache")
     if "BUILDTIME" in jsCfg:
         btCfg = jsCfg["BUILDTIME"]
         if "CC" in btCfg and btCfg["CC"] != "":
@@ -86,6 +96,26 @@ def readBuildTimeConfig(args, jsCfg):
         if "LINKFLAGS" in btCfg and btCfg["LINKFLAGS"] != "":
             print("Configuring LINKFLAGS with", btCfg["LINKFLAGS"], "...")
             args.LINKFLAGS = btCfg["LINKFLAGS"]
+        if "CACHE" in btCfg and btCfg["CACHE"] != "": # Path (may be shared by nodes), or, NO to disable the cache
+            print("Configuring build cache with", btCfg["CACHE"], "...")
+            args.buildCache = None if btCfg["CACHE"] == "NO" else btCfg["CACHE"]
+        if "FLAGSETS" in btCfg:
+            readFlagSetConfig(args, btCfg["FLAGSETS"])
+
+def readFlagSetConfig(args, fsCfg):
+    """Read named flag sets (compilers and flags that override build time customization) to build variants with"""
+    keys = ["CC", "FC", "MPICC", "MPIF77", "MPIF90", "OMPFLAGS", "FLAGS", "NOOPTFLAGS", "LINKFLAGS"]
+    for fsName in sorted(fsCfg):
+        if fsName == "" or fsName.find(".") != -1 or fsName.find("=") != -1: # The name is used as a run token
+            sys.exit("ERROR: bad flag set name " + fsName + " (must not be empty, must not contain . or =)")
+        print("Configuring build time with FLAGSETS =", fsName, "...")
+        overrides = {}
+        for k in keys:
+            if k in fsCfg[fsName] and fsCfg[fsName][k] != "":
+                overrides[k] = fsCfg[fsName][k]
+        if "INTEL" in fsCfg[fsName]:
+            overrides["intel"] = True if fsCfg[fsName]["INTEL"] == "YES" else False
+        args.flagSets.append((fsName, overrides))
 
 def readRunTimeConfig(args, jsCfg):
     """Read run time customization from the configuration file"""
@@ -93,6 +123,11 @@ def readRunTimeConfig(args, jsCfg):
     args.mpirunOpt = None
     args.env = []
     args.logID = []
+    args.timeout = None
+    args.logCompress = None
+    args.logMaxSize = None
+    args.numaNode = None
+    args.placements = []
     if "RUNTIME" in jsCfg:
         rtCfg = jsCfg["RUNTIME"]
         if "MPIRUN_OPT" in rtCfg:
@@ -110,6 +145,30 @@ def readRunTimeConfig(args, jsCfg):
         if "LOGID" in rtCfg:
             print("Configuring with log extension =", rtCfg["LOGID"])
             args.logID = rtCfg["LOGID"].split()
+        if "TIMEOUT" in rtCfg and rtCfg["TIMEOUT"] != "":
+            print("Configuring run time with TIMEOUT =", rtCfg["TIMEOUT"], "sec ...")
+            args.timeout = float(rtCfg["TIMEOUT"])
+        if "LOGCOMPRESS" in rtCfg and rtCfg["LOGCOMPRESS"] != "":
+            print("Configuring run time with LOGCOMPRESS =", rtCfg["LOGCOMPRESS"], "...")
+            args.logCompress = rtCfg["LOGCOMPRESS"]
+            if not logFile.canCompress(args.logCompress):
+                print("Can not compress logs with", args.logCompress, "(not available or unknown), use gzip")
+                args.logCompress = "gzip"
+        if "LOGMAXSIZE" in rtCfg and rtCfg["LOGMAXSIZE"] != "":
+            print("Configuring run time with LOGMAXSIZE =", rtCfg["LOGMAXSIZE"], "MB ...")
+            args.logMaxSize = int(float(rtCfg["LOGMAXSIZE"]) * 1024 ** 2) # Keep head and tail of bigger logs
+        if "NUMANODE" in rtCfg and rtCfg["NUMANODE"] != "":
+            print("Configuring run time with NUMANODE =", rtCfg["NUMANODE"], "...")
+            args.numaNode = int(rtCfg["NUMANODE"])
+            if topology.getBind(args.numaNode) is None:
+                print("Can not bind runs to NUMA node", args.numaNode, "(unknown node, or, no numactl/taskset), ignore")
+                args.numaNode = None
+        if "PLACEMENT" in rtCfg:
+            for plName in sorted(rtCfg["PLACEMENT"]): # Placement policy: environment (OMP_PLACES, ...) and MPIRUN_OPT
+                plCfg = rtCfg["PLACEMENT"][plName]
+                print("Configuring run time with PLACEMENT =", plName, "...")
+                plEnv = [(k, plCfg[k]) for k in sorted(plCfg) if k != "MPIRUN_OPT"]
+                args.placements.append((plName, plEnv, plCfg["MPIRUN_OPT"] if "MPIRUN_OPT" in plCfg else None))
 
 def readBenchmarkConfig(args, jsCfg):
     """Read benchmarks from the configuration file"""
@@ -118,6 +177,19 @@ def readBenchmarkConfig(args, jsCfg):
     if "BENCH" in jsCfg:
         readBWBenchmarkConfig(args, jsCfg["BENCH"])
         readGFBenchmarkConfig(args, jsCfg["BENCH"])
+    for bm in list(args.bmLs): # Variants of benchmarks that are built: one per flag set
+        if bm.needCpl:
+            for flagSet in args.flagSets:
+                bmFS = copy.deepcopy(bm, {id(args): args}) # Variants share arguments only
+                bmFS.setFlagSet(flagSet)
+                args.bmLs.append(bmFS)
+
+def addBenchmark(args, bm, bmCfg):
+    """Add a benchmark to the list of benchmarks to run (customize its timeout if needed)"""
+    if "TIMEOUT" in bmCfg and bmCfg["TIMEOUT"] != "":
+        print("Configuring", bm.getName(), "with TIMEOUT =", bmCfg["TIMEOUT"], "sec ...")
+        bm.timeout = float(bmCfg["TIMEOUT"])
+    args.bmLs.append(bm)
 
 def readBWBenchmarkConfig(args, bCfg):
     """Read bandwidth benchmarks from the configuration file"""
@@ -125,14 +197,19 @@ def readBWBenchmarkConfig(args, bCfg):
         strCfg = bCfg["STREAM"]
         if "URL" in strCfg:
             print("Configuring stream benchmark ...")
-            args.bmLs.append(streamBench(args, strCfg["URL"]))
+            strSweep = True if "SWEEP" in strCfg and strCfg["SWEEP"] == "YES" else False
+            strMulti = True if "MULTIPROC" in strCfg and strCfg["MULTIPROC"] == "YES" else False
+            strNuma = True if "NUMA" in strCfg and strCfg["NUMA"] == "YES" else False
+            strBm = streamBench(args, strCfg["URL"], sweep=strSweep, multiProc=strMulti, numa=strNuma)
+            addBenchmark(args, strBm, strCfg)
     if "STREAM2" in bCfg:
         strCfg = bCfg["STREAM2"]
         strPrereq = strCfg["PREREQ"] if "PREREQ" in strCfg else None
         strURL = strCfg["URL"] if "URL" in strCfg else None
         if strPrereq and strURL:
             print("Configuring stream2 benchmark ...")
-            args.bmLs.append(stream2Bench(args, strPrereq, strURL))
+            strMulti = True if "MULTIPROC" in strCfg and strCfg["MULTIPROC"] == "YES" else False
+            addBenchmark(args, stream2Bench(args, strPrereq, strURL, multiProc=strMulti), strCfg)
     if "IOZONE" in bCfg:
         iozCfg = bCfg["IOZONE"]
         iozURL = iozCfg["URL"] if "URL" in iozCfg else None
@@ -140,7 +217,8 @@ def readBWBenchmarkConfig(args, bCfg):
         iozMkArch = iozCfg["MKARCH"] if "MKARCH" in iozCfg else None
         if iozURL and iozVersion and iozMkArch:
             print("Configuring iozone benchmark ...")
-            args.bmLs.append(iozoneBench(args, iozURL, iozVersion, iozMkArch))
+            iozDevice = iozCfg["DEVICE"].split() if "DEVICE" in iozCfg else [] # DIRECT (O_DIRECT), RAM (2 x RAM)
+            addBenchmark(args, iozoneBench(args, iozURL, iozVersion, iozMkArch, device=iozDevice), iozCfg)
     if "IOR" in bCfg:
         iorCfg = bCfg["IOR"]
         iorURL = iorCfg["URL"] if "URL" in iorCfg else None
@@ -152,6 +230,7 @@ def readBWBenchmarkConfig(args, bCfg):
             iorConfig["LDFLAGS"] = cCfg["LDFLAGS"] if "LDFLAGS" in cCfg else ""
             iorConfig["LIBS"] = cCfg["LIBS"] if "LIBS" in cCfg else ""
         iorRun = {"-a" : [], "-b" : [], "-t" : [], "-J" : [], "OTHERS" : ""}
+        iorRun.update({"SEARCH" : "EXHAUSTIVE", "MIN" : "4k", "MAX" : "16m"}) # Like configurations without SEARCH
         if "RUN" in iorCfg:
             rCfg = iorCfg["RUN"]
             iorRun["-a"] = rCfg["-a"].split() if "-a" in rCfg else []
@@ -159,10 +238,31 @@ def readBWBenchmarkConfig(args, bCfg):
             iorRun["-t"] = rCfg["-t"].split() if "-t" in rCfg else []
             iorRun["-J"] = rCfg["-J"].split() if "-J" in rCfg else []
             iorRun["OTHER"] = rCfg["OTHER"].split() if "OTHER" in rCfg else []
+            if "SEARCH" in rCfg and rCfg["SEARCH"] != "": # ADAPTIVE (grid from MIN to MAX), or, EXHAUSTIVE (lists)
+                iorRun["SEARCH"] = rCfg["SEARCH"]
+            iorRun["MIN"] = rCfg["MIN"] if "MIN" in rCfg and rCfg["MIN"] != "" else iorRun["MIN"]
+            iorRun["MAX"] = rCfg["MAX"] if "MAX" in rCfg and rCfg["MAX"] != "" else iorRun["MAX"]
         if iorURL:
             print("Configuring IOR benchmark ...")
             iorLID = iorCfg["LOGID"].split() if "LOGID" in iorCfg else []
-            args.bmLs.append(iorBench(args, iorURL, iorConfig, iorRun, iorLID))
+            addBenchmark(args, iorBench(args, iorURL, iorConfig, iorRun, iorLID), iorCfg)
+            if "MDTEST" in iorCfg and "ITEMS" in iorCfg["MDTEST"] and iorCfg["MDTEST"]["ITEMS"] != "":
+                print("Configuring mdtest benchmark ...")
+                mdtCfg = iorCfg["MDTEST"]
+                mdtRun = {"ITEMS" : mdtCfg["ITEMS"].split()} # Items (files, directories) per rank
+                mdtRun["DIR"] = mdtCfg["DIR"] if "DIR" in mdtCfg else "" # Test directory (local file system)
+                mdtRun["OTHER"] = mdtCfg["OTHER"].split() if "OTHER" in mdtCfg else []
+                addBenchmark(args, mdtestBench(args, mdtRun, iorLID), mdtCfg)
+    if "NUMPY" in bCfg: # Quick calibration: no download, no compiler
+        npCfg = bCfg["NUMPY"]
+        if "STREAM" in npCfg and npCfg["STREAM"] == "YES":
+            print("Configuring numpy stream benchmark ...")
+            addBenchmark(args, numpyBench(args, "stream"), npCfg)
+    if "LATENCY" in bCfg:
+        latCfg = bCfg["LATENCY"]
+        if "POINTERCHASING" in latCfg and latCfg["POINTERCHASING"] == "YES":
+            print("Configuring latency benchmark ...")
+            addBenchmark(args, latencyBench(args), latCfg)
 
 def readGFBenchmarkConfig(args, bCfg):
     """Read GFlops benchmarks from the configuration file"""
@@ -183,7 +283,9 @@ def readGFBenchmarkConfig(args, bCfg):
         if ((blasDic["URL"] and blasDic["VERSION"]) or blasDic["LIB"]) and hplURL and hplVersion:
             print("Configuring HPLinpack benchmark ...")
             hplLID = hplCfg["LOGID"].split() if "LOGID" in hplCfg else []
-            args.bmLs.append(hplBench(args, blasDic, hplURL, hplVersion, hplLID))
+            hplSearch = hplCfg["SEARCH"] if "SEARCH" in hplCfg and hplCfg["SEARCH"] != "" else "EXHAUSTIVE"
+            print("Configuring HPLinpack search with", hplSearch, "...")
+            addBenchmark(args, hplBench(args, blasDic, hplURL, hplVersion, hplLID, hplSearch), hplCfg)
     if "HYDRO" in bCfg:
         hydroCfg = bCfg["HYDRO"]
         hydroURL = hydroCfg["URL"] if "URL" in hydroCfg else None
@@ -198,7 +300,7 @@ def readGFBenchmarkConfig(args, bCfg):
         if hydroURL:
             print("Configuring hydro benchmark ...")
             hydroLID = hydroCfg["LOGID"].split() if "LOGID" in hydroCfg else []
-            args.bmLs.append(hydroBench(args, hydroURL, hydroBuild, hydroRun, hydroLID))
+            addBenchmark(args, hydroBench(args, hydroURL, hydroBuild, hydroRun, hydroLID), hydroCfg)
     if "NAS" in bCfg:
         nasCfg = bCfg["NAS"]
         nasURL = nasCfg["URL"] if "URL" in nasCfg else None
@@ -207,7 +309,12 @@ def readGFBenchmarkConfig(args, bCfg):
         nasVec = True if "VEC" in nasCfg and nasCfg["VEC"] == "YES" else False
         if nasURL and nasVersion:
             print("Configuring NAS benchmark ...")
-            args.bmLs.append(nasBench(args, nasURL, nasVersion, nasMPIID, nasVec))
+            addBenchmark(args, nasBench(args, nasURL, nasVersion, nasMPIID, nasVec), nasCfg)
+    if "NUMPY" in bCfg: # Quick calibration: no download, no compiler
+        npCfg = bCfg["NUMPY"]
+        if "DGEMM" in npCfg and npCfg["DGEMM"] == "YES":
+            print("Configuring numpy dgemm benchmark ...")
+            addBenchmark(args, numpyBench(args, "dgemm"), npCfg)
 
 def readUseCaseConfig(args, jsCfg):
     """Read use case from the configuration file"""
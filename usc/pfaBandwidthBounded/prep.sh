@@ -1,3 +1,7 @@
 #!/bin/bash
 
-make all
+if [ -n "$PFA_FLAGSET" ]; then # Flag set variant: its flags override the default ones
+  make all CXXFLAGS="$CXXFLAGS"
+else
+  make all
+fi